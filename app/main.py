@@ -1,4 +1,211 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from paho.mqtt.client import Client, MQTTMessage
+
+from broker import Publisher, Subscriber
+from broker.homeassistant.hassio import Discovery
+from broker.helper import DeadbandFilter, StateEncoder
+from broker.model import PublishResult
+from common.helper import FileSystem, LoggerFactory, RingBufferStore
+from common.model import Configuration, DeviceConfig, MetricsConfig
+from di import ConfigurationProvider, LoggerProvider
+from di.dependencies import ClientProvider, DispatcherProvider, FrameCacheProvider, MetricsProvider
+from dispatcher import CommandIngestor, DispatcherContract
+from engine import InverterCore
+from engine.helper import PluginManifestIndex, PluginRegistry, PluginUtility
+from engine.model import CachePolicy
+from engine.plugin import CachedInverterCore
+from engine.interactor.usecases import PluginUseCase, PollingUseCase
+from processor.helper import CommandValidator
+from processor.model import DecodedResponse
+
+
+class Application:
+    """
+    Runs every configured inverter from a single process, all devices share one MQTT publisher
+    """
+    # the poll planner sets the pace of status polls, a cached status would only repeat the previous sample
+    __CACHE_POLICY = CachePolicy(status=0.0)
+
+    def __init__(self, configuration: Configuration, logger_factory: LoggerFactory) -> None:
+        self._configuration = configuration
+        self._logger_factory = logger_factory
+        self._logger = logger_factory.create_logger(__name__)
+        self._client = ClientProvider.client_ioc(logger=self._logger)
+        self._metrics = MetricsProvider.metrics_ioc()
+        self._log_handler = LoggerFactory.backend().handler
+        self._metrics.gauge(
+            'mppt_log_records_dropped', 'Log records dropped because the log queue was full',
+            lambda: self._log_handler.dropped
+        )
+        self._publisher = Publisher(self._logger, self._client, configuration.mqtt, metrics=self._metrics)
+        self._change_filter = DeadbandFilter(configuration.mqtt.publish)
+        self._publisher.add_connect_listener(self._change_filter.request_refresh)
+        self._state_encoder = StateEncoder()
+        self._discoveries: Dict[str, Discovery] = {}
+        self._publisher.add_connect_listener(self.__subscribe_to_birth_messages)
+        self._client.message_callback_add(Discovery.BIRTH_TOPIC, self.__on_birth_message)
+        # commands arrive on the same client, `<topic>/<device name>/command`
+        self._subscriber = Subscriber(self._logger, self._client, configuration.mqtt)
+        self._publisher.add_connect_listener(self._subscriber.subscribe)
+        self._ingestors: List[CommandIngestor] = []
+        # (device name, command) -> store, created with the first sample when history is enabled
+        self._stores: Dict[Tuple[str, str], RingBufferStore] = {}
+
+    def __subscribe_to_birth_messages(self) -> None:
+        self._client.subscribe(Discovery.BIRTH_TOPIC)
+
+    def __on_birth_message(self, client: Client, user_data: Optional[object], message: MQTTMessage) -> None:
+        for discovery in self._discoveries.values():
+            discovery.on_status_message(message.payload)
+
+    def __create_registry(self) -> PluginRegistry:
+        plugin_use_case = PluginUseCase(
+            self._logger_factory,
+            PluginUtility(self._logger_factory, PluginManifestIndex(self._logger_factory)),
+            self._configuration.plugin,
+            FrameCacheProvider.frame_cache_ioc()
+        )
+        plugin_use_case.discover_plugins(reload=True)
+        return plugin_use_case.registry
+
+    async def __acknowledge(self, device: DeviceConfig, acknowledgement: Dict[str, Any]) -> None:
+        payload = {f'{device.device_name}/response': json.dumps(acknowledgement)}
+        await self._publisher.publish_message(payload, retain=False)
+
+    def __register_ingestor(
+            self,
+            device: DeviceConfig,
+            dispatcher: DispatcherContract,
+            validator: CommandValidator,
+            inverter: CachedInverterCore
+    ) -> None:
+        ingestor = CommandIngestor(
+            self._logger_factory,
+            dispatcher,
+            validator,
+            lambda acknowledgement: self.__acknowledge(device, acknowledgement),
+            on_executed=inverter.invalidate_for
+        )
+        self._subscriber.register(device.device_name, ingestor)
+        self._ingestors.append(ingestor)
+
+    def __create_inverters(self, registry: PluginRegistry) -> List[InverterCore]:
+        inverters = []
+        # plugins are shared by every device using them, so is the validator built from their definitions
+        validators: Dict[str, CommandValidator] = {}
+        for device in self._configuration.device_configs:
+            alias = self._configuration.plugin_for(device)
+            plugin = registry.load(alias)
+            if plugin is None:
+                self._logger.error(f'Unable to load plugin: {alias} for device: {device.device_name}')
+                continue
+            validator = validators.get(alias)
+            if validator is None:
+                validator = validators[alias] = CommandValidator(plugin.command_definitions)
+            dispatcher = DispatcherProvider.dispatcher_ioc(device_configuration=device)
+            inverter = CachedInverterCore(
+                registry.inverter(alias, device, dispatcher), self._logger_factory, self.__CACHE_POLICY
+            )
+            self.__register_ingestor(device, dispatcher, validator, inverter)
+            self._discoveries[device.device_name] = Discovery(
+                self._logger_factory, inverter, self._publisher, self._state_encoder
+            )
+            inverters.append(inverter)
+        return inverters
+
+    async def __publish_state(self, device: DeviceConfig, sample: DecodedResponse, fields: dict) -> None:
+        topic = f'{device.device_name}/{sample._command.lower()}/state'
+        result = await self._publisher.publish_message({topic: self._state_encoder.encode(sample)})
+        # the document carries every field, so all of them count as published
+        self._change_filter.acknowledge(fields, PublishResult(list(fields) if result else [], result.failures))
+
+    def __record_sample(self, device: DeviceConfig, sample: DecodedResponse) -> None:
+        history = self._configuration.history
+        if history is None:
+            return
+        key = (device.device_name, sample._command)
+        store = self._stores.get(key)
+        try:
+            if store is None:
+                store = self._stores[key] = RingBufferStore(
+                    f'{device.device_name}-{sample._command.lower()}.ring', sample._fields, history.max_size
+                )
+            store.append([value for _, value in sample])
+        except (OSError, ValueError) as e:
+            self._logger.error(f'Unable to store sample of device: {device.device_name}', exc_info=e)
+
+    async def __publish_sample(self, device: DeviceConfig, sample: DecodedResponse) -> None:
+        # stored before publishing so samples are kept while the broker is unreachable
+        self.__record_sample(device, sample)
+        discovery = self._discoveries[device.device_name]
+        await discovery.describe(sample._command)
+        await discovery.broadcast_discovery()
+        fields = {f'{device.device_name}/{key}': value for key, value in sample}
+        payload = self._change_filter.select(fields)
+        if not payload:
+            return
+        if self._configuration.mqtt.publish.aggregate_state:
+            await self.__publish_state(device, sample, fields)
+        else:
+            result = await self._publisher.publish_message(payload)
+            self._change_filter.acknowledge(payload, result)
+
+    async def __report_metrics(self, config: MetricsConfig) -> None:
+        path = None
+        if config.text_file:
+            directory, file_name = os.path.split(config.text_file)
+            if not os.path.isabs(directory):
+                directory = os.path.join('logs', directory)
+            path = FileSystem.create_file(directory, file_name)
+        dropped = self._log_handler.dropped
+        while True:
+            await asyncio.sleep(config.interval)
+            if self._log_handler.dropped > dropped:
+                self._logger.warning(
+                    f'Dropped {self._log_handler.dropped - dropped} log records in the last {config.interval}s, '
+                    f'the log queue is full'
+                )
+                dropped = self._log_handler.dropped
+            if path is not None:
+                try:
+                    self._metrics.write_text_file(path)
+                except OSError as e:
+                    self._logger.error(f'Unable to write metrics to: {path}', exc_info=e)
+            if config.topic:
+                diagnostics = json.dumps(self._metrics.snapshot())
+                await self._publisher.publish_message({config.topic: diagnostics}, retain=False)
+
+    async def run(self) -> None:
+        inverters = self.__create_inverters(self.__create_registry())
+        if not inverters:
+            self._logger.error('No device could be set up, nothing to poll')
+            return
+        # the client is driven by this event loop, publishing and device polling share one thread
+        broker = asyncio.create_task(self._publisher.start())
+        reporter = None
+        if self._configuration.metrics is not None:
+            reporter = asyncio.create_task(self.__report_metrics(self._configuration.metrics))
+        try:
+            await PollingUseCase(self._logger_factory, inverters, self.__publish_sample, self._metrics).run()
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+            for ingestor in self._ingestors:
+                await ingestor.stop()
+            self._publisher.stop()
+            await broker
+            for store in self._stores.values():
+                store.close()
+
+
+def main() -> None:
+    application = Application(ConfigurationProvider.configuration_ioc(), LoggerProvider.logger_factory_ioc())
+    asyncio.run(application.run())
 
 
 if __name__ == '__main__':
-    pass
+    main()
@@ -0,0 +1,108 @@
+"""
+Stand-ins for the services the application talks to. The broker can be run on its own, it prints its port:
+
+    python -m benchmarks.fixtures
+"""
+import asyncio
+import collections
+import time
+from typing import List, Optional, Tuple
+
+_CONNACK = bytes((0x20, 0x03, 0x00, 0x00, 0x00))
+_CONNECT, _PUBLISH, _SUBSCRIBE, _PINGREQ, _DISCONNECT = 1, 3, 8, 12, 14
+
+
+class MinimalBroker:
+    """
+    MQTT v5 stand-in that acknowledges connections and counts the packets it receives by type, only QoS 0 is
+    supported
+    """
+
+    def __init__(self, record: bool = False) -> None:
+        """
+        :param record: Whether the type and body of every packet are kept in order of arrival under `received`, off
+        for benchmarks so a long run does not grow the broker
+        """
+        # packet type -> packets received
+        self.packets: 'collections.Counter[int]' = collections.Counter()
+        self.received: List[Tuple[int, bytes]] = []
+        self.connections = 0
+        # connections closed right after they are acknowledged, to test reconnecting
+        self.drop_connections = 0
+        self.first_publish: Optional[asyncio.Future] = None
+        self._record = record
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @staticmethod
+    async def __read_packet(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        header = (await reader.readexactly(1))[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return header >> 4, await reader.readexactly(length)
+
+    @staticmethod
+    def __suback(body: bytes) -> bytes:
+        # packet identifier, empty properties and a granted QoS 0 reason code
+        return bytes((0x90, 0x04)) + body[:2] + bytes((0x00, 0x00))
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                packet_type, body = await self.__read_packet(reader)
+                self.packets[packet_type] += 1
+                if self._record:
+                    self.received.append((packet_type, body))
+                if packet_type == _CONNECT:
+                    writer.write(_CONNACK)
+                    if self.connections <= self.drop_connections:
+                        await writer.drain()
+                        break
+                elif packet_type == _SUBSCRIBE:
+                    writer.write(self.__suback(body))
+                elif packet_type == _PINGREQ:
+                    writer.write(bytes((0xD0, 0x00)))
+                elif packet_type == _PUBLISH and not self.first_publish.done():
+                    self.first_publish.set_result(time.perf_counter())
+                elif packet_type == _DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+    @property
+    def published(self) -> int:
+        return self.packets[_PUBLISH]
+
+    async def start(self) -> int:
+        """
+        :return: Port the broker listens on
+        """
+        self.first_publish = asyncio.get_running_loop().create_future()
+        self._server = await asyncio.start_server(self.__handle, '127.0.0.1', 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def _serve() -> None:
+    broker = MinimalBroker()
+    print(await broker.start(), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,141 @@
+"""
+Startup budget benchmark, measures how long a cold `import app.main` takes and how long it takes a fresh process to
+publish its first message. The run fails when either median exceeds its budget:
+
+    python -m benchmarks.startup --import-budget 0.5 --publish-budget 3.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from asyncio import FIRST_COMPLETED
+from typing import List, Optional
+
+from common.helper import LoggerFactory
+from simulator import SocketSimulatorServer
+from .fixtures import MinimalBroker
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _environment() -> dict:
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, (_ROOT, environment.get('PYTHONPATH'))))
+    # byte-code is still used, only the interpreter's own start-up is left out of the measurement
+    environment.pop('PYTHONPROFILEIMPORTTIME', None)
+    return environment
+
+
+def measure_import(module: str = 'app.main') -> float:
+    """
+    :param module: Module to import in a fresh interpreter
+    :return: Seconds taken by the import alone
+    """
+    script = f'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+    output = subprocess.run(
+        [sys.executable, '-c', script], cwd=_ROOT, env=_environment(), check=True, capture_output=True, text=True
+    )
+    return float(output.stdout.strip())
+
+
+async def measure_first_publish(logger_factory: LoggerFactory, plugin: str, timeout: float, verbosity: str) -> float:
+    """
+    Spawns the application against a simulated inverter and a local broker
+    :param logger_factory: Factory for creating a logger
+    :param plugin: Plugin alias to load
+    :param timeout: Seconds to wait for the first message
+    :param verbosity: Log level of the application
+    :return: Seconds from spawning the process until the broker received its first PUBLISH
+    :raises RuntimeError: When the application exits or times out without publishing
+    """
+    broker, device = MinimalBroker(), SocketSimulatorServer(logger_factory)
+    broker_port, device_url = await broker.start(), await device.start()
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'benchmarks.startup', '--child',
+        '--broker-port', str(broker_port), '--device-url', device_url, '--plugin', plugin,
+        '--verbosity', verbosity,
+        cwd=_ROOT, env=_environment()
+    )
+    exited = asyncio.ensure_future(process.wait())
+    try:
+        done, _ = await asyncio.wait((broker.first_publish, exited), timeout=timeout, return_when=FIRST_COMPLETED)
+        if broker.first_publish not in done:
+            reason = f'exited with code {process.returncode}' if exited in done else f'timed out after {timeout}s'
+            raise RuntimeError(f'Application {reason} before publishing')
+        return broker.first_publish.result() - started
+    finally:
+        if process.returncode is None:
+            process.kill()
+        await exited
+        await broker.close()
+        await device.close()
+
+
+def _run_child(broker_port: int, device_url: str, plugin: str, verbosity: str) -> None:
+    # imported here so the parent process stays free of application modules
+    from dependency_injector import providers
+
+    from app.main import Application
+    from common.helper import LoggerFactory
+    from common.model import Configuration, DeviceConfig, MQTTConfig
+    from di import ConfigurationProvider
+
+    configuration = Configuration(
+        mqtt=MQTTConfig(topic='benchmark', host='127.0.0.1', port=broker_port, username='', password=''),
+        verbosity=verbosity,
+        plugin=plugin,
+        device=DeviceConfig(interface=device_url, baud_rate=2400, is_serial=True)
+    )
+    ConfigurationProvider.configuration_ioc.override(providers.Object(configuration))
+    asyncio.run(Application(configuration, LoggerFactory(configuration)).run())
+
+
+def _report(name: str, samples: List[float], budget: Optional[float]) -> bool:
+    median = statistics.median(samples)
+    within_budget = budget is None or median <= budget
+    limit = 'no budget' if budget is None else f'budget {budget * 1000:.1f} ms'
+    status = 'ok' if within_budget else 'EXCEEDED'
+    print(f'{name}: median {median * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms ({limit}) {status}')
+    return within_budget
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh processes per measurement')
+    parser.add_argument('--import-budget', type=float, help='Seconds allowed for a cold import of app.main')
+    parser.add_argument('--publish-budget', type=float, help='Seconds allowed until the first message is published')
+    parser.add_argument('--plugin', default='axpert-king-5kw', help='Plugin alias to load')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for the first message')
+    parser.add_argument('--skip-publish', action='store_true', help='Only measure the import time')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--broker-port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--device-url', help=argparse.SUPPRESS)
+    parser.add_argument('--verbosity', default='WARNING', help='Log level of the benchmark and the application')
+    options = parser.parse_args(arguments)
+
+    if options.child:
+        _run_child(options.broker_port, options.device_url, options.plugin, options.verbosity)
+        return 0
+
+    within_budget = _report('import app.main', [measure_import() for _ in range(options.runs)], options.import_budget)
+    if not options.skip_publish:
+        try:
+            # the parsed options carry the `verbosity` the factory reads
+            logger_factory = LoggerFactory(options)
+            samples = [
+                asyncio.run(measure_first_publish(logger_factory, options.plugin, options.timeout, options.verbosity))
+                for _ in range(options.runs)
+            ]
+        except RuntimeError as e:
+            print(f'first publish: {e}')
+            return 1
+        within_budget = _report('first publish', samples, options.publish_budget) and within_budget
+    return 0 if within_budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
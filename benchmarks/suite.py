@@ -0,0 +1,293 @@
+"""
+Benchmarks of the poll -> decode -> publish path. Micro-benchmarks time the crc, frame encoding and response decoding,
+the end-to-end run polls a simulated inverter and publishes every sample to a local MQTT stand-in. Both stand-ins run
+in their own processes so the allocations measured are the application's alone:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --save-baseline
+
+Results are compared with the saved baseline, the run fails when a metric is worse than the baseline by more than
+the tolerance. Without a baseline the results are saved as the baseline
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from dataclasses import replace
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from asyncio.subprocess import Process
+
+    from common.helper import LoggerFactory
+    from common.model import Configuration
+    from engine.helper import PluginRegistry
+
+_PLUGIN = 'axpert-king-5kw'
+_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Metric(NamedTuple):
+    value: float
+    unit: str
+    # whether a larger value is an improvement e.g. samples per second
+    higher_is_better: bool = False
+
+
+def _nanoseconds_per_call(function: Callable[[], object], number: int, repeat: int = 5) -> float:
+    # the fastest repetition is the one least disturbed by the rest of the system
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e9
+
+
+def configure(verbosity: str) -> 'Configuration':
+    """
+    Installs a configuration for the benchmarked components in place of the one read from the settings
+    :param verbosity: Log level, debug logging would dominate the measurements
+    :return: The installed configuration
+    """
+    from dependency_injector import providers
+
+    from common.model import Configuration, MQTTConfig
+    from di import ConfigurationProvider
+
+    configuration = Configuration(
+        mqtt=MQTTConfig(topic='benchmark', host='127.0.0.1', port=1883, username='', password=''),
+        verbosity=verbosity,
+        plugin=_PLUGIN
+    )
+    ConfigurationProvider.configuration_ioc.override(providers.Object(configuration))
+    return configuration
+
+
+def _create_registry(logger_factory: 'LoggerFactory') -> 'PluginRegistry':
+    from di.dependencies import FrameCacheProvider
+    from engine.helper import PluginRegistry, PluginUtility
+
+    registry = PluginRegistry(logger_factory, PluginUtility(logger_factory), FrameCacheProvider.frame_cache_ioc())
+    registry.index()
+    return registry
+
+
+def run_micro_benchmarks(number: int) -> Dict[str, Metric]:
+    """
+    :param number: Calls per repetition
+    :return: Nanoseconds per call of every micro-benchmark
+    """
+    from di import LoggerProvider
+    from processor.helper import CyclicRedundancyCodeHelper, ResponseFrameParser
+    from simulator import InverterSimulator
+
+    logger_factory = LoggerProvider.logger_factory_ioc()
+    crc_calculator = CyclicRedundancyCodeHelper(logger_factory)
+    decoder = _create_registry(logger_factory).load(_PLUGIN).response_decoders['QPIGS']
+    frame = InverterSimulator().respond(bytes(crc_calculator.command_with_crc('QPIGS')))
+
+    def decode() -> object:
+        return decoder.decode(ResponseFrameParser.parse(frame).payload)
+
+    return {
+        'calculate_crc': Metric(_nanoseconds_per_call(lambda: crc_calculator.calculate_crc('QPIGS'), number), 'ns'),
+        'frame_encoding': Metric(
+            _nanoseconds_per_call(lambda: bytes(crc_calculator.command_with_crc('QPIGS')), number), 'ns'
+        ),
+        'response_decoding': Metric(_nanoseconds_per_call(decode, number), 'ns')
+    }
+
+
+async def _measure_allocations(cycle: Callable[[], Awaitable[None]], cycles: int) -> Dict[str, Metric]:
+    peaks = []
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        for _ in range(cycles):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            await cycle()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    gc.collect()
+    return {
+        'allocated_kib_per_cycle': Metric(statistics.median(peaks) / 1024, 'KiB'),
+        'retained_blocks_per_cycle': Metric(max(0, sys.getallocatedblocks() - blocks) / cycles, 'blocks')
+    }
+
+
+async def _spawn(*arguments: str) -> Tuple['Process', str]:
+    """
+    :param arguments: Module to run and its arguments, the module prints its address on the first line of its output
+    :return: The process and the address it printed
+    :raises RuntimeError: When the process exits before printing its address
+    """
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', *arguments, cwd=_ROOT, stdout=asyncio.subprocess.PIPE
+    )
+    line = await asyncio.wait_for(process.stdout.readline(), 10)
+    if not line:
+        await process.wait()
+        raise RuntimeError(f'{arguments[0]} exited with code {process.returncode} before it was ready')
+    return process, line.decode().strip()
+
+
+async def _terminate(process: Optional['Process']) -> None:
+    if process is not None and process.returncode is None:
+        process.terminate()
+        await process.wait()
+
+
+async def run_end_to_end(configuration: 'Configuration', cycles: int, device_latency: float) -> Dict[str, Metric]:
+    """
+    Polls the status of a simulated inverter and publishes every field of each sample
+    :param configuration: Configuration installed with `configure`, the broker address is replaced by a local one
+    :param cycles: Poll cycles to time
+    :param device_latency: Seconds the simulated device takes to answer
+    :return: Throughput, latency and allocations of a poll cycle
+    """
+    from broker import Publisher
+    from broker.helper import create_default_client
+    from common.model import DeviceConfig
+    from di import LoggerProvider
+    from di.dependencies import ConnectionPoolProvider, DispatcherProvider
+
+    broker = device_server = dispatcher = publisher = client_task = None
+    try:
+        broker, port = await _spawn('benchmarks.fixtures')
+        device_server, interface = await _spawn(
+            'simulator', '--latency', str(device_latency), '--seed', '1', '--verbosity', 'WARNING'
+        )
+        mqtt = replace(configuration.mqtt, host='127.0.0.1', port=int(port))
+        logger_factory = LoggerProvider.logger_factory_ioc()
+        logger = logger_factory.create_logger(__name__)
+        device = DeviceConfig(interface=interface, baud_rate=2400, is_serial=True, name='benchmark')
+        dispatcher = DispatcherProvider.dispatcher_ioc(device_configuration=device)
+        inverter = _create_registry(logger_factory).inverter(_PLUGIN, device, dispatcher)
+
+        publisher = Publisher(logger, create_default_client(logger, mqtt), mqtt)
+        connected = asyncio.Event()
+        publisher.add_connect_listener(connected.set)
+        client_task = asyncio.create_task(publisher.start())
+
+        async def cycle() -> None:
+            sample = await inverter.fetch_status()
+            if sample is None:
+                raise RuntimeError('No status received from the simulated inverter')
+            result = await publisher.publish_message({f'benchmark/{key}': value for key, value in sample})
+            if not result:
+                raise RuntimeError(f'Unable to publish sample: {result.failures}')
+
+        await asyncio.wait_for(connected.wait(), 10)
+        for _ in range(min(20, cycles)):
+            await cycle()
+        latencies: List[float] = []
+        started = time.perf_counter()
+        for _ in range(cycles):
+            cycle_started = time.perf_counter()
+            await cycle()
+            latencies.append(time.perf_counter() - cycle_started)
+        elapsed = time.perf_counter() - started
+        percentiles = statistics.quantiles(latencies, n=100)
+        metrics = {
+            'samples_per_second': Metric(cycles / elapsed, 'samples/s', higher_is_better=True),
+            'cycle_p50': Metric(percentiles[49] * 1000, 'ms'),
+            'cycle_p99': Metric(percentiles[98] * 1000, 'ms')
+        }
+        metrics.update(await _measure_allocations(cycle, min(cycles, 200)))
+        return metrics
+    finally:
+        # set up may have stopped half way, only what was created is torn down
+        if publisher is not None:
+            publisher.stop()
+        if client_task is not None:
+            await client_task
+        if dispatcher is not None:
+            await dispatcher.stop()
+        ConnectionPoolProvider.connection_pool_ioc().close()
+        await _terminate(device_server)
+        await _terminate(broker)
+
+
+def compare(
+        results: Dict[str, Metric],
+        baseline: Dict[str, Dict],
+        tolerance: float,
+        absolute_tolerance: float = 1.0
+) -> List[str]:
+    """
+    :param results: Metrics of this run
+    :param baseline: Metrics of the baseline as saved by `save`
+    :param tolerance: Fraction by which a metric may be worse than its baseline
+    :param absolute_tolerance: Value, in the unit of the metric, a metric with a baseline of 0 may grow to e.g. blocks
+    retained per cycle after a baseline without leaks
+    :return: Description of every metric that regressed
+    """
+    regressions = []
+    for name, metric in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if not reference['value']:
+            # no fraction of 0 is worse than 0, a metric that starts growing is compared with the absolute tolerance
+            if not metric.higher_is_better and metric.value > absolute_tolerance:
+                regressions.append(
+                    f'{name}: {metric.value:.2f} {metric.unit} is above {absolute_tolerance:.2f} with a baseline of 0'
+                )
+            continue
+        change = (metric.value - reference['value']) / reference['value']
+        if metric.higher_is_better:
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                f'{name}: {metric.value:.2f} {metric.unit} is {change:.0%} worse than {reference["value"]:.2f}'
+            )
+    return regressions
+
+
+def save(path: str, results: Dict[str, Metric]) -> None:
+    with open(path, 'w') as file:
+        json.dump({name: metric._asdict() for name, metric in results.items()}, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cycles', type=int, default=500, help='Poll cycles of the end-to-end run')
+    parser.add_argument('--number', type=int, default=20000, help='Calls per repetition of a micro-benchmark')
+    parser.add_argument('--device-latency', type=float, default=0.0, help='Seconds the simulated device takes')
+    parser.add_argument('--baseline', default=_BASELINE, help='Baseline to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Replace the baseline with this run')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Fraction a metric may regress by')
+    parser.add_argument(
+        '--absolute-tolerance', type=float, default=1.0, help='Value a metric with a baseline of 0 may grow to'
+    )
+    parser.add_argument('--skip-end-to-end', action='store_true', help='Only run the micro-benchmarks')
+    parser.add_argument('--verbosity', default='WARNING', help='Log level of the benchmarked components')
+    options = parser.parse_args(arguments)
+
+    configuration = configure(options.verbosity)
+    results = run_micro_benchmarks(options.number)
+    if not options.skip_end_to_end:
+        results.update(asyncio.run(run_end_to_end(configuration, options.cycles, options.device_latency)))
+    for name, metric in results.items():
+        print(f'{name:<28}{metric.value:>12.2f} {metric.unit}')
+
+    if options.save_baseline or not os.path.exists(options.baseline):
+        save(options.baseline, results)
+        print(f'Saved baseline to {options.baseline}')
+        return 0
+    with open(options.baseline) as file:
+        regressions = compare(results, json.load(file), options.tolerance, options.absolute_tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,11 @@
-from .brokers import Publisher, Subscriber
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .brokers import Publisher, Subscriber
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'Publisher': '.brokers',
+    'Subscriber': '.brokers'
+})
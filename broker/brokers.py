@@ -1,21 +1,30 @@
+import asyncio
 from abc import ABC
 from logging import Logger
-from typing import Dict, Optional, Any
+from typing import TYPE_CHECKING, Dict, Optional, Any, Awaitable, Callable, List
 
 from paho.mqtt.reasoncodes import ReasonCodes
-from paho.mqtt.client import Client, MQTTMessage, MQTTMessageInfo
+from paho.mqtt.client import Client, MQTTMessage, MQTTMessageInfo, MQTT_ERR_SUCCESS, error_string
 from paho.mqtt.properties import Properties
 
+from common.helper import MetricsRegistry
 from common.model.settings import MQTTConfig
+from .helper import AsyncioClientLoop
+from .model import PublishResult
+
+if TYPE_CHECKING:
+    from dispatcher import CommandIngestor
 
 
 class Core(ABC):
-    _main_topic = 'homeassistant/sensor'
+    _discovery_prefix = 'homeassistant'
+    _main_topic = f'{_discovery_prefix}/sensor'
 
     def __init__(self, logger: Logger, client: Client, config: MQTTConfig) -> None:
         self._logger = logger
         self._client = client
         self._config = config
+        self._client_loop: Optional[AsyncioClientLoop] = None
 
     def _on_connect(
             self,
@@ -55,17 +64,19 @@ class Core(ABC):
         """
         self._client.on_connect = self._on_connect
         self._client.on_message = self._on_message
-        self._client.connect_async(self._config.host, self._config.port)
-        self._client.loop_forever(timeout=15.0, retry_first_connection=True)
+        self._client_loop = AsyncioClientLoop(self._logger, self._client)
+        await self._client_loop.run(self._config.host, self._config.port)
 
     async def start(self) -> None:
         """
-        Broker starting point
+        Broker starting point, runs on the current event loop until `stop` is called or the task is cancelled
         """
         try:
             await self._connect_to_client()
         except KeyboardInterrupt as e:
             self._logger.error('Publisher interrupted by user cancellation', exc_info=e)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             self._logger.error('Publisher unable to connect to host', exc_info=e)
         finally:
@@ -74,42 +85,262 @@ class Core(ABC):
                 self._client.unsubscribe(f'{self._main_topic}/{self._config.topic}')
                 self._client.disconnect()
 
+    def stop(self) -> None:
+        """
+        Disconnects from the broker and lets `start` return
+        """
+        if self._client_loop is not None:
+            self._client_loop.stop()
+
 
 class Publisher(Core):
+    """
+    Publishes batches of messages without waiting on the broker for each one, up to `max_in_flight` messages are
+    handed to the client before their completion is confirmed through `on_publish`
+    """
+
+    def __init__(
+            self,
+            logger: Logger,
+            client: Client,
+            config: MQTTConfig,
+            max_in_flight: int = 20,
+            publish_timeout: float = 10.0,
+            metrics: Optional[MetricsRegistry] = None
+    ) -> None:
+        """
+        :param logger: Logger to log messages to
+        :param client: Client to publish with
+        :param config: Broker configuration
+        :param max_in_flight: Maximum number of messages handed to the client but not yet confirmed
+        :param publish_timeout: Seconds to wait for a batch before its unconfirmed messages are reported as failed
+        :param metrics: Registry to record publish latency and outcomes in
+        """
+        super().__init__(logger, client, config)
+        self._max_in_flight = max_in_flight
+        self._publish_timeout = publish_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight_limit: Optional[asyncio.Semaphore] = None
+        # message id -> future resolved once the client confirms the message was sent
+        self._in_flight: Dict[int, asyncio.Future] = {}
+        self._connect_listeners: List[Callable[[], None]] = []
+        metrics = metrics if metrics is not None else MetricsRegistry()
+        self._ack_latency = metrics.histogram(
+            'mppt_publish_ack_seconds', 'Time from handing a message to the client until it was sent to the broker'
+        )
+        self._published = metrics.counter('mppt_published_messages_total', 'Messages sent to the broker')
+        self._publish_failures = metrics.counter('mppt_publish_failures_total', 'Messages that could not be published')
+        metrics.gauge(
+            'mppt_publish_in_flight', 'Messages handed to the client but not yet confirmed',
+            lambda: len(self._in_flight)
+        )
+        self._client.on_connect = self._on_connect
+        self._client.on_publish = self._on_publish
+        self._client.on_disconnect = self._on_disconnect
 
     def _on_connect(self, client: Client, user_data: Optional[Any], flags: Dict, reason_code: ReasonCodes,
                     properties: Properties) -> None:
         super()._on_connect(client, user_data, flags, reason_code, properties)
+        if reason_code == 0:
+            for listener in self._connect_listeners:
+                listener()
 
     def _on_message(self, client: Client, user_data: Optional[Any], message: MQTTMessage) -> None:
         super()._on_message(client, user_data, message)
 
-    async def __invoke_publish(self, key: str, value: Any) -> MQTTMessageInfo:
-        info = self._client.publish(
-            topic=f'{self._main_topic}/{self._config.topic}/{key}',
-            payload=value,
-            qos=0,
-            retain=True,
-            properties=None
-        )
-        info.wait_for_publish()
-        return info
+    @property
+    def config(self) -> MQTTConfig:
+        return self._config
+
+    def topic_for(self, key: str, component: str = 'sensor') -> str:
+        """
+        :param key: Topic relative to the configured topic
+        :param component: Home Assistant component the topic belongs to e.g. `sensor` or `switch`
+        :return: The full topic a message for `key` is published on
+        """
+        return f'{self._discovery_prefix}/{component}/{self._config.topic}/{key}'
+
+    def add_connect_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registers a callback for every successful (re)connection, it is called from `on_connect` of the client
+        :param listener: Callback without arguments
+        """
+        self._connect_listeners.append(listener)
+
+    def _on_publish(self, client: Client, user_data: Optional[Any], mid: int) -> None:
+        """
+        Callback for when a message has been sent to the broker, completion is always handed to the event loop
+        :param client: The client_ioc instance for this callback
+        :param user_data: The private user data as set upon client_ioc creation
+        :param mid: Message id returned by `publish`
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.__complete, mid, None)
+
+    def _on_disconnect(
+            self,
+            client: Client,
+            user_data: Optional[Any],
+            reason_code: Optional[ReasonCodes],
+            properties: Optional[Properties] = None
+    ) -> None:
+        """
+        Callback for when the client disconnects, messages that were not confirmed yet are reported as failed
+        :param client: The client_ioc instance for this callback
+        :param user_data: The private user data as set upon client_ioc creation
+        :param reason_code: The MQTT v5.0 reason code for the disconnection
+        :param properties: The MQTT v5.0 properties returned from the broker
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.__fail_in_flight, f'Disconnected: {reason_code}')
+
+    def __complete(self, mid: int, error: Optional[str]) -> None:
+        future = self._in_flight.pop(mid, None)
+        if future is not None and not future.done():
+            future.set_result(error)
+
+    def __fail_in_flight(self, error: str) -> None:
+        for mid in list(self._in_flight):
+            self.__complete(mid, error)
+
+    def __ensure_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._in_flight_limit = asyncio.Semaphore(self._max_in_flight)
+            self._in_flight.clear()
+
+    def __observe_ack(self, sent_at: float) -> Callable[[asyncio.Future], None]:
+        def observe(future: asyncio.Future) -> None:
+            if not future.cancelled() and future.result() is None:
+                self._ack_latency.observe(self._loop.time() - sent_at)
+        return observe
 
-    async def publish_message(self, payload: Dict) -> bool:
+    async def __invoke_publish(self, topic: str, value: Any, retain: bool, deadline: float) -> asyncio.Future:
+        future = self._loop.create_future()
+        try:
+            if self._in_flight_limit.locked():
+                await asyncio.wait_for(self._in_flight_limit.acquire(), max(0.0, deadline - self._loop.time()))
+            else:
+                await self._in_flight_limit.acquire()
+        except asyncio.TimeoutError:
+            future.set_result('Timed out waiting for a free publish slot')
+            return future
+        future.add_done_callback(lambda _: self._in_flight_limit.release())
+        try:
+            info: MQTTMessageInfo = self._client.publish(
+                topic=topic,
+                payload=value,
+                qos=0,
+                retain=retain,
+                properties=None
+            )
+        except Exception as e:
+            future.set_result(str(e))
+            return future
+        if info.rc != MQTT_ERR_SUCCESS:
+            future.set_result(error_string(info.rc))
+        else:
+            # the confirmation is delivered through the event loop so it always runs after this registration
+            self._in_flight[info.mid] = future
+            future.add_done_callback(self.__observe_ack(self._loop.time()))
+        return future
+
+    async def __publish_batch(self, payload: Dict[str, Any], component: str, retain: bool) -> PublishResult:
+        deadline = self._loop.time() + self._publish_timeout
+        futures: Dict[str, asyncio.Future] = {}
+        for key, value in payload.items():
+            futures[key] = await self.__invoke_publish(self.topic_for(key, component), value, retain, deadline)
+        pending = set()
+        if futures:
+            _, pending = await asyncio.wait(futures.values(), timeout=max(0.0, deadline - self._loop.time()))
+        published, failures = [], {}
+        for key, future in futures.items():
+            if future in pending:
+                future.set_result('Timed out waiting for publish confirmation')
+            error = future.result()
+            if error is None:
+                published.append(key)
+            else:
+                failures[key] = error
+        self._in_flight = {mid: future for mid, future in self._in_flight.items() if not future.done()}
+        self._published.inc(len(published))
+        self._publish_failures.inc(len(failures))
+        if failures:
+            self._logger.warning(f'Unable to publish {len(failures)} of {len(futures)} messages: {failures}')
+        return PublishResult(published, failures)
+
+    def publish_batch(
+            self,
+            payload: Dict[str, Any],
+            component: str = 'sensor',
+            retain: bool = True
+    ) -> Awaitable[PublishResult]:
+        """
+        Queues every message of `payload` for publishing
+        :param payload: Values keyed by the topic relative to the configured topic
+        :param component: Home Assistant component the topics belong to
+        :param retain: Whether the broker keeps the last message of each topic for new subscribers
+        :return: Awaitable resolving once every message has been confirmed or has failed
+        """
+        self.__ensure_loop()
+        return self._loop.create_task(self.__publish_batch(payload, component, retain))
+
+    async def publish_message(
+            self,
+            payload: Dict[str, Any],
+            component: str = 'sensor',
+            retain: bool = True
+    ) -> PublishResult:
         """
         Publish a message on a topic.
-        :param payload: Message to send
+        :param payload: Values keyed by the topic relative to the configured topic
+        :param component: Home Assistant component the topics belong to
+        :param retain: Whether the broker keeps the last message of each topic for new subscribers
+        :return: Result of the batch, falsy when any message failed
         """
         if not self._client.is_connected():
             self._logger.warning('Publisher cannot send message as client has been disconnected')
-            return False
-
-        for _key, _value in payload:
-            info = await self.__invoke_publish(_key, _value)
-            self._logger.debug(f'Publish end with info: {info}')
+            self._publish_failures.inc(len(payload))
+            return PublishResult([], {key: 'Client is not connected' for key in payload})
+        return await self.publish_batch(payload, component, retain)
 
 
 class Subscriber(Core):
+    """
+    Receives commands published on `<topic>/<device name>/command` and hands them to the ingestor of that device
+    on the event loop the ingestors were registered from
+    """
+    _COMMAND_SUFFIX: str = '/command'
+
+    def __init__(self, logger: Logger, client: Client, config: MQTTConfig) -> None:
+        super().__init__(logger, client, config)
+        self._prefix = f'{self._main_topic}/{self._config.topic}/'
+        self._ingestors: Dict[str, 'CommandIngestor'] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client.message_callback_add(self.command_topic, self._on_message)
+
+    @property
+    def command_topic(self) -> str:
+        """
+        :return: Topic filter matching the command topic of every device
+        """
+        return f'{self._prefix}+{self._COMMAND_SUFFIX}'
+
+    def register(self, device_name: str, ingestor: 'CommandIngestor') -> None:
+        """
+        Routes commands for a device to its ingestor, must be called from the event loop the ingestor runs on
+        :param device_name: Name of the device as used in topics
+        :param ingestor: Ingestor handing commands to the dispatcher of the device
+        """
+        self._loop = asyncio.get_running_loop()
+        self._ingestors[device_name] = ingestor
+
+    def subscribe(self) -> None:
+        """
+        Subscribes to the command topics, needs to be repeated after every reconnection
+        """
+        self._client.subscribe(self.command_topic)
 
     def _on_connect(
             self,
@@ -119,9 +350,9 @@ class Subscriber(Core):
             reason_code: ReasonCodes,
             properties: Properties
     ) -> None:
-        if reason_code.value:
+        if reason_code == 0:
             self._logger.debug(f'Connected: {reason_code.getName()} -> {flags}')
-            client.subscribe(f'{self._main_topic}/{self._config.topic}')
+            self.subscribe()
         else:
             self._logger.debug(f'Failed to connect: {reason_code.getName()} -> {flags} | {user_data}')
 
@@ -131,5 +362,20 @@ class Subscriber(Core):
             user_data: Optional[Any],
             message: MQTTMessage
     ) -> None:
-        """TODO: Call dispatch module to handle received commands/message"""
-        self._logger.info(f'New message received: {message.topic} -> {str(message.payload)}')
+        """
+        Callback for when a command is received, the command is handed to the event loop without waiting on it
+        :param client: The client_ioc instance for this callback
+        :param user_data: The private user data as set upon client_ioc creation
+        :param message: An instance of MQTTMessage. This is a class with members topic, payload, qos, retain.
+        """
+        topic = message.topic
+        if not topic.startswith(self._prefix) or not topic.endswith(self._COMMAND_SUFFIX):
+            self._logger.debug(f'Ignored message on topic: {topic}')
+            return
+        device_name = topic[len(self._prefix):-len(self._COMMAND_SUFFIX)]
+        ingestor = self._ingestors.get(device_name)
+        if ingestor is None or self._loop is None or self._loop.is_closed():
+            self._logger.warning(f'No device registered for command topic: {topic}')
+            return
+        command = message.payload.decode('ascii', errors='replace').strip()
+        self._loop.call_soon_threadsafe(ingestor.submit, command)
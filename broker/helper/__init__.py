@@ -1 +1,16 @@
-from .factory import create_default_client
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .factory import create_default_client
+    from .filters import DeadbandFilter
+    from .encoders import StateEncoder
+    from .loops import AsyncioClientLoop
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'create_default_client': '.factory',
+    'DeadbandFilter': '.filters',
+    'StateEncoder': '.encoders',
+    'AsyncioClientLoop': '.loops'
+})
@@ -0,0 +1,52 @@
+import math
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, Type
+
+from processor.model import DecodedResponse
+
+
+def _encode_value(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        return float.__repr__(value) if math.isfinite(value) else 'null'
+    return encode_basestring_ascii(str(value))
+
+
+class StateEncoder:
+    """
+    Serialises decoded responses into compact JSON documents. An encoder function is compiled once per record type
+    with the keys already escaped, so each sample only converts its values
+    """
+
+    def __init__(self) -> None:
+        self._encoders: Dict[Type[DecodedResponse], Callable[[DecodedResponse], str]] = {}
+
+    @staticmethod
+    def __compile(record_type: Type[DecodedResponse]) -> Callable[[DecodedResponse], str]:
+        namespace: Dict[str, Any] = {'value': _encode_value}
+        parts = []
+        for position, field in enumerate(record_type._fields):
+            separator = ',' if position else '{'
+            namespace[f'key_{position}'] = f'{separator}{encode_basestring_ascii(field)}:'
+            parts.append(f'key_{position}, value(record.{field})')
+        body = ', '.join(parts) if parts else "'{'"
+        exec(f"def encode(record):\n    return ''.join(({body}, '}}'))", namespace)
+        return namespace['encode']
+
+    def encode(self, record: DecodedResponse) -> str:
+        """
+        :param record: Response decoded by a compiled `ResponseDecoder`
+        :return: The fields of `record` as JSON object
+        """
+        record_type = type(record)
+        encoder = self._encoders.get(record_type)
+        if encoder is None:
+            encoder = self._encoders[record_type] = self.__compile(record_type)
+        return encoder(record)
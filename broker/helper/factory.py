@@ -1,20 +1,23 @@
 from logging import Logger
-
-from paho.mqtt.client import Client, MQTTv5
+from typing import TYPE_CHECKING
 
 from common.model import MQTTConfig
 
+if TYPE_CHECKING:
+    from paho.mqtt.client import Client
+
 
 def create_default_client(
         logger: Logger,
         config: MQTTConfig
-) -> Client:
+) -> 'Client':
     """
     Helper factory for creating a default client_ioc
     :param logger: A custom logger to log messages to
     :param config: Client configuration_ioc
     :return: A configured client_ioc
     """
+    from paho.mqtt.client import Client, MQTTv5
     client = Client(protocol=MQTTv5)
     client.enable_logger(logger)
     client.username_pw_set(
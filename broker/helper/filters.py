@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from common.model import Deadband, PublishConfig
+from ..model import PublishResult
+
+
+class DeadbandFilter:
+    """
+    Change detection in front of the `Publisher`, only values that moved past their deadband since they were last
+    published are selected. Every value is selected again once `full_refresh_interval` passed since it was last
+    published or after a reconnect, tracked per topic so one filter can be shared by every device and command
+    """
+
+    def __init__(self, config: Optional[PublishConfig] = None) -> None:
+        """
+        :param config: Deadbands and refresh interval, defaults to publishing any change
+        """
+        self._config = config if config is not None else PublishConfig()
+        # topic -> last value confirmed as published
+        self._published: Dict[str, Any] = {}
+        self._deadbands: Dict[str, Deadband] = {}
+        # topic -> monotonic time the value is selected again even when unchanged, topics missing are owed a refresh
+        self._refresh_due: Dict[str, float] = {}
+        # set from the callbacks of the client on reconnect
+        self._refresh_requested = threading.Event()
+
+    def __deadband_for(self, topic: str) -> Deadband:
+        deadband = self._deadbands.get(topic)
+        if deadband is None:
+            deadband = self._config.deadband
+            for suffix, override in self._config.field_deadbands.items():
+                if topic.endswith(suffix):
+                    deadband = override
+                    break
+            self._deadbands[topic] = deadband
+        return deadband
+
+    @staticmethod
+    def __is_numeric(value: Any) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    def __has_changed(self, topic: str, value: Any) -> bool:
+        if topic not in self._published:
+            return True
+        last = self._published[topic]
+        if not self.__is_numeric(value) or not self.__is_numeric(last):
+            return value != last
+        delta = abs(value - last)
+        if delta == 0:
+            return False
+        deadband = self.__deadband_for(topic)
+        if deadband.absolute == 0 and deadband.percent == 0:
+            return True
+        if deadband.absolute and delta > deadband.absolute:
+            return True
+        return bool(deadband.percent) and last != 0 and delta * 100.0 / abs(last) > deadband.percent
+
+    def request_refresh(self) -> None:
+        """
+        Selects every value again, on the next call to `select` that carries it, e.g. after the client reconnected. Safe
+        to call from any thread
+        """
+        self._refresh_requested.set()
+
+    def select(self, payload: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        :param payload: Values keyed by topic
+        :param now: Monotonic time of the sample, defaults to the current time
+        :return: The part of `payload` that should be published
+        """
+        now = time.monotonic() if now is None else now
+        if self._refresh_requested.is_set():
+            self._refresh_requested.clear()
+            self._refresh_due.clear()
+        return {
+            topic: value for topic, value in payload.items()
+            if now >= self._refresh_due.get(topic, now) or self.__has_changed(topic, value)
+        }
+
+    def acknowledge(self, selected: Dict[str, Any], result: PublishResult, now: Optional[float] = None) -> None:
+        """
+        Remembers the values that were published, failed values are selected again on the next sample
+        :param selected: Payload returned by `select`
+        :param result: Result of publishing `selected`
+        :param now: Monotonic time of the sample, defaults to the current time
+        """
+        now = time.monotonic() if now is None else now
+        for topic in result.published:
+            if topic in selected:
+                self._published[topic] = selected[topic]
+                self._refresh_due[topic] = now + self._config.full_refresh_interval
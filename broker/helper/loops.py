@@ -0,0 +1,118 @@
+import asyncio
+import socket
+from logging import Logger
+from typing import Any, Optional
+
+from paho.mqtt.client import Client, MQTT_ERR_SUCCESS
+
+
+class AsyncioClientLoop:
+    """
+    Drives a paho client from the readiness callbacks of an asyncio loop instead of `loop_forever` or `loop_start`,
+    socket reads and writes happen when the socket is ready and `loop_misc` runs from a task once per second.
+    The client, the publisher and device I/O all share the same event loop and thread
+    """
+
+    def __init__(
+            self,
+            logger: Logger,
+            client: Client,
+            min_reconnect_delay: float = 1.0,
+            max_reconnect_delay: float = 60.0
+    ) -> None:
+        """
+        :param logger: Logger to log messages to
+        :param client: Client to drive
+        :param min_reconnect_delay: Seconds to wait before the first reconnection attempt
+        :param max_reconnect_delay: Upper bound of the doubling delay between reconnection attempts
+        """
+        self._logger = logger
+        self._client = client
+        self._min_reconnect_delay = min_reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._misc: Optional[asyncio.Task] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._stopped: Optional[asyncio.Event] = None
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def _on_socket_open(self, client: Client, user_data: Optional[Any], sock: socket.socket) -> None:
+        self._closed.clear()
+        self._loop.add_reader(sock, self.__read)
+        if self._misc is None or self._misc.done():
+            self._misc = self._loop.create_task(self.__loop_misc())
+
+    def _on_socket_close(self, client: Client, user_data: Optional[Any], sock: socket.socket) -> None:
+        self._loop.remove_reader(sock)
+        self._loop.remove_writer(sock)
+        self._closed.set()
+
+    def _on_socket_register_write(self, client: Client, user_data: Optional[Any], sock: socket.socket) -> None:
+        self._loop.add_writer(sock, self.__write)
+
+    def _on_socket_unregister_write(self, client: Client, user_data: Optional[Any], sock: socket.socket) -> None:
+        self._loop.remove_writer(sock)
+
+    def __read(self) -> None:
+        self._client.loop_read()
+
+    def __write(self) -> None:
+        self._client.loop_write()
+
+    async def __loop_misc(self) -> None:
+        # keep alive pings and retries of unacknowledged messages, stops once the connection is gone
+        while self._client.loop_misc() == MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1.0)
+
+    async def __wait_unless_stopped(self, delay: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopped.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, host: str, port: int, keepalive: int = 60) -> None:
+        """
+        Connects to the broker and keeps reconnecting with an increasing delay until `stop` is called
+        :param host: Broker host
+        :param port: Broker port
+        :param keepalive: Seconds between keep alive pings
+        """
+        self._loop = asyncio.get_running_loop()
+        self._closed = asyncio.Event()
+        self._stopped = asyncio.Event()
+        delay = self._min_reconnect_delay
+        connected_once = False
+        while not self._stopped.is_set():
+            try:
+                if connected_once:
+                    self._client.reconnect()
+                else:
+                    # the tcp connect itself is blocking in paho, it is bounded by the connect timeout of the client
+                    self._client.connect(host, port, keepalive)
+                    connected_once = True
+            except (OSError, ValueError) as e:
+                self._logger.warning(f'Unable to connect to broker {host}:{port}, retrying in {delay}s: {e}')
+                await self.__wait_unless_stopped(delay)
+                delay = min(delay * 2, self._max_reconnect_delay)
+                continue
+            delay = self._min_reconnect_delay
+            await self._closed.wait()
+            if not self._stopped.is_set():
+                self._logger.warning(f'Connection to broker {host}:{port} lost, reconnecting in {delay}s...')
+                await self.__wait_unless_stopped(delay)
+        if self._misc is not None:
+            self._misc.cancel()
+
+    def stop(self) -> None:
+        """
+        Disconnects from the broker, `run` returns once the socket is closed
+        """
+        if self._stopped is None:
+            return
+        self._stopped.set()
+        if self._closed.is_set():
+            return
+        self._client.disconnect()
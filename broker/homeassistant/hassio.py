@@ -1,26 +1,84 @@
+import asyncio
+import hashlib
+import re
+import time
 from abc import ABC
 import json
-from typing import Any
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
 
 from engine import InverterCore
+from engine.model import DeviceInfo
+from processor.helper import ResponseDecoder
+from processor.model import DecodedResponse
 from ..brokers import Publisher
+from ..helper import StateEncoder
 from common.helper import LoggerFactory
+from common.model import DeviceConfiguration, SensorPayload, SwitchPayload
+from common.model.payloads import Payload
 
 
 class HassIo(ABC):
     _TELEMETRY_TOPIC: str = '/telemetry/STATE'
     _TELEMETRY_HASS_TOPIC: str = '/telemetry/HASS_STATE'
     _TELEMETRY_SENSOR_TOPIC: str = '/telemetry/SENSOR'
+    # Home Assistant device classes of the units used in command specifications
+    _DEVICE_CLASSES: Dict[str, str] = {
+        'V': 'voltage',
+        'A': 'current',
+        'W': 'power',
+        'VA': 'apparent_power',
+        'Hz': 'frequency',
+        '°C': 'temperature'
+    }
 
     def __init__(
             self,
             logger_factory: LoggerFactory,
             inverter: InverterCore,
-            publisher: Publisher
+            publisher: Publisher,
+            encoder: Optional[StateEncoder] = None
     ) -> None:
         self._logger = logger_factory.create_logger(__name__)
         self._inverter = inverter
         self._publisher = publisher
+        self._encoder = encoder if encoder is not None else StateEncoder()
+
+    def state_topic(self, command: str) -> str:
+        """
+        :param command: Command the state is a response to e.g. QPIGS
+        :return: Topic, relative to the configured topic, holding the JSON document of the latest response
+        """
+        return f'{self._inverter.device_config.device_name}/{command.lower()}/state'
+
+    async def publish_response(self, response: DecodedResponse) -> None:
+        """
+        Publishes every field of a response as one JSON document on the state topic of its command
+        :param response: Response decoded by a compiled `ResponseDecoder`
+        """
+        await self.publish_state(self._encoder.encode(response), self.state_topic(response._command))
+
+    def create_sensor_payloads(self, decoder: ResponseDecoder) -> List[SensorPayload]:
+        """
+        Describes a sensor per field of a command. With `aggregate_state` enabled each sensor extracts its value from
+        the state document of the command, otherwise it reads the topic of the field
+        :param decoder: Decoder of the command
+        :return: Sensor payloads for discovery
+        """
+        aggregate = self._publisher.config.publish.aggregate_state
+        device_name = self._inverter.device_config.device_name
+        state_topic = self._publisher.topic_for(self.state_topic(decoder.name))
+        payloads = []
+        for field, description in decoder.descriptions.items():
+            unit = description if description in self._DEVICE_CLASSES or description == '%' else None
+            payloads.append(SensorPayload(
+                name=field.replace('_', ' ').capitalize(),
+                state_topic=state_topic if aggregate else self._publisher.topic_for(f'{device_name}/{field}'),
+                device_class=self._DEVICE_CLASSES.get(unit),
+                value_template=f'{{{{ value_json.{field} }}}}' if aggregate else '{{ value }}',
+                unit_of_measurement=unit
+            ))
+        return payloads
 
     async def publish_state(self, data: Any = None, topic: str = _TELEMETRY_TOPIC):
         if data is None:
@@ -31,17 +89,179 @@ class HassIo(ABC):
 
 
 class Discovery(HassIo):
+    """
+    Publishes the Home Assistant discovery configuration of an inverter. The configuration is generated once per
+    command and content-hashed, it is only published again when the hash changes or Home Assistant announces that it
+    came back online through its birth message. Nothing is generated until the device information is complete, the
+    serial number identifies every entity and would change once the device reports it
+    """
+    BIRTH_TOPIC: str = 'homeassistant/status'
+    # fetches of incomplete device information before the device name is used in place of the serial number
+    __MAX_ATTEMPTS: int = 5
 
-    async def broadcast_device_configuration(self, topic: str = HassIo._TELEMETRY_SENSOR_TOPIC):
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            inverter: InverterCore,
+            publisher: Publisher,
+            encoder: Optional[StateEncoder] = None,
+            switches: Optional[List[SwitchPayload]] = None,
+            retry_interval: float = 30.0
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param inverter: Plugin instance of the device
+        :param publisher: Publisher to send the configuration with
+        :param encoder: Encoder for state documents
+        :param switches: Switches of the device, published along with the sensors
+        :param retry_interval: Seconds between fetches of device information the device did not fully report
+        """
+        super().__init__(logger_factory, inverter, publisher, encoder)
+        self._switches = switches if switches is not None else []
+        self._retry_interval = retry_interval
+        self._device_information: Optional[DeviceInfo] = None
+        self._attempts = 0
+        self._fetched_at: Optional[float] = None
+        self._commands: List[str] = []
+        # (component, topic) -> serialised configuration, generated once per command
+        self._payloads: Dict[Tuple[str, str], str] = {}
+        self._payload_hash: Optional[str] = None
+        self._published_hash: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __fetch_device_information(self) -> Optional[DeviceInfo]:
+        """
+        :return: The device information, None while it is incomplete and fetching it again is worth a try
+        """
+        device_info = self._device_information
+        if device_info is not None and (device_info.is_complete or self._attempts >= self.__MAX_ATTEMPTS):
+            return device_info
+        now = time.monotonic()
+        if self._fetched_at is not None and now - self._fetched_at < self._retry_interval:
+            return None
+        self._fetched_at = now
+        self._attempts += 1
         device_info = await self._inverter.fetch_device_information()
-        device_info_state = json.dumps(device_info)
+        if device_info is None:
+            return None
+        self._device_information = device_info
+        if device_info.is_complete:
+            return device_info
+        device_name = self._inverter.device_config.device_name
+        if self._attempts < self.__MAX_ATTEMPTS:
+            self._logger.debug(f'Incomplete device information of device: {device_name}, retrying: {device_info}')
+            return None
+        self._logger.warning(f'Device: {device_name} did not report all of its information, using it as is')
+        return device_info
+
+    def __device_configuration(self) -> DeviceConfiguration:
+        device_info = self._device_information
+        return DeviceConfiguration(
+            connections=None,
+            identifiers=[device_info.serial_number or self._inverter.device_config.device_name],
+            name=device_info.device_name,
+            manufacturer=device_info.manufacturer,
+            model=device_info.model,
+            sw_version=device_info.firmware_version
+        )
+
+    @staticmethod
+    def __serialise(payload: Payload, unique_id: str, device: DeviceConfiguration) -> str:
+        document = asdict(payload)
+        document['unique_id'] = unique_id
+        document['device'] = asdict(device)
+        return json.dumps(document, sort_keys=True, separators=(',', ':'))
+
+    def __add_payloads(self, component: str, payloads: List[Payload], device: DeviceConfiguration) -> None:
+        prefix = re.sub(r'\W+', '_', device.identifiers[0]).lower()
+        for payload in payloads:
+            object_id = re.sub(r'\W+', '_', payload.name).lower()
+            key = f'{self._inverter.device_config.device_name}_{object_id}/config'
+            self._payloads[(component, key)] = self.__serialise(payload, f'{prefix}_{object_id}', device)
+
+    def __update_hash(self) -> None:
+        digest = hashlib.sha256()
+        for (component, key), payload in sorted(self._payloads.items()):
+            digest.update(f'{component}/{key}={payload}\n'.encode())
+        self._payload_hash = digest.hexdigest()
+
+    async def describe(self, *commands: str) -> None:
+        """
+        Adds the sensors of `commands` to the configuration, commands that were described before are skipped
+        :param commands: Commands whose responses are published e.g. QPIGS
+        """
+        commands = [command for command in commands if command not in self._commands]
+        if not commands and self._payload_hash is not None:
+            return
+        if await self.__fetch_device_information() is None:
+            # commands are left undescribed and picked up again with the next call
+            return
+        device = self.__device_configuration()
+        if self._payload_hash is None:
+            self.__add_payloads('switch', self._switches, device)
+        for command in commands:
+            decoder = self._inverter.response_decoders.get(command)
+            if decoder is None:
+                self._logger.warning(f'No decoder found for command: {command}, sensors will not be discovered')
+                continue
+            self.__add_payloads('sensor', self.create_sensor_payloads(decoder), device)
+            self._commands.append(command)
+        self.__update_hash()
+
+    async def broadcast_discovery(self, force: bool = False) -> bool:
+        """
+        Publishes the configuration when it changed since it was last published
+        :param force: Publish even when the configuration did not change
+        :return: True when the broker has the current configuration
+        """
+        self._loop = asyncio.get_running_loop()
+        if self._payload_hash is None:
+            await self.describe()
+            if self._payload_hash is None:
+                return False
+        if not force and self._payload_hash == self._published_hash:
+            return True
+        payload_hash = self._payload_hash
+        components: Dict[str, Dict[str, str]] = {}
+        for (component, key), payload in self._payloads.items():
+            components.setdefault(component, {})[key] = payload
+        published = True
+        for component, payloads in components.items():
+            result = await self._publisher.publish_message(payloads, component)
+            published = published and bool(result)
+        if published:
+            self._published_hash = payload_hash
+            self._logger.info(f'Published discovery configuration of {len(self._payloads)} entities')
+        else:
+            self._logger.warning('Discovery failed to publish message to broker')
+        return published
+
+    def on_status_message(self, payload: bytes) -> None:
+        """
+        Handles messages on `BIRTH_TOPIC`, the configuration is published again once Home Assistant is back online.
+        Safe to call from the callbacks of the client on any thread
+        :param payload: Message payload e.g. `online`
+        """
+        if payload.strip() != b'online':
+            return
+        self._published_hash = None
+        if self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.broadcast_discovery(), self._loop)
+
+    async def broadcast_device_configuration(self, topic: str = HassIo._TELEMETRY_SENSOR_TOPIC):
+        device_info = await self.__fetch_device_information()
+        if device_info is None:
+            return
+        device_info_state = json.dumps(dict(device_info))
         result = await self._publisher.publish_message({topic: device_info_state})
         if not result:
             self._logger.warning('Discovery failed to publish message to broker')
 
     async def broadcast_device_sensor_state(self, topic: str = HassIo._TELEMETRY_SENSOR_TOPIC):
-        device_info = await self._inverter.fetch_device_information()
-        device_info_state = json.dumps(device_info)
+        device_info = await self.__fetch_device_information()
+        if device_info is None:
+            return
+        device_info_state = json.dumps(dict(device_info))
         result = await self._publisher.publish_message({topic: device_info_state})
         if not result:
             self._logger.warning('Discovery failed to publish message to broker')
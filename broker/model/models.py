@@ -0,0 +1,13 @@
+from typing import Dict, NamedTuple, List
+
+
+class PublishResult(NamedTuple):
+    """
+    Outcome of publishing a batch, `failures` maps the topic of every message that could not be published to the
+    reason. A result is truthy only when every message was published
+    """
+    published: List[str]
+    failures: Dict[str, str]
+
+    def __bool__(self) -> bool:
+        return not self.failures
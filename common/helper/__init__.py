@@ -1,2 +1,24 @@
-from .helpers import FileSystem, Logging, LoggerFactory
-from .helpers import group_items_into_chucks
+from typing import TYPE_CHECKING
+
+from .imports import lazy_exports
+
+if TYPE_CHECKING:
+    from .helpers import FileSystem, Logging, LoggerFactory, group_items_into_chucks
+    from .loggers import DeferredQueueHandler, RateLimitFilter
+    from .metrics import Counter, Gauge, Histogram, MetricsRegistry
+    from .stores import RingBufferStore, StoredSample
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'FileSystem': '.helpers',
+    'Logging': '.helpers',
+    'LoggerFactory': '.helpers',
+    'group_items_into_chucks': '.helpers',
+    'DeferredQueueHandler': '.loggers',
+    'RateLimitFilter': '.loggers',
+    'Counter': '.metrics',
+    'Gauge': '.metrics',
+    'Histogram': '.metrics',
+    'MetricsRegistry': '.metrics',
+    'RingBufferStore': '.stores',
+    'StoredSample': '.stores'
+})
@@ -1,15 +1,17 @@
+import atexit
 import os
+import queue
 import sys
+import threading
 from itertools import zip_longest
 
-import yaml
 import logging
 from pathlib import Path
 from typing import Union, Optional, Any, Iterable, Sequence, Iterator
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueListener, TimedRotatingFileHandler
 from logging import Formatter, StreamHandler, Logger
 
-from dacite import from_dict
+from .loggers import DeferredQueueHandler, RateLimitFilter
 
 
 def group_items_into_chucks(
@@ -88,31 +90,58 @@ class FileSystem:
         :param config_directory: Optional directory that contains the configuration_ioc file, default is `root/settings`
         :return: A configuration_ioc object
         """
+        # parsers are imported on first use, most imports of this module only need logging
+        from dacite import from_dict
+        input_data = FileSystem.load_document(name, config_directory)
+        # noinspection PyTypeChecker
+        return from_dict(type_definition, input_data)
+
+    @staticmethod
+    def load_document(name: str = 'settings.yaml', config_directory: Optional[str] = None) -> Any:
+        """
+        Reads a `yaml` file without converting it
+        :param name: Name of the `yaml` file, default is `settings.yaml`
+        :param config_directory: Optional directory that contains the file, default is `root/settings`
+        :return: The parsed document, None when the file is empty
+        """
+        import yaml
         if config_directory is None:
             config_directory = FileSystem.__get_config_directory()
         with open(os.path.join(config_directory, name)) as file:
-            input_data = yaml.safe_load(file)
-        # noinspection PyTypeChecker
-        return from_dict(type_definition, input_data)
+            return yaml.safe_load(file)
 
 
-class Logging(Logger):
+class Logging:
+    """
+    Logging backend shared by every logger created through `LoggerFactory`. Loggers only put records on a queue,
+    one stream and one rotating file handler format and write them on a background thread
+    """
     __FORMATTER = "%(asctime)s — %(name)s — %(levelname)s — %(funcName)s:%(lineno)d — %(message)s"
 
     def __init__(
             self,
-            name: str,
             log_file_name: str = 'mppt-solar',
             log_format: str = __FORMATTER,
-            level: Union[int, str] = logging.DEBUG,
-            *args,
-            **kwargs
-     ) -> None:
-        super().__init__(name, level)
+            max_queue_size: int = 10000,
+            rate_limit: Optional[RateLimitFilter] = None
+    ) -> None:
+        """
+        :param log_file_name: Name of the log file within `logs`, without extension
+        :param log_format: Format of every record
+        :param max_queue_size: Records waiting to be written before new ones are dropped
+        :param rate_limit: Limits debug records per call site, defaults to `RateLimitFilter()`
+        """
         self.formatter = Formatter(log_format)
         self.file_name = log_file_name
-        self.addHandler(self.__get_stream_handler())
-        self.addHandler(self.__get_file_handler())
+        self.handler = DeferredQueueHandler(queue.Queue(max_queue_size))
+        self.handler.addFilter(rate_limit if rate_limit is not None else RateLimitFilter())
+        self._listener = QueueListener(
+            self.handler.queue,
+            self.__get_stream_handler(),
+            self.__get_file_handler(),
+            respect_handler_level=True
+        )
+        self._is_running = False
 
     def __get_log_file(self) -> str:
         file_name = f'{self.file_name}.log'
@@ -132,8 +161,38 @@ class Logging(Logger):
         handler.setFormatter(self.formatter)
         return handler
 
+    def start(self) -> None:
+        """
+        Starts writing records on the background thread
+        """
+        if not self._is_running:
+            self._listener.start()
+            self._is_running = True
+
+    def stop(self) -> None:
+        """
+        Writes every queued record and stops the background thread
+        """
+        if self._is_running:
+            self._listener.stop()
+            self._is_running = False
+            for handler in self._listener.handlers:
+                handler.close()
+
+    def attach(self, logger: Logger) -> None:
+        """
+        Routes the records of `logger` through the queue instead of its parents
+        :param logger: Logger to attach the queue handler to
+        """
+        if self.handler not in logger.handlers:
+            logger.addHandler(self.handler)
+        logger.propagate = False
+
 
 class LoggerFactory:
+    # handlers and their thread are shared by every factory of the process
+    __backend: Optional[Logging] = None
+    __backend_lock = threading.Lock()
 
     def __init__(self, config) -> None:
         """
@@ -141,13 +200,26 @@ class LoggerFactory:
         """
         self._verbosity = config.verbosity
 
+    @staticmethod
+    def backend() -> Logging:
+        """
+        :return: The logging backend, started on first use and stopped when the interpreter exits
+        """
+        with LoggerFactory.__backend_lock:
+            if LoggerFactory.__backend is None:
+                backend = Logging()
+                backend.start()
+                atexit.register(backend.stop)
+                LoggerFactory.__backend = backend
+            return LoggerFactory.__backend
+
     def create_logger(self, name: str) -> Logger:
         """
         Helper method that creates a logger instance using the supplied parameters
         :param name: The namespace of the calling module
         :return: Logger instance
         """
-        logging.setLoggerClass(Logging)
         logger = logging.getLogger(name)
         logger.setLevel(self._verbosity)
+        self.backend().attach(logger)
         return logger
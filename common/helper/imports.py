@@ -0,0 +1,27 @@
+from importlib import import_module
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Creates module level `__getattr__` and `__dir__` functions (PEP 562) so a package only imports the module behind
+    an export when it is first accessed e.g.
+    __getattr__, __dir__ = lazy_exports(__name__, {'Publisher': '.brokers'})
+    :param package: Name of the package defining the exports, usually `__name__`
+    :param exports: Relative module path of every exported name
+    :return: Functions to assign to `__getattr__` and `__dir__` of the package
+    """
+    def __getattr__(name: str) -> Any:
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        module = import_module(module_name, package)
+        value = getattr(module, name)
+        # later lookups find the value directly without going through __getattr__
+        setattr(import_module(package), name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(import_module(package))) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,86 @@
+import logging
+import queue
+import threading
+import time
+from logging import Filter, LogRecord
+from logging.handlers import QueueHandler
+from typing import Dict, Tuple
+
+# argument types that can be formatted later on another thread without their value changing in the meantime
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Hands records to a queue without formatting them, the listener formats a record only when one of its handlers
+    emits it. Records are dropped and counted instead of blocking the caller when the queue is full
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        args = record.args
+        if args and not all(isinstance(arg, _IMMUTABLE_TYPES) for arg in args):
+            # mutable arguments e.g. a reused bytearray may change before the listener gets to them
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            # tracebacks keep the frames of the caller alive, render them while they are still accurate
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(Filter):
+    """
+    Limits records below `level` per call site with a token bucket, once the bucket is empty only every
+    `sample_every`th record passes. The next record that passes notes how many were suppressed before it
+    """
+
+    def __init__(
+            self,
+            level: int = logging.INFO,
+            rate: float = 2.0,
+            burst: int = 20,
+            sample_every: int = 100
+    ) -> None:
+        """
+        :param level: Records at this level and above are never limited
+        :param rate: Records per second allowed per call site once the burst is used up
+        :param burst: Records a call site may log at once
+        :param sample_every: Records that pass while a call site is limited, 1 in `sample_every`, 0 passes none
+        """
+        super().__init__()
+        self._level = level
+        self._rate = rate
+        self._burst = burst
+        self._sample_every = sample_every
+        # (logger name, line number) -> (tokens, last refill, suppressed)
+        self._buckets: Dict[Tuple[str, int], Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno >= self._level:
+            return True
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, refilled, suppressed = self._buckets.get(key, (self._burst, now, 0))
+            tokens = min(self._burst, tokens + (now - refilled) * self._rate)
+            if tokens >= 1:
+                tokens -= 1
+            elif not self._sample_every or (suppressed + 1) % self._sample_every:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens, now, 0)
+        if suppressed:
+            record.msg = f'{record.msg} [{suppressed} similar messages suppressed]'
+        return True
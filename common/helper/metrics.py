@@ -0,0 +1,251 @@
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# seconds, from a fast serial exchange up to a command running into its timeout
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """
+    Monotonically increasing value e.g. bytes written to a device
+    """
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """
+    Value that goes up and down, either set explicitly or read from `function` whenever metrics are collected
+    """
+    __slots__ = ('_value', 'function')
+
+    def __init__(self, function: Optional[Callable[[], float]] = None) -> None:
+        self._value = 0.0
+        self.function = function
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        return self.function() if self.function is not None else self._value
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets, an observation costs a bisection and two additions
+    """
+    __slots__ = ('_bounds', '_counts', 'count', 'sum')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: Ascending upper bounds, values above the last bound are counted in an implicit +Inf bucket
+        """
+        self._bounds = tuple(buckets)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        :return: Upper bound and cumulative count of every bucket, ending with the +Inf bucket
+        """
+        cumulative, buckets = 0, []
+        for bound, count in zip(self._bounds + (math.inf,), self._counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """
+        Estimates a quantile by interpolating within the bucket it falls into, like `histogram_quantile` of Prometheus
+        :param quantile: Between 0 and 1 e.g. 0.99
+        :return: The estimate, None without observations
+        """
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        lower, below = 0.0, 0
+        for bound, cumulative in self.buckets:
+            if cumulative >= rank:
+                if math.isinf(bound):
+                    # nothing is known above the last bound
+                    return lower
+                in_bucket = cumulative - below
+                return lower + (bound - lower) * (rank - below) / in_bucket if in_bucket else bound
+            lower, below = bound, cumulative
+        return lower
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+
+class _Family(NamedTuple):
+    kind: str
+    description: str
+    # label values in the order of the sorted label names -> metric
+    children: Dict[Tuple[Tuple[str, str], ...], Metric]
+
+
+class MetricsRegistry:
+    """
+    In-process metrics exposed in the Prometheus text format and as a JSON snapshot. Metrics are identified by name
+    and labels, asking for the same combination again returns the same instance so callers can keep hold of it.
+    Nothing is locked, metrics are updated from the event loop thread
+    """
+
+    def __init__(self) -> None:
+        self._families: Dict[str, _Family] = {}
+        # counter values at the previous snapshot, used for rates
+        self._previous: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._previous_time: Optional[float] = None
+
+    def __child(
+            self,
+            name: str,
+            kind: str,
+            description: str,
+            labels: Dict[str, str],
+            create: Callable[[], Metric]
+    ) -> Any:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = _Family(kind, description, {})
+        elif family.kind != kind:
+            raise ValueError(f'Metric: {name} is already registered as a {family.kind}')
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        child = family.children.get(key)
+        if child is None:
+            child = family.children[key] = create()
+        return child
+
+    def counter(self, name: str, description: str, **labels: str) -> Counter:
+        """
+        :param name: Metric name, ending in `_total` by convention
+        :param description: Help text of the metric
+        :param labels: Labels telling the instances of a metric apart e.g. `device`
+        :return: The counter for the labels
+        """
+        return self.__child(name, 'counter', description, labels, Counter)
+
+    def gauge(
+            self,
+            name: str,
+            description: str,
+            function: Optional[Callable[[], float]] = None,
+            **labels: str
+    ) -> Gauge:
+        """
+        :param name: Metric name
+        :param description: Help text of the metric
+        :param function: Reads the current value on collection, replaces the function of an existing gauge
+        :param labels: Labels telling the instances of a metric apart
+        :return: The gauge for the labels
+        """
+        gauge = self.__child(name, 'gauge', description, labels, Gauge)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(
+            self,
+            name: str,
+            description: str,
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+            **labels: str
+    ) -> Histogram:
+        """
+        :param name: Metric name, ending in the unit by convention e.g. `_seconds`
+        :param description: Help text of the metric
+        :param buckets: Ascending upper bounds, only used when the histogram is created
+        :param labels: Labels telling the instances of a metric apart
+        :return: The histogram for the labels
+        """
+        return self.__child(name, 'histogram', description, labels, lambda: Histogram(buckets))
+
+    @staticmethod
+    def __format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+        if not labels:
+            return ''
+        escaped = (
+            (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in labels
+        )
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+    @staticmethod
+    def __format_value(value: float) -> str:
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(float(value))
+
+    def render(self) -> str:
+        """
+        :return: Every metric in the Prometheus text exposition format
+        """
+        lines = []
+        for name, family in sorted(self._families.items()):
+            lines.append(f'# HELP {name} {family.description}')
+            lines.append(f'# TYPE {name} {family.kind}')
+            for labels, metric in family.children.items():
+                if isinstance(metric, Histogram):
+                    for bound, cumulative in metric.buckets:
+                        bucket_labels = labels + (('le', self.__format_value(bound)),)
+                        lines.append(f'{name}_bucket{self.__format_labels(bucket_labels)} {cumulative}')
+                    lines.append(f'{name}_sum{self.__format_labels(labels)} {self.__format_value(metric.sum)}')
+                    lines.append(f'{name}_count{self.__format_labels(labels)} {metric.count}')
+                else:
+                    lines.append(f'{name}{self.__format_labels(labels)} {self.__format_value(metric.value)}')
+        return '\n'.join(lines) + '\n'
+
+    def write_text_file(self, path: str) -> None:
+        """
+        Writes `render` to a file for e.g. the textfile collector of the node exporter. The file is replaced at once
+        so a reader never sees a partial file
+        :param path: File to write
+        """
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as file:
+            file.write(self.render())
+        os.replace(temporary_path, path)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Counters carry their rate per second since the previous snapshot, None on the first one. Histograms are
+        summarised by their count, sum and estimated p50 and p99
+        :return: Every metric as a JSON serializable dictionary
+        """
+        now = time.monotonic()
+        elapsed = now - self._previous_time if self._previous_time is not None else None
+        metrics: Dict[str, List[Dict[str, Any]]] = {}
+        for name, family in sorted(self._families.items()):
+            entries = metrics[name] = []
+            for labels, metric in family.children.items():
+                entry: Dict[str, Any] = {'labels': dict(labels)}
+                if isinstance(metric, Histogram):
+                    entry.update(
+                        count=metric.count, sum=metric.sum, p50=metric.quantile(0.5), p99=metric.quantile(0.99)
+                    )
+                elif isinstance(metric, Counter):
+                    previous = self._previous.get((name, labels))
+                    entry['value'] = metric.value
+                    entry['rate'] = (metric.value - previous) / elapsed if previous is not None and elapsed else None
+                    self._previous[(name, labels)] = metric.value
+                else:
+                    entry['value'] = metric.value
+                entries.append(entry)
+        self._previous_time = now
+        return {'timestamp': time.time(), 'metrics': metrics}
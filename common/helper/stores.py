@@ -0,0 +1,191 @@
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .helpers import FileSystem
+
+
+class StoredSample(NamedTuple):
+    timestamp: float
+    # one value per field of the store, None where no numeric value was recorded
+    values: Tuple[Optional[float], ...]
+
+
+class RingBufferStore:
+    """
+    Fixed size time-series file of numeric samples, memory mapped and written as a ring so the oldest samples are
+    overwritten once it is full. The file is allocated to its full size when created and never grows.
+
+    Layout, all little-endian: a 4 KiB header holding the magic, version, capacity, number of records written and
+    the field names as JSON, followed by `capacity` records of a float64 timestamp and one float32 per field where NaN
+    marks a missing value. A NaN timestamp marks a record that is being written, it is skipped when reading. Records
+    are kept in timestamp order which serves as the index for range queries
+    """
+    __MAGIC: bytes = b'MPPTRING'
+    __VERSION: int = 1
+    # magic, version, field count, capacity, records written, length of the field names
+    __HEADER = struct.Struct('<8sHHQQI')
+    # fixed rather than the page size of the host, so a store can be read on a machine with larger pages
+    __HEADER_SIZE: int = 4096
+    __WRITTEN_OFFSET: int = 20
+
+    def __init__(
+            self,
+            file_name: str,
+            fields: Sequence[str],
+            max_size: int = 1024 * 1024,
+            directory: str = 'logs'
+    ) -> None:
+        """
+        :param file_name: Name of the store within `directory`
+        :param fields: Names of the values of every sample, an existing store with other fields is started over
+        :param max_size: Size of the file in bytes including its header
+        :param directory: Directory within the application main directory holding the store
+        """
+        self._fields = tuple(fields)
+        self._record = struct.Struct(f'<d{len(self._fields)}f')
+        self._names = json.dumps(self._fields).encode()
+        if self.__HEADER.size + len(self._names) > self.__HEADER_SIZE:
+            raise ValueError(f'Field names of store: {file_name} do not fit into its header')
+        self._capacity = (max_size - self.__HEADER_SIZE) // self._record.size
+        if self._capacity < 1:
+            raise ValueError(f'Store: {file_name} of {max_size} bytes is too small for a single record')
+        self.path = FileSystem.create_file(directory, file_name)
+        self._size = self.__HEADER_SIZE + self._capacity * self._record.size
+        self._file = open(self.path, 'r+b')
+        try:
+            is_compatible = self.__is_compatible()
+            if not is_compatible:
+                self._file.truncate(self._size)
+            self._map = mmap.mmap(self._file.fileno(), self._size)
+        except BaseException:
+            self._file.close()
+            raise
+        if not is_compatible:
+            self.__write_header()
+        self._written = self.__read_written()
+
+    def __is_compatible(self) -> bool:
+        if os.fstat(self._file.fileno()).st_size != self._size:
+            return False
+        header = self._file.read(self.__HEADER.size)
+        magic, version, field_count, capacity, _, names_length = self.__HEADER.unpack(header)
+        if (magic, version, field_count, capacity) != (self.__MAGIC, self.__VERSION, len(self._fields), self._capacity):
+            return False
+        return self._file.read(names_length) == self._names
+
+    def __write_header(self) -> None:
+        self._map[:self.__HEADER_SIZE] = bytes(self.__HEADER_SIZE)
+        self.__HEADER.pack_into(
+            self._map, 0, self.__MAGIC, self.__VERSION, len(self._fields), self._capacity, 0, len(self._names)
+        )
+        self._map[self.__HEADER.size:self.__HEADER.size + len(self._names)] = self._names
+
+    def __read_written(self) -> int:
+        return struct.unpack_from('<Q', self._map, self.__WRITTEN_OFFSET)[0]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return self._fields
+
+    @property
+    def capacity(self) -> int:
+        """
+        :return: Number of samples kept before the oldest are overwritten
+        """
+        return self._capacity
+
+    def __len__(self) -> int:
+        return min(self._written, self._capacity)
+
+    def __offset(self, position: int) -> int:
+        # position 0 is the oldest sample still held
+        first = self._written - len(self)
+        return self.__HEADER_SIZE + ((first + position) % self._capacity) * self._record.size
+
+    def __timestamp_at(self, position: int) -> float:
+        return struct.unpack_from('<d', self._map, self.__offset(position))[0]
+
+    def __sample_at(self, position: int) -> StoredSample:
+        timestamp, *values = self._record.unpack_from(self._map, self.__offset(position))
+        return StoredSample(timestamp, tuple(None if math.isnan(value) else value for value in values))
+
+    def __bisect(self, timestamp: float) -> int:
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            stored = self.__timestamp_at(middle)
+            # an invalid record can only be the oldest one, which a full store was overwriting
+            if stored < timestamp or math.isnan(stored):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @staticmethod
+    def __to_float(value: object) -> float:
+        if isinstance(value, (int, float)):
+            return float(value)
+        return math.nan
+
+    def append(self, values: Sequence[object], timestamp: Optional[float] = None) -> None:
+        """
+        Adds a sample, overwriting the oldest one when the store is full
+        :param values: One value per field, values that are not numbers or booleans are stored as missing
+        :param timestamp: Seconds since the epoch, defaults to now. A timestamp before the last sample is raised to
+        the timestamp of the last sample to keep the store ordered
+        """
+        if len(values) != len(self._fields):
+            raise ValueError(f'Expected {len(self._fields)} values, got {len(values)}')
+        if timestamp is None:
+            timestamp = time.time()
+        if self._written:
+            timestamp = max(timestamp, self.__timestamp_at(len(self) - 1))
+        offset = self.__HEADER_SIZE + (self._written % self._capacity) * self._record.size
+        # once the store is full the slot holds the oldest record, it is invalidated first so an interrupted append
+        # leaves a record that is skipped rather than a torn one out of timestamp order. The timestamp that makes the
+        # record valid is written last, the count after it. Neither survives a power loss unless the pages were
+        # flushed, they reach the disk in no particular order
+        struct.pack_into('<d', self._map, offset, math.nan)
+        self._record.pack_into(self._map, offset, math.nan, *map(self.__to_float, values))
+        struct.pack_into('<d', self._map, offset, timestamp)
+        self._written += 1
+        struct.pack_into('<Q', self._map, self.__WRITTEN_OFFSET, self._written)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[StoredSample]:
+        """
+        :param start: Earliest timestamp to include, defaults to the oldest sample
+        :param end: Timestamp to stop before, defaults to after the newest sample
+        :return: Samples with `start <= timestamp < end` from oldest to newest, read from the file as iterated
+        """
+        first = 0 if start is None else self.__bisect(start)
+        last = len(self) if end is None else self.__bisect(end)
+        for position in range(first, last):
+            sample = self.__sample_at(position)
+            if not math.isnan(sample.timestamp):
+                yield sample
+
+    def latest(self, count: int = 1) -> List[StoredSample]:
+        """
+        :param count: Number of samples
+        :return: The newest samples, oldest first, fewer when the oldest record was left invalid by an interrupted
+        append
+        """
+        samples = [self.__sample_at(position) for position in range(max(0, len(self) - count), len(self))]
+        return [sample for sample in samples if not math.isnan(sample.timestamp)]
+
+    def flush(self) -> None:
+        """
+        Writes modified pages to disk, otherwise left to the operating system to limit writes to the medium
+        """
+        self._map.flush()
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
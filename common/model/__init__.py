@@ -2,4 +2,5 @@ from .commands import Command, Crc, CommandDefinition, CommandValidation, Comman
 from .devices import DeviceConfiguration
 from .payloads import SensorPayload, SwitchPayload
 from .responses import ResponseMapping, RawResponse
-from .settings import Configuration, MQTTConfig, DeviceConfig
+from .settings import Configuration, MQTTConfig, DeviceConfig, Deadband, PublishConfig, HistoryConfig, MetricsConfig, \
+    PollConfig
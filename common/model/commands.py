@@ -16,6 +16,9 @@ class Crc:
     def __str__(self) -> str:
         return f'{chr(self.crc_high)}{chr(self.crc_low)}'
 
+    def __bytes__(self) -> bytes:
+        return bytes((self.crc_high, self.crc_low))
+
 
 @dataclass
 class Command:
@@ -27,6 +30,10 @@ class Command:
     def __str__(self) -> str:
         return f'{self.command}{self.crc}\x0d'
 
+    def __bytes__(self) -> bytes:
+        crc = bytes(self.crc) if self.crc is not None else b''
+        return b''.join((self.command.encode('latin-1'), crc, b'\x0d'))
+
 
 @dataclass
 class CommandValidation:
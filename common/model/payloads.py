@@ -10,9 +10,9 @@ class Payload:
 
 @dataclass
 class SensorPayload(Payload):
-    device_class: str
+    device_class: Optional[str]
     value_template: str
-    unit_of_measurement: str
+    unit_of_measurement: Optional[str]
 
 
 @dataclass
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Optional, Any, Union
 
 from common.model import Command
@@ -23,5 +24,31 @@ class RawResponse:
     raw_data: Union[str, bytes]
     command: Command
 
+    @cached_property
+    def _frame(self) -> Optional[Any]:
+        # imported here as the processor package depends on this module
+        from processor.helper import ResponseFrameParser
+        raw_data = self.raw_data.encode('latin-1') if isinstance(self.raw_data, str) else self.raw_data
+        return ResponseFrameParser.parse(raw_data)
+
+    @property
+    def payload(self) -> Optional[memoryview]:
+        """
+        :return: View of the response between `(` and the crc, None when the response is not a complete frame
+        """
+        frame = self._frame
+        return frame.payload if frame is not None else None
+
+    def is_nak(self) -> bool:
+        """
+        :return: True when the inverter rejected the command
+        """
+        frame = self._frame
+        return frame is not None and frame.is_nak
+
     def is_valid(self) -> bool:
-        pass
+        """
+        :return: True when the response is a complete frame with a matching crc
+        """
+        frame = self._frame
+        return frame is not None and frame.is_valid
@@ -1,4 +1,41 @@
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, List
+
+
+@dataclass
+class Deadband:
+    # a numeric value is only republished once it moved further than either threshold from the last published value,
+    # with both thresholds at 0 any change is published
+    absolute: float = 0.0
+    percent: float = 0.0
+
+
+@dataclass
+class PublishConfig:
+    deadband: Deadband = field(default_factory=Deadband)
+    # overrides `deadband` for fields whose topic ends with the key e.g. `battery_voltage`
+    field_deadbands: Dict[str, Deadband] = field(default_factory=dict)
+    # seconds between snapshots that republish every value regardless of change
+    full_refresh_interval: float = 300.0
+    # publish one JSON document per response on a state topic instead of one message per field
+    aggregate_state: bool = False
+
+
+@dataclass
+class HistoryConfig:
+    # bytes allocated to every store, one store per device and command in `logs`, the oldest samples are overwritten
+    max_size: int = 1024 * 1024
+
+
+@dataclass
+class MetricsConfig:
+    # seconds between reports
+    interval: float = 60.0
+    # Prometheus text file, relative paths are placed under `logs`, no file is written when empty
+    text_file: Optional[str] = 'mppt-solar.prom'
+    # topic relative to the configured topic the diagnostics are published on as JSON, not published when empty
+    topic: Optional[str] = 'diagnostics'
 
 
 @dataclass
@@ -8,6 +45,19 @@ class MQTTConfig:
     port: int
     username: str
     password: str
+    publish: PublishConfig = field(default_factory=PublishConfig)
+
+
+@dataclass
+class PollConfig:
+    # seconds between polls of further commands e.g. {'QPIRI': 300.0, 'QMOD': 30.0}, the status follows `poll_interval`
+    commands: Dict[str, float] = field(default_factory=dict)
+    # share of the time polling may keep the serial line busy, the status is polled as often as the rest allows
+    bus_budget: float = 0.8
+    # random delay added to every poll as a fraction of its interval, keeps devices on one host from lining up
+    jitter: float = 0.1
+    # longest interval in seconds a command backs off to while it keeps failing
+    max_backoff: float = 300.0
 
 
 @dataclass
@@ -15,11 +65,56 @@ class DeviceConfig:
     interface: str
     baud_rate: int
     is_serial: bool
+    # seconds to wait for a response, `command_timeouts` overrides this for individual commands
+    timeout: float = 2.0
+    command_timeouts: Optional[Dict[str, float]] = None
+    # used to tell devices apart in topics, defaults to the file name of the interface
+    name: Optional[str] = None
+    # shortest time in seconds between status samples, stretched when the serial line cannot keep up
+    poll_interval: float = 5.0
+    poll: PollConfig = field(default_factory=PollConfig)
+    # alias of the plugin handling this device, defaults to the `plugin` of the configuration
+    plugin: Optional[str] = None
+
+    @property
+    def device_name(self) -> str:
+        return self.name or os.path.basename(self.interface.rstrip('/'))
+
+    def timeout_for(self, command: str) -> float:
+        if self.command_timeouts is not None:
+            return self.command_timeouts.get(command, self.timeout)
+        return self.timeout
 
 
 @dataclass
 class Configuration:
-    device: DeviceConfig
     mqtt: MQTTConfig
     verbosity: str
     plugin: str
+    # a single `device` is still accepted, `devices` lists every inverter handled by this process
+    device: Optional[DeviceConfig] = None
+    devices: List[DeviceConfig] = field(default_factory=list)
+    # keeps decoded samples on disk when set
+    history: Optional[HistoryConfig] = None
+    # reports the collected metrics when set
+    metrics: Optional[MetricsConfig] = None
+
+    def __post_init__(self) -> None:
+        # the name keys topics, command routes, stores and metrics of a device, a clash would mix two devices up
+        names = set()
+        for device in self.device_configs:
+            if device.device_name in names:
+                raise ValueError(
+                    f'Device name: {device.device_name} is used by more than one device, set a unique `name` on each'
+                )
+            names.add(device.device_name)
+
+    @property
+    def device_configs(self) -> List[DeviceConfig]:
+        configs = list(self.devices)
+        if self.device is not None:
+            configs.insert(0, self.device)
+        return configs
+
+    def plugin_for(self, device: DeviceConfig) -> str:
+        return device.plugin or self.plugin
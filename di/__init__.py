@@ -1 +1,11 @@
-from .dependencies import ConfigurationProvider, LoggerProvider
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .dependencies import ConfigurationProvider, LoggerProvider
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'ConfigurationProvider': '.dependencies',
+    'LoggerProvider': '.dependencies'
+})
@@ -4,9 +4,13 @@ import dependency_injector.providers as providers
 from dependency_injector.providers import ThreadSafeSingleton, Factory
 
 from common.model import Configuration
-from common.helper import FileSystem, LoggerFactory
+from common.helper import FileSystem, LoggerFactory, MetricsRegistry
 from broker.helper import create_default_client
-from processor.helper import CyclicRedundancyCodeHelper
+from processor.helper import CyclicRedundancyCodeHelper, CommandFrameCache
+from dispatcher import CommandDispatcher
+from dispatcher.connections import SerialConnectionPool
+
+# providers are passed to each other rather than called, so nothing is read from disk until an instance is needed
 
 
 class ConfigurationProvider(containers.DeclarativeContainer):
@@ -21,19 +25,52 @@ class LoggerProvider(containers.DeclarativeContainer):
     """IoC container of logger providers."""
     logger_factory_ioc: ThreadSafeSingleton = providers.ThreadSafeSingleton(
         LoggerFactory,
-        config=ConfigurationProvider.configuration_ioc()
+        config=ConfigurationProvider.configuration_ioc
     )
 
 
+class MetricsProvider(containers.DeclarativeContainer):
+    """IoC container of the metrics shared by every component."""
+    metrics_ioc: ThreadSafeSingleton = providers.ThreadSafeSingleton(MetricsRegistry)
+
+
 class ClientProvider(containers.DeclarativeContainer):
     client_ioc: Factory = providers.Factory(
         create_default_client,
-        config=ConfigurationProvider.configuration_ioc().mqtt
+        config=ConfigurationProvider.configuration_ioc.provided.mqtt
     )
 
 
 class CrcProvider(containers.DeclarativeContainer):
     crc_ioc: Factory = providers.Factory(
         CyclicRedundancyCodeHelper,
-        logger_factory=LoggerProvider.logger_factory_ioc()
+        logger_factory=LoggerProvider.logger_factory_ioc
+    )
+
+
+class FrameCacheProvider(containers.DeclarativeContainer):
+    """IoC container of the command frame cache shared by every dispatcher."""
+    frame_cache_ioc: ThreadSafeSingleton = providers.ThreadSafeSingleton(
+        CommandFrameCache,
+        crc_calculator=CrcProvider.crc_ioc
+    )
+
+
+class ConnectionPoolProvider(containers.DeclarativeContainer):
+    """IoC container of the long-lived device connections."""
+    connection_pool_ioc: ThreadSafeSingleton = providers.ThreadSafeSingleton(
+        SerialConnectionPool,
+        logger_factory=LoggerProvider.logger_factory_ioc
+    )
+
+
+class DispatcherProvider(containers.DeclarativeContainer):
+    """IoC container of dispatchers, one is created per device."""
+    dispatcher_ioc: Factory = providers.Factory(
+        CommandDispatcher,
+        logger_factory=LoggerProvider.logger_factory_ioc,
+        crc_calculator=CrcProvider.crc_ioc,
+        frame_cache=FrameCacheProvider.frame_cache_ioc,
+        connection_pool=ConnectionPoolProvider.connection_pool_ioc,
+        metrics=MetricsProvider.metrics_ioc
     )
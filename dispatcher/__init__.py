@@ -1 +1,17 @@
-from .dispatchers import CommandDispatcher
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .dispatchers import BusTimer, DispatcherContract, CommandDispatcher
+    from .schedulers import CommandScheduler, CommandPriority
+    from .ingestors import CommandIngestor
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'BusTimer': '.dispatchers',
+    'DispatcherContract': '.dispatchers',
+    'CommandDispatcher': '.dispatchers',
+    'CommandScheduler': '.schedulers',
+    'CommandPriority': '.schedulers',
+    'CommandIngestor': '.ingestors'
+})
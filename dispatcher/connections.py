@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+from threading import Lock
+from typing import Dict, AsyncIterator
+
+from common.helper import LoggerFactory
+from common.model import DeviceConfig
+from .transports import TransportContract, SerialTransport, HidRawTransport
+
+
+class SerialConnectionPool:
+    """
+    Keeps one long-lived transport per device interface, so polling does not pay for opening the port,
+    termios setup and line reset on every command. Serial devices get a `SerialTransport` while USB HID
+    devices get a `HidRawTransport`
+    """
+
+    def __init__(self, logger_factory: LoggerFactory) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._connections: Dict[str, TransportContract] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._guard = Lock()
+
+    def __lock_for(self, interface: str) -> asyncio.Lock:
+        with self._guard:
+            lock = self._locks.get(interface)
+            if lock is None:
+                lock = self._locks[interface] = asyncio.Lock()
+            return lock
+
+    def __open(self, device_config: DeviceConfig) -> TransportContract:
+        self._logger.debug(f'Opening connection to interface: {device_config.interface}')
+        if not device_config.is_serial:
+            return HidRawTransport(device_config.interface)
+        # pyserial is only imported once a serial device is opened, its SerialException is an OSError
+        import serial
+        stream = serial.serial_for_url(device_config.interface, device_config.baud_rate)
+        return SerialTransport(stream)
+
+    def __connection_for(self, device_config: DeviceConfig) -> TransportContract:
+        transport = self._connections.get(device_config.interface)
+        if transport is not None and not transport.is_healthy():
+            self._logger.warning(f'Connection to interface: {device_config.interface} is unhealthy, reopening')
+            self.invalidate(device_config.interface)
+            transport = None
+        if transport is None:
+            transport = self._connections[device_config.interface] = self.__open(device_config)
+        return transport
+
+    @asynccontextmanager
+    async def acquire(self, device_config: DeviceConfig) -> AsyncIterator[TransportContract]:
+        """
+        Provides exclusive access to the open transport for a device, opening or reopening it when required.
+        A transport that raises an I/O error is discarded so the next caller receives a fresh one
+        :param device_config: Configuration of the device to connect to
+        :return: An open transport
+        """
+        async with self.__lock_for(device_config.interface):
+            transport = self.__connection_for(device_config)
+            try:
+                yield transport
+            except asyncio.TimeoutError:
+                # a slow response leaves the handle usable, stale input is discarded on the next exchange
+                raise
+            except OSError:
+                self.invalidate(device_config.interface)
+                raise
+
+    def invalidate(self, interface: str) -> None:
+        """
+        Closes and forgets the transport for an interface
+        :param interface: Interface the transport was opened for
+        """
+        transport = self._connections.pop(interface, None)
+        if transport is not None:
+            try:
+                transport.close()
+            except OSError as e:
+                self._logger.warning(f'Unable to cleanly close interface: {interface}', exc_info=e)
+
+    def close(self) -> None:
+        """
+        Closes every pooled transport
+        """
+        for interface in list(self._connections):
+            self.invalidate(interface)
@@ -1,92 +1,223 @@
 import asyncio
+import time
 from abc import ABC
-from textwrap import wrap
+from contextvars import ContextVar, Token
 
-import aiofiles
-import serial
-from multiprocessing import Queue
+from typing import Dict, Optional
 
-from typing import Optional
-
-from common.helper import LoggerFactory
+from common.helper import Histogram, LoggerFactory, MetricsRegistry
 from common.model import DeviceConfig, RawResponse, Command
-from processor.helper import CyclicRedundancyCodeHelper
+from processor.helper import CyclicRedundancyCodeHelper, CommandFrameCache
+from .connections import SerialConnectionPool
+from .schedulers import CommandScheduler, CommandPriority
+
+
+class BusTimer:
+    """
+    Adds up the seconds the bus was held for the commands the current task sends through any dispatcher while the
+    timer is entered, time spent waiting in the queue of a dispatcher is left out e.g.
+
+        with BusTimer() as timer:
+            await inverter.fetch_status()
+        timer.seconds
+    """
+    __current: ContextVar[Optional['BusTimer']] = ContextVar('bus_timer', default=None)
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        # commands answered while the timer was entered, including those without a valid response
+        self.exchanges = 0
+        self.__token: Optional[Token] = None
+
+    def __enter__(self) -> 'BusTimer':
+        self.__token = BusTimer.__current.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        BusTimer.__current.reset(self.__token)
+        self.__token = None
+
+    @staticmethod
+    def add(seconds: float) -> None:
+        """
+        Adds the bus time of a command to the timer of the current task, if any
+        :param seconds: Seconds the exchange of the command held the bus
+        """
+        timer = BusTimer.__current.get()
+        if timer is not None:
+            timer.seconds += seconds
+            timer.exchanges += 1
 
 
 class DispatcherContract(ABC):
-    _message_queue: Queue = Queue(maxsize=25)
 
     def __init__(
             self,
             logger_factory: LoggerFactory,
             device_configuration: DeviceConfig,
-            crc_calculator: CyclicRedundancyCodeHelper
+            crc_calculator: CyclicRedundancyCodeHelper,
+            frame_cache: CommandFrameCache,
+            connection_pool: SerialConnectionPool,
+            max_pending: int = 25,
+            metrics: Optional[MetricsRegistry] = None
     ) -> None:
         self._logger = logger_factory.create_logger(__name__)
         self._device_config = device_configuration
         self._crc_calculator = crc_calculator
+        self._frame_cache = frame_cache
+        self._connection_pool = connection_pool
+        self._scheduler = CommandScheduler(logger_factory, self.__exchange, max_pending)
+        self._metrics = metrics if metrics is not None else MetricsRegistry()
+        device = device_configuration.device_name
+        self._bytes_sent = self._metrics.counter(
+            'mppt_serial_sent_bytes_total', 'Bytes of command frames written to the device', device=device
+        )
+        self._bytes_received = self._metrics.counter(
+            'mppt_serial_received_bytes_total', 'Bytes of response frames read from the device', device=device
+        )
+        # the rate of this counter is the share of time the bus is in use
+        self._bus_time = self._metrics.counter(
+            'mppt_serial_busy_seconds_total', 'Seconds spent exchanging frames with the device', device=device
+        )
+        self._metrics.gauge(
+            'mppt_scheduler_queue_depth', 'Commands waiting for a response from the device',
+            lambda: self._scheduler.depth, device=device
+        )
+        # command -> round-trip latency
+        self._latencies: Dict[str, Histogram] = {}
+        # command -> seconds its last exchange held the bus, retries included
+        self._exchange_times: Dict[str, float] = {}
+
+    def _latency_for(self, command: str) -> Histogram:
+        latency = self._latencies.get(command)
+        if latency is None:
+            latency = self._latencies[command] = self._metrics.histogram(
+                'mppt_command_duration_seconds', 'Round trip of a command from writing its frame to a full response',
+                device=self._device_config.device_name, command=command
+            )
+        return latency
+
+    def _count_failure(self, command: str, reason: str) -> None:
+        """
+        :param command: Command without crc or terminator
+        :param reason: One of `timeout`, `io_error`, `error`, `crc` or `nak`
+        """
+        self._metrics.counter(
+            'mppt_command_failures_total', 'Commands without a usable response by reason',
+            device=self._device_config.device_name, command=command, reason=reason
+        ).inc()
+
+    def _count_retry(self, command: str) -> None:
+        """
+        :param command: Command without crc or terminator, sent again after a failed attempt
+        """
+        self._metrics.counter(
+            'mppt_command_retries_total', 'Commands sent again after a failed attempt',
+            device=self._device_config.device_name, command=command
+        ).inc()
 
     async def _execute_command(self, cmd: str) -> Optional[RawResponse]:
         pass
 
-    async def queue_pending_command(self, command: Command) -> None:
-        self._message_queue.put(obj=command)
+    async def __exchange(self, cmd: str) -> Optional[RawResponse]:
+        # commands are executed one at a time, so the bus time added meanwhile is all spent on this one
+        started = self._bus_time.value
+        try:
+            return await self._execute_command(cmd)
+        finally:
+            self._exchange_times[cmd] = self._bus_time.value - started
+
+    async def __submit(self, cmd: str, priority: int) -> Optional[RawResponse]:
+        response = await self._scheduler.submit(cmd, priority)
+        BusTimer.add(self._exchange_times.get(cmd, 0.0))
+        return response
+
+    @property
+    def pending_commands(self) -> int:
+        return self._scheduler.depth
+
+    async def execute(self, cmd: str, priority: int = CommandPriority.TELEMETRY) -> Optional[RawResponse]:
+        """
+        Queues a command for the device and waits for its response
+        :param cmd: Command without crc or terminator e.g. QPIGS
+        :param priority: Position in the device queue, see `CommandPriority`
+        :return: A validated response, None when the device did not respond, rejected the command or sent garbage
+        """
+        response = await self.__submit(cmd, priority)
+        return None if response is not None and response.is_nak() else response
+
+    async def queue_pending_command(self, cmd: str) -> Optional[RawResponse]:
+        """
+        Queues a user issued command ahead of telemetry polling
+        :param cmd: Command without crc or terminator e.g. POP02
+        :return: A validated response, a rejection by the device is returned as well so it can be told apart from
+        no response, see `RawResponse.is_nak`. None when the device did not respond or sent garbage
+        """
+        return await self.__submit(cmd, CommandPriority.USER)
+
+    async def stop(self) -> None:
+        """
+        Stops sending commands and cancels the ones still queued
+        """
+        await self._scheduler.stop()
 
 
 class CommandDispatcher(DispatcherContract):
 
-    async def __send_serial_command(self, command: Command) -> Optional[RawResponse]:
+    async def __write_command(self, command: Command, frame: bytes) -> Optional[RawResponse]:
+        async with self._connection_pool.acquire(self._device_config) as transport:
+            started = time.perf_counter()
+            try:
+                response = await transport.exchange(frame, self._device_config.timeout_for(command.command))
+            finally:
+                # failed exchanges held the bus as well
+                elapsed = time.perf_counter() - started
+                self._bus_time.inc(elapsed)
+                self._bytes_sent.inc(len(frame))
+            self._bytes_received.inc(len(response))
+            self._latency_for(command.command).observe(elapsed)
+            self._logger.debug('Write result -> message: %s | response: %s', frame, response)
+            return RawResponse(response, command)
+
+    async def __send_command(self, command: Command, frame: bytes) -> Optional[RawResponse]:
+        self._logger.debug(
+            'Using interface: %s for executing command: %s', self._device_config.interface, command.command
+        )
         try:
-            self._logger.debug(
-                f'Connecting to interface: {self._device_config.interface} and executing command: {command}'
-            )
-            with serial.serial_for_url(self._device_config.interface, self._device_config.baud_rate) as stream:
-                message = str(command)
-                stream.write_timeout = 2
-                written = stream.write(message)
-                stream.flushOutput()
-                self._logger.debug(
-                    f'Write result -> total bytes: {written} | message: {message}'
-                )
-                return written > 0
+            return await self.__write_command(command, frame)
+        except asyncio.TimeoutError:
+            self._logger.warning(f'Timed out waiting for a response to command: {command}')
+            self._count_failure(command.command, 'timeout')
+            return None
+        except OSError as e:
+            # covers pyserial's SerialException, the pool has discarded the broken handle so the retry runs on a
+            # freshly opened one
+            self._logger.warning(f'Retrying command: {command} on a new connection', exc_info=e)
+            self._count_retry(command.command)
         except Exception as e:
             self._logger.error(f'Error occurred while executing command: {command}', exc_info=e)
-        return None
-
-    async def __send_usb_command(self, command: Command) -> Optional[RawResponse]:
+            self._count_failure(command.command, 'error')
+            return None
         try:
-            self._logger.debug(
-                f'Connecting to interface: {self._device_config.interface} and executing command: {command}'
-            )
-            async with aiofiles.open(file=self._device_config.interface, mode='rw') as stream:
-                full_text_command = str(command)
-                for chunk in wrap(
-                        text=str(command),
-                        width=8,
-                        expand_tabs=False,
-                        replace_whitespace=False,
-                        fix_sentence_endings=False,
-                        break_long_words=False,
-                        drop_whitespace=False,
-                        break_on_hyphens=False
-                ):
-                    written = await stream.write(chunk)
-                    await asyncio.sleep(0.16)
-                # await response from device
-                response = await stream.readline()
-                self._logger.debug(
-                    f'Write result -> total bytes: {written} | command: {command}'
-                )
-                return RawResponse(response, command)
+            return await self.__write_command(command, frame)
+        except asyncio.TimeoutError:
+            self._logger.warning(f'Timed out waiting for a response to command: {command}')
+            self._count_failure(command.command, 'timeout')
         except Exception as e:
             self._logger.error(f'Error occurred while executing command: {command}', exc_info=e)
+            self._count_failure(command.command, 'io_error' if isinstance(e, OSError) else 'error')
         return None
 
     async def _execute_command(self, cmd: str) -> Optional[RawResponse]:
-        raw_response: Optional[RawResponse] = None
-        command = self._crc_calculator.command_with_crc(cmd)
-        if self._device_config.is_serial:
-            raw_response = await self.__send_serial_command(command)
-        else:
-            raw_response = await self.__send_usb_command(command)
-        return None
+        command, frame = self._frame_cache.get(cmd)
+        raw_response = await self.__send_command(command, frame)
+        if raw_response is None:
+            return None
+        if not raw_response.is_valid():
+            self._logger.warning(f'Dropping corrupted response to command: {command} -> {raw_response.raw_data}')
+            self._count_failure(cmd, 'crc')
+            return None
+        if raw_response.is_nak():
+            self._logger.warning(f'Command: {command} was rejected by the device')
+            self._count_failure(cmd, 'nak')
+        return raw_response
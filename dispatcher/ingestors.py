@@ -0,0 +1,130 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from common.helper import LoggerFactory
+from processor.helper import CommandValidator
+from .dispatchers import DispatcherContract
+
+
+class CommandIngestor:
+    """
+    Hands commands received from outside e.g. over MQTT to the dispatcher of a device. Commands are validated before
+    they are queued, repeats within `dedupe_window` are dropped and the queue is bounded so a burst is rejected early
+    rather than delaying every command behind it. The outcome of every command is acknowledged
+    """
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            dispatcher: DispatcherContract,
+            validator: CommandValidator,
+            acknowledge: Callable[[Dict[str, Any]], Awaitable[Any]],
+            max_queued: int = 10,
+            dedupe_window: float = 2.0,
+            on_executed: Optional[Callable[[str], Any]] = None
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param dispatcher: Dispatcher of the device the commands are meant for
+        :param validator: Validator built from the command definitions of the plugin
+        :param acknowledge: Coroutine publishing the outcome of a command
+        :param max_queued: Maximum number of commands waiting for the device
+        :param dedupe_window: Seconds in which a repeated command is considered a duplicate
+        :param on_executed: Called with every command the device was asked to execute, whatever the outcome, e.g. to
+        drop cached responses the command affects
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._dispatcher = dispatcher
+        self._validator = validator
+        self._acknowledge = acknowledge
+        self._dedupe_window = dedupe_window
+        self._on_executed = on_executed
+        self._queue: asyncio.Queue = asyncio.Queue(max_queued)
+        # command -> time it was last accepted
+        self._accepted: Dict[str, float] = {}
+        self._acknowledgements: Set[asyncio.Task] = set()
+        self._consumer: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def __ensure_running(self) -> None:
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.get_running_loop().create_task(self.__consume())
+
+    def __send_acknowledgement(self, command: str, status: str, detail: Optional[str] = None) -> None:
+        acknowledgement = {'command': command, 'status': status, 'detail': detail}
+        task = asyncio.get_running_loop().create_task(self.__acknowledge(acknowledgement))
+        self._acknowledgements.add(task)
+        task.add_done_callback(self._acknowledgements.discard)
+
+    async def __acknowledge(self, acknowledgement: Dict[str, Any]) -> None:
+        try:
+            await self._acknowledge(acknowledgement)
+        except Exception as e:
+            self._logger.error(f'Unable to acknowledge command: {acknowledgement["command"]}', exc_info=e)
+
+    def __is_duplicate(self, command: str, now: float) -> bool:
+        expired = [name for name, accepted in self._accepted.items() if now - accepted >= self._dedupe_window]
+        for name in expired:
+            del self._accepted[name]
+        return command in self._accepted
+
+    def submit(self, command: str) -> bool:
+        """
+        Validates and queues a command, must be called on the event loop e.g. through `call_soon_threadsafe`
+        :param command: Command without crc or terminator e.g. POP02
+        :return: True when the command was queued
+        """
+        self.__ensure_running()
+        reason = self._validator.validate(command)
+        if reason is not None:
+            self._logger.warning(f'Rejected command: {command!r}, {reason}')
+            self.__send_acknowledgement(command, 'rejected', reason)
+            return False
+        now = time.monotonic()
+        if self.__is_duplicate(command, now):
+            self._logger.debug(f'Dropped duplicate command: {command}')
+            self.__send_acknowledgement(command, 'duplicate')
+            return False
+        try:
+            self._queue.put_nowait(command)
+        except asyncio.QueueFull:
+            self._logger.warning(f'Rejected command: {command}, {self.depth} commands already queued')
+            self.__send_acknowledgement(command, 'busy')
+            return False
+        self._accepted[command] = now
+        return True
+
+    async def __consume(self) -> None:
+        while True:
+            command = await self._queue.get()
+            try:
+                response = await self._dispatcher.queue_pending_command(command)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f'Unable to execute command: {command}', exc_info=e)
+                response = None
+            if self._on_executed is not None:
+                self._on_executed(command)
+            if response is None:
+                self.__send_acknowledgement(command, 'failed', 'No valid response from device')
+            elif response.is_nak():
+                self.__send_acknowledgement(command, 'rejected', 'NAK')
+            else:
+                self.__send_acknowledgement(command, 'ok', response.payload.tobytes().decode('latin-1'))
+
+    async def stop(self) -> None:
+        """
+        Stops handing commands to the dispatcher, queued commands are dropped
+        """
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
@@ -0,0 +1,165 @@
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from common.helper import LoggerFactory
+from common.model import RawResponse
+
+
+class CommandPriority(IntEnum):
+    """
+    Lower values are sent to the device first
+    """
+    USER = 0
+    TELEMETRY = 10
+
+
+class CommandScheduler:
+    """
+    Per-device command queue with a single consumer task that owns the bus. Commands are sent in priority order,
+    duplicate queries that are still pending share one exchange and the number of pending commands is bounded
+    """
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            execute: Callable[[str], Awaitable[Optional[RawResponse]]],
+            max_pending: int = 25
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param execute: Coroutine performing the actual exchange with the device
+        :param max_pending: Maximum number of distinct commands waiting to be sent
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._execute = execute
+        self._max_pending = max_pending
+        self._queue: List[Tuple[int, int, str, asyncio.Future]] = []
+        # pending queries by command, used to coalesce duplicates
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._outstanding = 0
+        self._space_waiters: 'deque[asyncio.Future]' = deque()
+        self._sequence = itertools.count()
+        self._ready: Optional[asyncio.Event] = None
+        self._consumer: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """
+        :return: Number of distinct commands waiting for a response
+        """
+        return self._outstanding
+
+    @property
+    def is_full(self) -> bool:
+        return self._outstanding >= self._max_pending
+
+    def __ensure_running(self) -> None:
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.get_running_loop().create_task(self.__consume())
+
+    async def __wait_for_space(self) -> None:
+        while self.is_full:
+            waiter = asyncio.get_running_loop().create_future()
+            self._space_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._space_waiters:
+                    self._space_waiters.remove(waiter)
+
+    def __on_complete(self, command: str, future: asyncio.Future) -> None:
+        if self._pending.get(command) is future:
+            del self._pending[command]
+        self._outstanding -= 1
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    @staticmethod
+    def __is_query(command: str) -> bool:
+        return command.startswith('Q')
+
+    def __enqueue(self, command: str, priority: int) -> asyncio.Future:
+        future = self._pending.get(command) if self.__is_query(command) else None
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(lambda done: self.__on_complete(command, done))
+            self._outstanding += 1
+            if self.__is_query(command):
+                self._pending[command] = future
+        # re-queueing a coalesced command lets a higher priority caller move it forward, the entry popped later
+        # finds its future already resolved and is skipped
+        heapq.heappush(self._queue, (priority, next(self._sequence), command, future))
+        self._ready.set()
+        return future
+
+    def __is_coalesced(self, command: str) -> bool:
+        return self.__is_query(command) and command in self._pending
+
+    async def submit(self, command: str, priority: int = CommandPriority.TELEMETRY) -> Optional[RawResponse]:
+        """
+        Queues a command and waits for its response, waiting for space first when the queue is full
+        :param command: Command without crc or terminator
+        :param priority: Position in the queue, see `CommandPriority`
+        :return: Response of the command
+        """
+        self.__ensure_running()
+        if not self.__is_coalesced(command):
+            await self.__wait_for_space()
+        future = self.__enqueue(command, priority)
+        return await asyncio.shield(future)
+
+    def submit_nowait(self, command: str, priority: int = CommandPriority.TELEMETRY) -> asyncio.Future:
+        """
+        Queues a command without waiting for space
+        :param command: Command without crc or terminator
+        :param priority: Position in the queue, see `CommandPriority`
+        :return: Future resolving to the response of the command
+        :raises asyncio.QueueFull: When the maximum number of pending commands has been reached
+        """
+        self.__ensure_running()
+        if not self.__is_coalesced(command) and self.is_full:
+            raise asyncio.QueueFull(f'Unable to queue command: {command}, {self.depth} commands pending')
+        return self.__enqueue(command, priority)
+
+    async def __consume(self) -> None:
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            priority, _, command, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            try:
+                result = await self._execute(command)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self._logger.error(f'Unable to execute command: {command}', exc_info=e)
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    async def stop(self) -> None:
+        """
+        Stops the consumer task and cancels every pending command
+        """
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+        for _, _, _, future in self._queue:
+            future.cancel()
+        self._queue.clear()
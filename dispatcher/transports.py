@@ -0,0 +1,288 @@
+import asyncio
+import errno
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from serial import SerialBase
+
+
+class TransportContract(ABC):
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        pass
+
+    @abstractmethod
+    def is_healthy(self) -> bool:
+        """
+        :return: True when the device can still be used for exchanges
+        """
+        pass
+
+    @abstractmethod
+    async def exchange(self, frame: bytes, timeout: Optional[float] = None) -> bytes:
+        """
+        Writes a command frame and waits for the matching response
+        :param frame: Command frame to write
+        :param timeout: Seconds to wait for the full exchange, None waits forever
+        :return: Response frame
+        :raises asyncio.TimeoutError: When the device does not respond in time
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+class SerialTransport(TransportContract):
+    """
+    Non-blocking transport over a pyserial handle. Reads and writes are driven by event loop readiness
+    callbacks on the handle's file descriptor, so a slow device never stalls other tasks on the loop.
+    Handlers without a file descriptor e.g. `loop://` are polled instead
+    """
+    __POLL_INTERVAL: float = 0.005
+    __READ_SIZE: int = 256
+
+    def __init__(self, stream: 'SerialBase', terminator: bytes = b'\x0d') -> None:
+        """
+        :param stream: An open pyserial handle, usually created through `serial.serial_for_url`
+        :param terminator: Byte sequence marking the end of a response frame
+        """
+        self._stream = stream
+        self._terminator = terminator
+        self._buffer = bytearray()
+        self._fd = self.__file_descriptor(stream)
+        # a zero timeout turns pyserial reads and writes into single non-blocking attempts
+        self._stream.timeout = 0
+        if self._fd is not None:
+            self._stream.write_timeout = 0
+
+    @staticmethod
+    def __file_descriptor(stream: 'SerialBase') -> Optional[int]:
+        try:
+            return stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    @staticmethod
+    def __wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def __wait_readable(self) -> None:
+        if self._fd is None:
+            await asyncio.sleep(self.__POLL_INTERVAL)
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        loop.add_reader(self._fd, self.__wake, waiter)
+        try:
+            await waiter
+        finally:
+            loop.remove_reader(self._fd)
+
+    async def __wait_writable(self) -> None:
+        if self._fd is None:
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        loop.add_writer(self._fd, self.__wake, waiter)
+        try:
+            await waiter
+        finally:
+            loop.remove_writer(self._fd)
+
+    def __discard_pending_input(self) -> None:
+        self._buffer.clear()
+        while self._stream.read(self.__READ_SIZE):
+            pass
+
+    @property
+    def is_open(self) -> bool:
+        return self._stream.is_open
+
+    def is_healthy(self) -> bool:
+        """
+        :return: True when the underlying handle is open and still responds to driver queries
+        """
+        try:
+            return self._stream.is_open and self._stream.in_waiting >= 0
+        except (OSError, ValueError):
+            return False
+
+    async def write(self, frame: bytes) -> int:
+        """
+        Writes a frame without blocking the event loop
+        :param frame: Bytes to write
+        :return: Total bytes written
+        """
+        view = memoryview(frame)
+        written = 0
+        while written < len(view):
+            await self.__wait_writable()
+            written += self._stream.write(view[written:]) or 0
+        return written
+
+    async def read_frame(self) -> bytes:
+        """
+        Reads from the device until the terminator arrives, bytes after the terminator are kept for the next frame
+        :return: A complete frame including its terminator
+        """
+        while True:
+            end = self._buffer.find(self._terminator)
+            if end >= 0:
+                end += len(self._terminator)
+                frame = bytes(self._buffer[:end])
+                del self._buffer[:end]
+                return frame
+            chunk = self._stream.read(self.__READ_SIZE)
+            if chunk:
+                self._buffer += chunk
+            else:
+                await self.__wait_readable()
+
+    async def __exchange(self, frame: bytes) -> bytes:
+        await self.write(frame)
+        return await self.read_frame()
+
+    async def exchange(self, frame: bytes, timeout: Optional[float] = None) -> bytes:
+        self.__discard_pending_input()
+        return await asyncio.wait_for(self.__exchange(frame), timeout)
+
+    def close(self) -> None:
+        self._buffer.clear()
+        self._stream.close()
+
+
+class HidRawTransport(TransportContract):
+    """
+    Transport for inverters exposed as USB HID devices through `/dev/hidraw*`. Commands are written as 8-byte
+    reports straight to the device node and responses are read back into a reusable buffer until the terminator.
+    Writes are only paced when the device pushes back, the delay is measured and relaxes again once it keeps up
+    """
+    __REPORT_SIZE: int = 8
+    __PACE_LIMIT: float = 0.2
+
+    def __init__(
+            self,
+            interface: str,
+            terminator: bytes = b'\x0d',
+            max_response_size: int = 512
+    ) -> None:
+        """
+        :param interface: Path of the hidraw device node
+        :param terminator: Byte sequence marking the end of a response frame
+        :param max_response_size: Size of the response buffer, longer responses are rejected
+        """
+        self._interface = interface
+        self._terminator = terminator
+        self._fd: Optional[int] = os.open(interface, os.O_RDWR | os.O_NONBLOCK)
+        self._buffer = bytearray(max_response_size)
+        self._view = memoryview(self._buffer)
+        self._report = bytearray(self.__REPORT_SIZE)
+        self._pace: float = 0.0
+
+    @property
+    def pace(self) -> float:
+        """
+        :return: Seconds currently waited between reports, zero while the device keeps up
+        """
+        return self._pace
+
+    @staticmethod
+    def __wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def __wait_for(self, register, unregister) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        register(self._fd, self.__wake, waiter)
+        try:
+            await waiter
+        finally:
+            unregister(self._fd)
+
+    def __discard_pending_input(self) -> None:
+        try:
+            while os.readv(self._fd, [self._view]) > 0:
+                pass
+        except BlockingIOError:
+            pass
+
+    async def __write_report(self, report: bytearray) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                os.write(self._fd, report)
+                # relax pacing again while the device keeps up
+                self._pace = self._pace / 2 if self._pace > 0.001 else 0.0
+                return
+            except BlockingIOError:
+                started = time.monotonic()
+                await self.__wait_for(loop.add_writer, loop.remove_writer)
+                stalled = time.monotonic() - started
+                self._pace = min(max(self._pace, stalled), self.__PACE_LIMIT)
+
+    async def write(self, frame: bytes) -> int:
+        """
+        Writes a frame as a sequence of zero padded 8-byte reports
+        :param frame: Bytes to write
+        :return: Total bytes of the frame written
+        """
+        view = memoryview(frame)
+        report = self._report
+        for offset in range(0, len(view), self.__REPORT_SIZE):
+            if offset and self._pace:
+                await asyncio.sleep(self._pace)
+            chunk = view[offset:offset + self.__REPORT_SIZE]
+            report[:len(chunk)] = chunk
+            report[len(chunk):] = bytes(self.__REPORT_SIZE - len(chunk))
+            await self.__write_report(report)
+        return len(view)
+
+    async def read_frame(self) -> bytes:
+        """
+        Reads reports from the device until the terminator arrives, report padding after it is dropped
+        :return: A complete frame including its terminator
+        """
+        loop = asyncio.get_running_loop()
+        length = 0
+        while True:
+            if length >= len(self._buffer):
+                raise OSError(errno.EMSGSIZE, f'Response from {self._interface} exceeds {len(self._buffer)} bytes')
+            try:
+                received = os.readv(self._fd, [self._view[length:]])
+            except BlockingIOError:
+                await self.__wait_for(loop.add_reader, loop.remove_reader)
+                continue
+            if received == 0:
+                raise OSError(errno.ENODEV, f'Device {self._interface} was disconnected')
+            end = self._buffer.find(self._terminator, length, length + received)
+            if end >= 0:
+                return bytes(self._view[:end + len(self._terminator)])
+            length += received
+
+    async def __exchange(self, frame: bytes) -> bytes:
+        await self.write(frame)
+        return await self.read_frame()
+
+    @property
+    def is_open(self) -> bool:
+        return self._fd is not None
+
+    def is_healthy(self) -> bool:
+        return self._fd is not None and os.path.exists(self._interface)
+
+    async def exchange(self, frame: bytes, timeout: Optional[float] = None) -> bytes:
+        self.__discard_pending_input()
+        return await asyncio.wait_for(self.__exchange(frame), timeout)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1 +1,10 @@
-from engine.plugin import InverterCore
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from engine.plugin import InverterCore
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'InverterCore': '.plugin'
+})
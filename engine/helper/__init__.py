@@ -1 +1,16 @@
-from .helpers import PluginUtility
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .helpers import PluginUtility
+    from .indexes import PluginManifestIndex
+    from .planners import PollPlanner
+    from .registries import PluginRegistry
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'PluginUtility': '.helpers',
+    'PluginManifestIndex': '.indexes',
+    'PollPlanner': '.planners',
+    'PluginRegistry': '.registries'
+})
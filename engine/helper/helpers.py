@@ -5,21 +5,23 @@ import sys
 from subprocess import CalledProcessError
 from typing import List, Optional
 
-import pkg_resources
-from dacite import ForwardReferenceError, UnexpectedDataError, WrongTypeError, MissingValueError
-from pkg_resources import Distribution
-
 from common.helper import FileSystem, LoggerFactory
 
+from .indexes import PluginManifestIndex
 from ..model import PluginConfig, DependencyModule
 
 
 class PluginUtility:
     __IGNORE_LIST = ['__pycache__']
 
-    def __init__(self, logger_factory: LoggerFactory) -> None:
+    def __init__(self, logger_factory: LoggerFactory, index: Optional[PluginManifestIndex] = None) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param index: Index of previously checked plugin manifests, every start scans all manifests without one
+        """
         super().__init__()
         self._logger = logger_factory.create_logger(__name__)
+        self._index = index
 
     @staticmethod
     def __filter_unwanted_directories(name: str) -> bool:
@@ -39,27 +41,27 @@ class PluginUtility:
             )
         )
 
-    @staticmethod
-    def __get_missing_packages(
-            installed: List[Distribution],
-            required: Optional[List[DependencyModule]]
-    ) -> List[DependencyModule]:
-        missing = list()
-        if required is not None:
-            installed_packages: List[str] = [pkg.project_name for pkg in installed]
-            for required_pkg in required:
-                if not installed_packages.__contains__(required_pkg.name):
-                    missing.append(required_pkg)
-        return missing
-
-    def __manage_requirements(self, package_name: str, plugin_config: PluginConfig):
-        # TODO: update existing dependencies if plugin requires newer version?
-        #  (probably not a good idea for the sake of stability)
-        #  pip install -U dependency>=version
-        installed_packages: List[Distribution] = list(
-            filter(lambda pkg: isinstance(pkg, Distribution), pkg_resources.working_set)
-        )
-        missing_packages = self.__get_missing_packages(installed_packages, plugin_config.requirements)
+    def __is_satisfied(self, requirement: DependencyModule) -> bool:
+        # only needed when a manifest is not indexed yet
+        from importlib.metadata import PackageNotFoundError, version
+        from packaging.version import InvalidVersion, Version
+        try:
+            installed = version(requirement.name)
+        except PackageNotFoundError:
+            return False
+        try:
+            return Version(installed) >= Version(requirement.version)
+        except InvalidVersion:
+            self._logger.warning(f'Unable to compare version {installed} of installed package with {requirement}')
+            return True
+
+    def __get_missing_packages(self, required: Optional[List[DependencyModule]]) -> List[DependencyModule]:
+        if required is None:
+            return []
+        return [requirement for requirement in required if not self.__is_satisfied(requirement)]
+
+    def __manage_requirements(self, package_name: str, plugin_config: PluginConfig) -> bool:
+        missing_packages = self.__get_missing_packages(plugin_config.requirements)
         for missing in missing_packages:
             self._logger.info(f'Preparing installation of module: {missing} for package: {package_name}')
             try:
@@ -73,34 +75,73 @@ class PluginUtility:
                     f'Installation of module: {missing} for package: {package_name} was returned exit code: {exit_code}'
                 )
             except CalledProcessError as e:
-                self._logger.error(f'Unable to install package {missing}', e)
+                self._logger.error(f'Unable to install package {missing}', exc_info=e)
+                return False
+        return True
 
     def __read_configuration(self, module_path) -> Optional[PluginConfig]:
+        from dacite import from_dict, ForwardReferenceError, UnexpectedDataError, WrongTypeError, MissingValueError
         try:
-            plugin_config = FileSystem.load_configuration(PluginConfig, 'plugin.yaml', module_path)
-            return plugin_config
+            document = FileSystem.load_document('plugin.yaml', module_path)
         except FileNotFoundError as e:
-            self._logger.error('Unable to read plugin.yaml file', e)
+            self._logger.error('Unable to read plugin.yaml file', exc_info=e)
+            return None
+        if not document:
+            # e.g. a protocol package that is not a plugin yet
+            self._logger.debug(f'Skipping empty plugin.yaml under: {module_path}')
+            return None
+        try:
+            return from_dict(PluginConfig, document)
         except (NameError, ForwardReferenceError, UnexpectedDataError, WrongTypeError, MissingValueError) as e:
-            self._logger.error('Unable to parse plugin configuration to data class', e)
+            self._logger.error('Unable to parse plugin configuration to data class', exc_info=e)
         return None
 
-    def setup_plugin_configuration(self, package_name, module_name) -> Optional[str]:
+    def read_plugin_configuration(self, package_name, module_name) -> Optional[PluginConfig]:
         """
-        Handles primary configuration for a give package and module
+        Reads the manifest of a potential plugin and installs its missing requirements
         :param package_name: package of the potential plugin
         :param module_name: module of the potential plugin
-        :return: a module name to import
+        :return: the plugin manifest, None when the module is not a plugin
         """
         # if the item has not folder we will assume that it is a directory
         module_path = os.path.join(FileSystem.get_plugins_directory(), module_name)
         if os.path.isdir(module_path):
+            indexed_config = self._index.get(module_path) if self._index is not None else None
+            if indexed_config is not None:
+                self._logger.debug(f'Using indexed configuration for module: {module_name}')
+                return indexed_config
             self._logger.debug(f'Checking if configuration file exists for module: {module_name}')
             plugin_config: Optional[PluginConfig] = self.__read_configuration(module_path)
             if plugin_config is not None:
-                self.__manage_requirements(package_name, plugin_config)
-                return plugin_config.runtime.main
+                if self.__manage_requirements(package_name, plugin_config) and self._index is not None:
+                    self._index.put(module_path, plugin_config)
+                return plugin_config
             else:
                 self._logger.debug(f'No configuration file exists for module: {module_name}')
         self._logger.debug(f'Module: {module_name} is not a directory, skipping scanning phase')
         return None
+
+    def setup_plugin_configuration(self, package_name, module_name) -> Optional[str]:
+        """
+        Handles primary configuration for a give package and module
+        :param package_name: package of the potential plugin
+        :param module_name: module of the potential plugin
+        :return: a module name to import
+        """
+        plugin_config = self.read_plugin_configuration(package_name, module_name)
+        return plugin_config.runtime.main if plugin_config is not None else None
+
+    def invalidate_plugin(self, module_name: str) -> None:
+        """
+        Forgets the indexed configuration of a plugin, its manifest and requirements are checked on the next scan
+        :param module_name: Directory name of the plugin
+        """
+        if self._index is not None:
+            self._index.invalidate(os.path.join(FileSystem.get_plugins_directory(), module_name))
+
+    def save_index(self) -> None:
+        """
+        Persists the manifest index after a scan
+        """
+        if self._index is not None:
+            self._index.save()
@@ -0,0 +1,133 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from common.helper import FileSystem, LoggerFactory
+
+from ..model import DependencyModule, PluginConfig, PluginRunTimeConfig
+
+
+class PluginManifestIndex:
+    """
+    On-disk index of plugin manifests keyed by the modification times of the plugin directory and its `plugin.yaml`,
+    a restart without changes to a plugin reuses the stored entry point and requirements instead of parsing the YAML
+    and checking installed packages again
+    """
+    __VERSION: int = 1
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            directory: str = 'cache',
+            file_name: str = 'plugin-index.json'
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param directory: Directory within the application main directory holding the index
+        :param file_name: Name of the index file
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._directory = directory
+        self._file_name = file_name
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._is_dirty = False
+
+    @staticmethod
+    def fingerprint(module_path: str) -> Optional[List[int]]:
+        """
+        :param module_path: Directory of a plugin
+        :return: Modification times and size identifying the current state of the plugin manifest
+        """
+        try:
+            directory = os.stat(module_path)
+            manifest = os.stat(os.path.join(module_path, 'plugin.yaml'))
+        except OSError:
+            return None
+        return [directory.st_mtime_ns, manifest.st_mtime_ns, manifest.st_size]
+
+    def __path(self) -> str:
+        return FileSystem.create_file(self._directory, self._file_name)
+
+    def __load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.__path()) as file:
+                    content = file.read()
+                index = json.loads(content) if content else {}
+                if index.get('version') == self.__VERSION:
+                    self._entries = index.get('plugins', {})
+            except (OSError, ValueError) as e:
+                self._logger.warning(f'Unable to read plugin index, plugins will be scanned again: {e}')
+        return self._entries
+
+    def get(self, module_path: str) -> Optional[PluginConfig]:
+        """
+        :param module_path: Directory of a plugin
+        :return: The indexed manifest, None when the plugin is not indexed or changed since it was indexed
+        """
+        entry = self.__load().get(os.path.basename(module_path))
+        if entry is None or entry['fingerprint'] != self.fingerprint(module_path):
+            return None
+        manifest = entry['manifest']
+        return PluginConfig(
+            name=manifest['name'],
+            alias=manifest['alias'],
+            creator=manifest['creator'],
+            runtime=PluginRunTimeConfig(**manifest['runtime']),
+            repository=manifest['repository'],
+            description=manifest['description'],
+            version=manifest['version'],
+            requirements=[DependencyModule(**requirement) for requirement in manifest['requirements'] or []]
+        )
+
+    def put(self, module_path: str, plugin_config: PluginConfig) -> None:
+        """
+        Indexes a manifest once its requirements are satisfied
+        :param module_path: Directory of a plugin
+        :param plugin_config: Parsed manifest of the plugin
+        """
+        fingerprint = self.fingerprint(module_path)
+        if fingerprint is None:
+            return
+        self.__load()[os.path.basename(module_path)] = {
+            'fingerprint': fingerprint,
+            'manifest': {
+                'name': plugin_config.name,
+                'alias': plugin_config.alias,
+                'creator': plugin_config.creator,
+                'runtime': {'main': plugin_config.runtime.main, 'tests': plugin_config.runtime.tests},
+                'repository': plugin_config.repository,
+                'description': plugin_config.description,
+                'version': plugin_config.version,
+                'requirements': [
+                    {'name': requirement.name, 'version': requirement.version}
+                    for requirement in plugin_config.requirements or []
+                ]
+            }
+        }
+        self._is_dirty = True
+
+    def invalidate(self, module_path: str) -> None:
+        """
+        Drops the entry of a plugin e.g. when it failed to import, so its manifest and requirements are checked again
+        :param module_path: Directory of a plugin
+        """
+        if self.__load().pop(os.path.basename(module_path), None) is not None:
+            self._is_dirty = True
+
+    def save(self) -> None:
+        """
+        Writes the index to disk when it changed
+        """
+        if not self._is_dirty:
+            return
+        path = self.__path()
+        temporary_path = f'{path}.tmp'
+        try:
+            with open(temporary_path, 'w') as file:
+                json.dump({'version': self.__VERSION, 'plugins': self._entries}, file)
+            os.replace(temporary_path, path)
+            self._is_dirty = False
+        except OSError as e:
+            self._logger.warning(f'Unable to write plugin index: {e}')
@@ -0,0 +1,175 @@
+import asyncio
+import random
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from common.helper import LoggerFactory, MetricsRegistry
+from common.model import DeviceConfig
+from dispatcher import BusTimer
+from processor.model import DecodedResponse
+from ..plugin import InverterCore
+
+
+class _PollTask:
+    __slots__ = ('name', 'fetch', 'target', 'order', 'interval', 'duration', 'backoff', 'due')
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Any]], target: float, order: int) -> None:
+        self.name = name
+        self.fetch = fetch
+        # interval asked for in the configuration
+        self.target = target
+        # tells tasks that are due at the same time apart, lower runs first
+        self.order = order
+        # planned interval
+        self.interval = target
+        # smoothed seconds a poll holds the bus, 0 until measured
+        self.duration = 0.0
+        # shortest interval while failing, 0 when healthy
+        self.backoff = 0.0
+        self.due = 0.0
+
+
+class PollPlanner:
+    """
+    Polls one device with every command at its own interval. The bus time of every command is measured by the
+    dispatchers, without the time it waited behind other commands, and the intervals are planned so polling keeps the
+    serial line busy for at most `PollConfig.bus_budget` of the time: further commands run at their target intervals,
+    limited to half the budget, and the status takes what is left down to `poll_interval`. A failing command backs
+    off exponentially and tightens again with every success, every poll is delayed by a random jitter so devices on
+    one host do not line up their bursts
+    """
+    STATUS: str = 'status'
+    __SMOOTHING: float = 0.2
+    # first back off step when a command fails faster than its interval
+    __MIN_BACKOFF: float = 0.05
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            inverter: InverterCore,
+            on_sample: Callable[[DeviceConfig, DecodedResponse], Awaitable[Any]],
+            metrics: Optional[MetricsRegistry] = None,
+            seed: Optional[int] = None
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param inverter: Plugin instance of the device, the status is fetched through `fetch_status` and further
+        commands through `invoke`
+        :param on_sample: Coroutine receiving every sample e.g. to publish it
+        :param metrics: Registry to expose the planned intervals in
+        :param seed: Seed of the jitter for a repeatable plan
+        :raises ValueError: When the bus budget is not within (0, 1] or a command interval is not positive
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._inverter = inverter
+        self._on_sample = on_sample
+        self._device = inverter.device_config
+        self._policy = self._device.poll
+        if not 0 < self._policy.bus_budget <= 1:
+            raise ValueError(f'Bus budget of device: {self._device.device_name} must be within (0, 1]')
+        for command, interval in self._policy.commands.items():
+            if interval <= 0:
+                raise ValueError(f'Poll interval of {command} of device: {self._device.device_name} must be positive')
+        self._random = random.Random(seed)
+        self._status = _PollTask(self.STATUS, inverter.fetch_status, self._device.poll_interval, 0)
+        self._tasks: List[_PollTask] = [self._status] + [
+            _PollTask(command, partial(inverter.invoke, command), interval, order)
+            for order, (command, interval) in enumerate(self._policy.commands.items(), start=1)
+        ]
+        if metrics is not None:
+            device = self._device.device_name
+            for task in self._tasks:
+                metrics.gauge(
+                    'mppt_poll_interval_seconds', 'Planned seconds between polls',
+                    partial(getattr, task, 'interval'), device=device, command=task.name
+                )
+            metrics.gauge(
+                'mppt_poll_bus_share', 'Planned share of time polling keeps the serial line busy',
+                lambda: self.bus_share, device=device
+            )
+
+    @property
+    def intervals(self) -> Dict[str, float]:
+        """
+        :return: Planned seconds between polls by command, the status is keyed by `STATUS`
+        """
+        return {task.name: task.interval for task in self._tasks}
+
+    @property
+    def bus_share(self) -> float:
+        """
+        :return: Share of time the serial line is expected to be busy with the planned intervals
+        """
+        return sum(task.duration / task.interval for task in self._tasks if task.interval > 0)
+
+    def __plan(self) -> None:
+        budget = self._policy.bus_budget
+        others = self._tasks[1:]
+        share = sum(task.duration / task.target for task in others)
+        # further commands are stretched evenly once they would take more than half the budget
+        stretch = max(1.0, share / (budget / 2))
+        for task in others:
+            task.interval = max(task.target * stretch, task.duration, task.backoff)
+        status = self._status
+        status.interval = max(status.target, status.duration / (budget - share / stretch), status.backoff)
+
+    def __measure(self, task: _PollTask, elapsed: float, is_success: bool) -> None:
+        if task.duration:
+            task.duration += self.__SMOOTHING * (elapsed - task.duration)
+        else:
+            task.duration = elapsed
+        if is_success:
+            # tightens step by step, a device that recovered briefly is not hammered right away
+            task.backoff = task.backoff / 2 if task.backoff / 2 > task.target else 0.0
+        else:
+            task.backoff = min(
+                self._policy.max_backoff,
+                2 * max(task.backoff, task.target, task.duration, self.__MIN_BACKOFF)
+            )
+            self._logger.debug(
+                'Backing off %s of device: %s to %.2fs', task.name, self._device.device_name, task.backoff
+            )
+
+    def __schedule(self, task: _PollTask, started: float) -> None:
+        jitter = self._random.uniform(0.0, self._policy.jitter * task.interval)
+        task.due = max(started + task.interval + jitter, time.monotonic())
+
+    async def __poll(self, task: _PollTask) -> None:
+        started = time.monotonic()
+        sample = None
+        with BusTimer() as timer:
+            try:
+                sample = await task.fetch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f'Unable to poll {task.name} of device: {self._device.device_name}', exc_info=e)
+        # plugins talking to the device without a dispatcher are measured by the time the poll took
+        elapsed = timer.seconds if timer.exchanges else time.monotonic() - started
+        self.__measure(task, elapsed, sample is not None)
+        self.__plan()
+        self.__schedule(task, started)
+        if sample is None:
+            return
+        try:
+            await self._on_sample(self._device, sample)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._logger.error(f'Unable to handle {task.name} of device: {self._device.device_name}', exc_info=e)
+
+    async def run(self) -> None:
+        """
+        Polls the device until cancelled
+        """
+        now = time.monotonic()
+        for task in self._tasks:
+            # a random phase keeps devices started together apart from the first poll on
+            task.due = now + self._random.uniform(0.0, self._policy.jitter * task.interval)
+        while True:
+            task = min(self._tasks, key=lambda candidate: (candidate.due, candidate.order))
+            delay = task.due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.__poll(task)
@@ -0,0 +1,185 @@
+import os
+from importlib import import_module
+from types import ModuleType
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from common.helper import FileSystem, LoggerFactory
+from common.model import DeviceConfig
+from dispatcher import DispatcherContract
+from processor.helper import CommandFrameCache, ResponseDecoderCompiler
+
+from .helpers import PluginUtility
+from ..model import PluginConfig
+from ..plugin import IPluginRegistry, InverterCore, ProtocolCore
+
+
+class _PluginEntry(NamedTuple):
+    package_name: str
+    directory: str
+    config: PluginConfig
+
+
+class PluginRegistry:
+    """
+    Plugins found under the plugins directory keyed by the `alias` in their `plugin.yaml`. Scanning only reads the
+    manifests, a plugin module is imported the first time its alias is requested and every device using the plugin
+    shares the loaded classes, their pre-computed frames and compiled decoders
+    """
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            plugin_utility: PluginUtility,
+            frame_cache: Optional[CommandFrameCache] = None
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param plugin_utility: Reads plugin manifests and installs their requirements
+        :param frame_cache: Cache to pre-compute the frames of the commands a plugin polls
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._logger_factory = logger_factory
+        self._plugin_utility = plugin_utility
+        self._frame_cache = frame_cache
+        self._entries: Dict[str, _PluginEntry] = {}
+        # classes of imported plugins by alias, an empty list marks a plugin that failed to load
+        self._classes: Dict[str, List[type]] = {}
+        self._protocols: Dict[str, ProtocolCore] = {}
+        # (alias, device name) -> inverter
+        self._inverters: Dict[Tuple[str, str], InverterCore] = {}
+
+    @property
+    def aliases(self) -> List[str]:
+        """
+        :return: Aliases of every plugin found by `index`
+        """
+        return list(self._entries)
+
+    def manifest(self, alias: str) -> Optional[PluginConfig]:
+        """
+        :param alias: Plugin alias e.g. `axpert-king-5kw`
+        :return: Manifest of the plugin, None when no plugin uses the alias
+        """
+        entry = self._entries.get(alias)
+        return entry.config if entry is not None else None
+
+    def index(self) -> None:
+        """
+        Scans the plugins directory for manifests, previously loaded plugins and their instances are dropped
+        """
+        self._entries.clear()
+        self._classes.clear()
+        self._protocols.clear()
+        self._inverters.clear()
+        plugins_package = FileSystem.get_plugins_directory()
+        package_name = os.path.basename(os.path.normpath(plugins_package))
+        self._logger.debug(f'Searching for plugins under package {plugins_package}')
+        for directory in PluginUtility.filter_plugins_paths(plugins_package):
+            plugin_config = self._plugin_utility.read_plugin_configuration(package_name, directory)
+            if plugin_config is None:
+                continue
+            existing = self._entries.get(plugin_config.alias)
+            if existing is not None:
+                self._logger.warning(
+                    f'Ignoring plugin: {directory}, alias: {plugin_config.alias} is used by: {existing.directory}'
+                )
+                continue
+            self._entries[plugin_config.alias] = _PluginEntry(package_name, directory, plugin_config)
+        self._plugin_utility.save_index()
+        self._logger.debug(f'Indexed plugins: {self.aliases}')
+
+    @staticmethod
+    def __import(entry: _PluginEntry) -> ModuleType:
+        plugin_name, plugin_ext = os.path.splitext(entry.config.runtime.main)
+        # importing the module registers its classes with IPluginRegistry
+        return import_module(f'.{entry.directory}.{plugin_name}', entry.package_name)
+
+    def __import_plugin(self, alias: str, entry: _PluginEntry) -> Optional[ModuleType]:
+        try:
+            return self.__import(entry)
+        except ImportError as e:
+            # requirements are only checked when the manifest is not indexed, check them again before giving up
+            self._logger.warning(f'Unable to import plugin: {alias}, checking its requirements again: {e}')
+            self._plugin_utility.invalidate_plugin(entry.directory)
+            plugin_config = self._plugin_utility.read_plugin_configuration(entry.package_name, entry.directory)
+            self._plugin_utility.save_index()
+            if plugin_config is None:
+                return None
+        try:
+            return self.__import(entry)
+        except ImportError as e:
+            self._logger.error(f'Unable to import plugin: {alias}', exc_info=e)
+            return None
+
+    def __prepare(self, plugin: type) -> None:
+        query_commands = getattr(plugin, 'query_commands', None)
+        if self._frame_cache is not None and query_commands:
+            self._frame_cache.warm(query_commands)
+            self._logger.debug(f'Pre-computed frames for commands: {query_commands}')
+        command_definitions = getattr(plugin, 'command_definitions', None)
+        if command_definitions:
+            plugin.response_decoders = ResponseDecoderCompiler().compile_all(command_definitions)
+            self._logger.debug(f'Compiled response decoders for commands: {list(command_definitions)}')
+
+    def __classes_for(self, alias: str) -> List[type]:
+        classes = self._classes.get(alias)
+        if classes is not None:
+            return classes
+        entry = self._entries.get(alias)
+        if entry is None:
+            self._logger.error(f'No plugin found with alias: {alias}, indexed plugins: {self.aliases}')
+            return []
+        module = self.__import_plugin(alias, entry)
+        classes = IPluginRegistry.classes_in(module.__name__) if module is not None else []
+        if module is not None and not classes:
+            self._logger.error(f'No plugin found in registry for module: {module.__name__}')
+        for plugin in classes:
+            if issubclass(plugin, InverterCore):
+                self.__prepare(plugin)
+        self._classes[alias] = classes
+        return classes
+
+    def __find(self, alias: str, base: type) -> Optional[type]:
+        return next((plugin for plugin in self.__classes_for(alias) if issubclass(plugin, base)), None)
+
+    def load(self, alias: str) -> Optional[type]:
+        """
+        Imports a plugin on first use
+        :param alias: Plugin alias e.g. `axpert-king-5kw`
+        :return: The `InverterCore` class of the plugin, None when it could not be loaded
+        """
+        return self.__find(alias, InverterCore)
+
+    def inverter(
+            self,
+            alias: str,
+            device_config: DeviceConfig,
+            dispatcher: Optional[DispatcherContract] = None
+    ) -> Optional[InverterCore]:
+        """
+        :param alias: Plugin alias e.g. `axpert-king-5kw`
+        :param device_config: Device the inverter talks to
+        :param dispatcher: Dispatcher for sending commands to the device, only used when the instance is created
+        :return: The inverter instance of the plugin for the device, created on first request
+        """
+        key = (alias, device_config.device_name)
+        inverter = self._inverters.get(key)
+        if inverter is None:
+            plugin = self.load(alias)
+            if plugin is None:
+                return None
+            inverter = self._inverters[key] = plugin(device_config, self._logger_factory, dispatcher)
+        return inverter
+
+    def protocol(self, alias: str) -> Optional[ProtocolCore]:
+        """
+        :param alias: Plugin alias
+        :return: The protocol instance of the plugin, one instance is shared by every device
+        """
+        protocol = self._protocols.get(alias)
+        if protocol is None:
+            plugin = self.__find(alias, ProtocolCore)
+            if plugin is None:
+                return None
+            protocol = self._protocols[alias] = plugin(self._logger_factory)
+        return protocol
@@ -1,80 +1,66 @@
-import os
-from importlib import import_module
-from typing import Optional, Any, List
+import asyncio
+from typing import Optional, Any, List, Callable, Awaitable
 
-from common.helper import LoggerFactory, FileSystem
+from common.helper import LoggerFactory, MetricsRegistry
+from common.model import DeviceConfig
+from dispatcher import DispatcherContract
+from processor.helper import CommandFrameCache
+from processor.model import DecodedResponse
 from .. import InverterCore
-from ..helper import PluginUtility
-from ..plugin import IPluginRegistry
+from ..helper import PluginRegistry, PluginUtility, PollPlanner
 
 
 class PluginUseCase:
-    __loaded_module: Optional[type] = None
 
     def __init__(
             self,
             logger_factory: LoggerFactory,
             plugin_utility: PluginUtility,
-            plugin_name: str
+            plugin_name: str,
+            frame_cache: Optional[CommandFrameCache] = None
     ) -> None:
         super().__init__()
         self._logger = logger_factory.create_logger(__name__)
         self._plugin_name = plugin_name
-        self._plugin_utility = plugin_utility
-        self._logger_factory = logger_factory
+        self._registry = PluginRegistry(logger_factory, plugin_utility, frame_cache)
 
-    def __check_loaded_plugin_state(self, plugin_module: Any):
-        if IPluginRegistry.plugin_registry is not None:
-            latest_module = IPluginRegistry.plugin_registry
-            latest_module_name = latest_module.__module__
-            current_module_name = plugin_module.__name__
-            if current_module_name == latest_module_name:
-                self._logger.debug(f'Successfully imported module `{current_module_name}`')
-                self.__loaded_module = latest_module
-            else:
-                self._logger.error(
-                    f'Expected to import -> `{current_module_name}` but got -> `{latest_module_name}`'
-                )
-            # clear plugins from the registry when we're done with them
-            IPluginRegistry.plugin_registry = None
-        else:
-            self._logger.error(f'No plugin found in registry for module: {plugin_module}')
+    @property
+    def registry(self) -> PluginRegistry:
+        """
+        :return: Every discovered plugin by alias, plugins are imported on first use
+        """
+        return self._registry
 
-    def __search_for_plugins_in(self, plugins_path: List[str], package_name: str):
-        for directory in plugins_path:
-            entry_point = self._plugin_utility.setup_plugin_configuration(package_name, directory)
-            if entry_point is not None:
-                plugin_name, plugin_ext = os.path.splitext(entry_point)
-                # Importing the module will cause IPluginRegistry to invoke it's __init__ fun
-                import_target_module = f'.{directory}.{plugin_name}'
-                module = import_module(import_target_module, package_name)
-                self.__check_loaded_plugin_state(module)
-            else:
-                self._logger.debug(f'No valid plugin found in {package_name}')
+    @property
+    def loaded_plugin(self) -> Optional[type]:
+        """
+        :return: The plugin class of the configured plugin, imported on first access
+        """
+        return self._registry.load(self._plugin_name)
 
     def discover_plugins(self, reload: bool):
         """
-        Discover the plugin classes contained in Python files, given a
-        list of directory names to scan.
+        Indexes the manifests of the plugins under the plugins directory, no plugin module is imported
         """
         if reload:
-            self.__loaded_module = None
-            IPluginRegistry.plugin_registry = None
-            _plugins_package = FileSystem.get_plugins_directory()
-            self._logger.debug(f'Searching for plugins under package {_plugins_package}')
-            plugins_path = PluginUtility.filter_plugins_paths(_plugins_package)
-            package_name = os.path.basename(os.path.normpath(_plugins_package))
-            self.__search_for_plugins_in(plugins_path, package_name)
+            self._registry.index()
 
     @staticmethod
-    def register_plugin(module: type, logger_factory: LoggerFactory) -> InverterCore:
+    def register_plugin(
+            module: type,
+            device_config: DeviceConfig,
+            logger_factory: LoggerFactory,
+            dispatcher: Optional[DispatcherContract] = None
+    ) -> InverterCore:
         """
         Create a plugin instance from the given module
         :param module: module to initialize
+        :param device_config: device the plugin talks to
         :param logger_factory: factory for creating a logger
+        :param dispatcher: dispatcher for sending commands to the device
         :return: a high level plugin
         """
-        return module(logger_factory)
+        return module(device_config, logger_factory, dispatcher)
 
     @staticmethod
     def hook_plugin(plugin: InverterCore):
@@ -82,3 +68,33 @@ class PluginUseCase:
         Return a function accepting commands.
         """
         return plugin.invoke
+
+
+class PollingUseCase:
+    """
+    Polls several inverters concurrently on one event loop, every device has its own plugin instance, dispatcher
+    and `PollPlanner` so a slow device does not hold back the sample rate of the others
+    """
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            inverters: List[InverterCore],
+            on_sample: Callable[[DeviceConfig, DecodedResponse], Awaitable[Any]],
+            metrics: Optional[MetricsRegistry] = None
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param inverters: Plugin instances, one per device
+        :param on_sample: Coroutine receiving every sample e.g. to publish it
+        :param metrics: Registry to expose the planned poll intervals in
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self._planners = [PollPlanner(logger_factory, inverter, on_sample, metrics) for inverter in inverters]
+
+    async def run(self) -> None:
+        """
+        Polls every inverter until cancelled
+        """
+        self._logger.info(f'Polling {len(self._planners)} device(s)')
+        await asyncio.gather(*(planner.run() for planner in self._planners))
@@ -1,2 +1,2 @@
-from .settings import DependencyModule, PluginConfig, PluginRunTimeConfig
+from .settings import DependencyModule, PluginConfig, PluginRunTimeConfig, CachePolicy
 from .attributes import DeviceInfo
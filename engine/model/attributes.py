@@ -18,5 +18,12 @@ class DeviceInfo:
         yield 'serial_number', self.serial_number
         yield 'protocol_id', self.protocol_id
 
+    @property
+    def is_complete(self) -> bool:
+        """
+        :return: False when the device did not answer one of the commands the information is gathered from
+        """
+        return all(value is not None for _, value in self)
+
     def __str__(self) -> str:
         return f'{self.device_name} | {self.model} -> {self.firmware_version}'
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict
 
 
 @dataclass
@@ -27,3 +27,20 @@ class PluginConfig:
     description: str
     version: str
     requirements: Optional[List[DependencyModule]]
+
+
+@dataclass
+class CachePolicy:
+    # seconds a response stays fresh, None keeps it for the whole session and 0 disables caching
+    device_information: Optional[float] = None
+    settings: Optional[float] = 300.0
+    status: Optional[float] = 5.0
+    # freshness of responses to individual queries sent through `invoke` e.g. {'QMOD': 5.0}
+    queries: Dict[str, Optional[float]] = field(default_factory=dict)
+    # cache entries affected by set-commands starting with a given prefix, an empty prefix matches every command,
+    # the device flags reported by QFLAG are only changed by enabling (PE) or disabling (PD) them
+    invalidations: Dict[str, List[str]] = field(default_factory=lambda: {
+        '': ['settings', 'QPIRI', 'QMOD'],
+        'PE': ['QFLAG'],
+        'PD': ['QFLAG']
+    })
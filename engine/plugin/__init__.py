@@ -1 +1,14 @@
-from .core import IPluginRegistry, InverterCore
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .core import IPluginRegistry, InverterCore, ProtocolCore
+    from .caches import CachedInverterCore
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'IPluginRegistry': '.core',
+    'InverterCore': '.core',
+    'ProtocolCore': '.core',
+    'CachedInverterCore': '.caches'
+})
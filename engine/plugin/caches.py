@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from common.helper import LoggerFactory
+from common.model import CommandDefinition
+from processor.helper import ResponseDecoder
+from processor.model import DecodedResponse
+from .core import InverterCore
+from ..model import CachePolicy, DeviceInfo
+
+
+class CachedInverterCore(InverterCore):
+    """
+    Caching layer around an inverter plugin. Responses are kept for the time configured in `CachePolicy`,
+    concurrent callers asking for the same data share one request and set-commands invalidate the entries they affect,
+    set-commands sent to the device some other way are reported through `invalidate_for`
+    """
+
+    def __init__(
+            self,
+            inverter: InverterCore,
+            logger_factory: LoggerFactory,
+            policy: Optional[CachePolicy] = None
+    ) -> None:
+        """
+        :param inverter: Plugin instance to delegate to
+        :param logger_factory: Factory for creating a logger
+        :param policy: Freshness and invalidation rules, defaults to `CachePolicy()`
+        """
+        super().__init__(inverter.device_config, logger_factory, inverter._dispatcher)
+        self._inverter = inverter
+        self._policy = policy if policy is not None else CachePolicy()
+        # key -> (expiry, value), an expiry of None never expires
+        self._entries: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # bumped on invalidation so results of requests that started earlier are not stored
+        self._generations: Dict[str, int] = {}
+
+    @property
+    def query_commands(self) -> List[str]:
+        return self._inverter.query_commands
+
+    @property
+    def command_definitions(self) -> Dict[str, CommandDefinition]:
+        return self._inverter.command_definitions
+
+    @property
+    def response_decoders(self) -> Dict[str, ResponseDecoder]:
+        return self._inverter.response_decoders
+
+    def __lookup(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expiry, value = entry
+            if expiry is None or expiry > time.monotonic():
+                return True, value
+            del self._entries[key]
+        return False, None
+
+    def __store(self, key: str, ttl: Optional[float], value: Any) -> None:
+        expiry = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expiry, value)
+
+    async def __cached(
+            self,
+            key: str,
+            ttl: Optional[float],
+            fetch: Callable[[], Awaitable[Any]],
+            is_complete: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        if ttl == 0:
+            return await fetch()
+        found, value = self.__lookup(key)
+        if found:
+            return value
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        generation = self._generations.get(key, 0)
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # the exception is re-raised for this caller, mark it retrieved for the shared future
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+        # an incomplete value is handed to the callers waiting for it, the next caller asks again
+        if value is not None and is_complete(value) and generation == self._generations.get(key, 0):
+            self.__store(key, ttl, value)
+        future.set_result(value)
+        return value
+
+    def __affected_keys(self, command: str) -> Set[str]:
+        affected = set()
+        for prefix, keys in self._policy.invalidations.items():
+            if command.startswith(prefix):
+                affected.update(keys)
+        return affected
+
+    def invalidate(self, *keys: str) -> None:
+        """
+        Drops cached entries, every entry is dropped when no keys are given
+        :param keys: Cache keys e.g. `settings`, `status`, `device_information` or a query command like `QPIRI`
+        """
+        for key in keys or list(self._entries):
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_for(self, command: str) -> None:
+        """
+        Drops the entries a set-command affects, for set-commands that were sent to the device without `invoke` e.g.
+        by the `CommandIngestor`. Queries leave the cache as is
+        :param command: Command without crc or terminator e.g. POP02
+        """
+        if command.startswith('Q'):
+            return
+        affected = self.__affected_keys(command)
+        self._logger.debug(f'Set-command: {command} invalidates cache entries: {affected}')
+        self.invalidate(*affected)
+
+    async def invoke(self, command: str) -> Optional[DecodedResponse]:
+        if not command.startswith('Q'):
+            self.invalidate_for(command)
+            try:
+                return await self._inverter.invoke(command)
+            finally:
+                # entries fetched while the command was in flight may predate the change
+                self.invalidate_for(command)
+        if command not in self._policy.queries:
+            return await self._inverter.invoke(command)
+        return await self.__cached(command, self._policy.queries[command], lambda: self._inverter.invoke(command))
+
+    async def fetch_device_information(self) -> DeviceInfo:
+        # information the device did not fully report is fetched again rather than kept for the session
+        return await self.__cached(
+            'device_information',
+            self._policy.device_information,
+            self._inverter.fetch_device_information,
+            lambda device_info: device_info.is_complete
+        )
+
+    async def fetch_settings(self) -> Optional[DecodedResponse]:
+        return await self.__cached('settings', self._policy.settings, self._inverter.fetch_settings)
+
+    async def fetch_status(self) -> Optional[DecodedResponse]:
+        return await self.__cached('status', self._policy.status, self._inverter.fetch_status)
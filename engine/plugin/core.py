@@ -1,34 +1,87 @@
-from typing import Optional
+from typing import Optional, List, Dict
 
-from common.model import ResponseMapping, DeviceConfig
+from common.model import ResponseMapping, DeviceConfig, CommandDefinition, RawResponse
 from common.helper import LoggerFactory
+from dispatcher import DispatcherContract
+from processor.helper import ResponseDecoder, ResponseDecoderCompiler
+from processor.model import DecodedResponse
 from ..model import DeviceInfo
 
 
 class IPluginRegistry(type):
-    plugin_registry: Optional[type] = None
+    """
+    Records every plugin class as its module is imported, keyed by module name and then by class name so
+    importing a module again replaces its classes instead of adding them twice
+    """
+    plugin_registry: Dict[str, Dict[str, type]] = {}
+    __BASE_CLASSES = ('InverterCore', 'ProtocolCore')
 
     def __init__(cls, name, bases, attrs):
-        super().__init__(cls)
-        if name != 'InverterCore' or name != 'ProtocolCore':
-            IPluginRegistry.plugin_registries = cls
+        super().__init__(name, bases, attrs)
+        if name not in IPluginRegistry.__BASE_CLASSES:
+            IPluginRegistry.plugin_registry.setdefault(cls.__module__, {})[cls.__qualname__] = cls
+
+    @staticmethod
+    def classes_in(module_name: str) -> List[type]:
+        """
+        :param module_name: Fully qualified name of an imported module e.g. `plugins.axpert-king-5kw.main`
+        :return: Plugin classes defined in the module, in definition order
+        """
+        return list(IPluginRegistry.plugin_registry.get(module_name, {}).values())
 
 
 class InverterCore(object, metaclass=IPluginRegistry):
     """
     Plugin core class for inverters
     """
+    # Commands polled repeatedly by the plugin, their frames are pre-computed when the plugin loads
+    query_commands: List[str] = []
+    # Response layouts of the commands the plugin understands, compiled into `response_decoders` on load
+    command_definitions: Dict[str, CommandDefinition] = {}
+    response_decoders: Dict[str, ResponseDecoder] = {}
+    __fallback_decoder: ResponseDecoder = ResponseDecoderCompiler().compile('Response')
 
-    def __init__(self, device_config: DeviceConfig, logger_factory: LoggerFactory) -> None:
+    def __init__(
+            self,
+            device_config: DeviceConfig,
+            logger_factory: LoggerFactory,
+            dispatcher: Optional[DispatcherContract] = None
+    ) -> None:
         """
         Entry init block for plugin
         :param device_config: Device configuration
         :param logger_factory: Logger that plugin can make use of
+        :param dispatcher: Dispatcher for sending commands to the device
         """
         self.device_config = device_config
         self._logger = logger_factory.create_logger(__name__)
+        self._dispatcher = dispatcher
 
-    async def invoke(self, command: str) -> ResponseMapping:
+    def decode(self, response: RawResponse) -> Optional[DecodedResponse]:
+        """
+        Decodes a response with the compiled decoder of its command, responses to commands without a
+        definition e.g. set-commands are decoded into a single `response` field
+        :param response: A validated response
+        :return: Record of the response fields
+        """
+        payload = response.payload
+        if payload is None:
+            return None
+        decoder = self.response_decoders.get(response.command.command, self.__fallback_decoder)
+        return decoder.decode(payload)
+
+    async def _query(self, command: str) -> Optional[DecodedResponse]:
+        """
+        Sends a command through the dispatcher and decodes the response
+        :param command: command to execute
+        :return: Decoded response, None when no valid response was received
+        """
+        response = await self._dispatcher.execute(command)
+        if response is None:
+            return None
+        return self.decode(response)
+
+    async def invoke(self, command: str) -> Optional[DecodedResponse]:
         """
         Starts main plugin flow
         :param command: command to execute
@@ -43,14 +96,14 @@ class InverterCore(object, metaclass=IPluginRegistry):
         """
         pass
 
-    async def fetch_settings(self) -> ResponseMapping:
+    async def fetch_settings(self) -> Optional[DecodedResponse]:
         """
         Fetches the device current settings
         :return: Device information
         """
         pass
 
-    async def fetch_status(self) -> ResponseMapping:
+    async def fetch_status(self) -> Optional[DecodedResponse]:
         """
         Fetches the device status, power, current, and other states
         :return: Device information
@@ -0,0 +1,170 @@
+from typing import Dict, List, Union
+
+from common.model import CommandDefinition, CommandSpecification, CommandValidation
+
+
+def _field(field_type: str, definition: Union[str, List[str], Dict], description: str = None) -> CommandSpecification:
+    return CommandSpecification(type=field_type, description=description, payload_definition=definition)
+
+
+def _query(*specifications: CommandSpecification, output_rule: str = None) -> CommandDefinition:
+    return CommandDefinition(
+        specifications=list(specifications),
+        validation=CommandValidation(input_rule=None, output_rule=output_rule)
+    )
+
+
+def _setting(input_rule: str, description: str) -> CommandDefinition:
+    return CommandDefinition(
+        specifications=[_field('str', 'acknowledgement', description)],
+        validation=CommandValidation(input_rule=input_rule, output_rule=r'ACK|NAK')
+    )
+
+
+_PRIORITIES = {'0': 'Utility first', '1': 'Solar first', '2': 'SBU first'}
+_CHARGER_PRIORITIES = {
+    '0': 'Utility first',
+    '1': 'Solar first',
+    '2': 'Solar + Utility',
+    '3': 'Only solar charging permitted'
+}
+
+# Response layouts as described in HS_MS_MSX_RS232_Protocol (PI30)
+COMMAND_DEFINITIONS: Dict[str, CommandDefinition] = {
+    'QPI': _query(_field('str', 'protocol_id', 'Device protocol ID')),
+    'QID': _query(_field('str', 'serial_number', 'Device serial number')),
+    'QVFW': _query(_field('str', 'firmware_version', 'Main CPU firmware version')),
+    'QMOD': _query(_field('option', {'device_mode': {
+        'P': 'Power On',
+        'S': 'Standby',
+        'L': 'Line',
+        'B': 'Battery',
+        'F': 'Fault',
+        'H': 'Power saving'
+    }}, 'Device mode')),
+    'QFLAG': _query(_field('str', 'device_flags', 'Enabled (E) and disabled (D) device flags')),
+    'QPIGS': _query(
+        _field('float', 'grid_voltage', 'V'),
+        _field('float', 'grid_frequency', 'Hz'),
+        _field('float', 'ac_output_voltage', 'V'),
+        _field('float', 'ac_output_frequency', 'Hz'),
+        _field('int', 'ac_output_apparent_power', 'VA'),
+        _field('int', 'ac_output_active_power', 'W'),
+        _field('int', 'ac_output_load', '%'),
+        _field('int', 'bus_voltage', 'V'),
+        _field('float', 'battery_voltage', 'V'),
+        _field('int', 'battery_charging_current', 'A'),
+        _field('int', 'battery_capacity', '%'),
+        _field('int', 'inverter_heat_sink_temperature', '°C'),
+        _field('float', 'pv_input_current_for_battery', 'A'),
+        _field('float', 'pv_input_voltage', 'V'),
+        _field('float', 'battery_voltage_from_scc', 'V'),
+        _field('int', 'battery_discharge_current', 'A'),
+        _field('flags', [
+            'is_sbu_priority_version_added',
+            'is_configuration_changed',
+            'is_scc_firmware_updated',
+            'is_load_on',
+            'is_battery_voltage_to_steady_while_charging',
+            'is_charging_on',
+            'is_scc_charging_on',
+            'is_ac_charging_on'
+        ], 'Device status'),
+        _field('int', 'battery_voltage_offset_for_fans_on', '10mV'),
+        _field('int', 'eeprom_version'),
+        _field('int', 'pv_charging_power', 'W'),
+        _field('flags', [
+            'is_charging_to_float',
+            'is_switched_on',
+            'is_dustproof_installed'
+        ], 'Device status 2')
+    ),
+    'QPIRI': _query(
+        _field('float', 'grid_rating_voltage', 'V'),
+        _field('float', 'grid_rating_current', 'A'),
+        _field('float', 'ac_output_rating_voltage', 'V'),
+        _field('float', 'ac_output_rating_frequency', 'Hz'),
+        _field('float', 'ac_output_rating_current', 'A'),
+        _field('int', 'ac_output_rating_apparent_power', 'VA'),
+        _field('int', 'ac_output_rating_active_power', 'W'),
+        _field('float', 'battery_rating_voltage', 'V'),
+        _field('float', 'battery_recharge_voltage', 'V'),
+        _field('float', 'battery_under_voltage', 'V'),
+        _field('float', 'battery_bulk_voltage', 'V'),
+        _field('float', 'battery_float_voltage', 'V'),
+        _field('option', {'battery_type': {'0': 'AGM', '1': 'Flooded', '2': 'User'}}),
+        _field('int', 'max_ac_charging_current', 'A'),
+        _field('int', 'max_charging_current', 'A'),
+        _field('option', {'input_voltage_range': {'0': 'Appliance', '1': 'UPS'}}),
+        _field('option', {'output_source_priority': _PRIORITIES}),
+        _field('option', {'charger_source_priority': _CHARGER_PRIORITIES}),
+        _field('int', 'parallel_max_num'),
+        _field('option', {'machine_type': {'00': 'Grid tie', '01': 'Off Grid', '10': 'Hybrid'}}),
+        _field('option', {'topology': {'0': 'Transformerless', '1': 'Transformer'}}),
+        _field('option', {'output_mode': {
+            '0': 'Single machine',
+            '1': 'Parallel',
+            '2': 'Phase 1 of 3',
+            '3': 'Phase 2 of 3',
+            '4': 'Phase 3 of 3'
+        }}),
+        _field('float', 'battery_redischarge_voltage', 'V'),
+        _field('option', {'pv_ok_condition_for_parallel': {
+            '0': 'As long as one unit of inverters has connect PV, parallel system will consider PV OK',
+            '1': 'Only all of inverters have connected PV, parallel system will consider PV OK'
+        }}),
+        _field('option', {'pv_power_balance': {
+            '0': 'PV input max current will be the max charged current',
+            '1': 'PV input max power will be the sum of the max charged power and loads power'
+        }})
+    ),
+    'QPIWS': _query(_field('flags', [
+        'reserved_a0',
+        'inverter_fault',
+        'bus_over',
+        'bus_under',
+        'bus_soft_fail',
+        'line_fail',
+        'opv_short',
+        'inverter_voltage_too_low',
+        'inverter_voltage_too_high',
+        'over_temperature',
+        'fan_locked',
+        'battery_voltage_high',
+        'battery_low_alarm',
+        'reserved_a13',
+        'battery_under_shutdown',
+        'reserved_a15',
+        'over_load',
+        'eeprom_fault',
+        'inverter_over_current',
+        'inverter_soft_fail',
+        'self_test_fail',
+        'op_dc_voltage_over',
+        'battery_open',
+        'current_sensor_fail',
+        'battery_short',
+        'power_limit',
+        'pv_voltage_high',
+        'mppt_overload_fault',
+        'mppt_overload_warning',
+        'battery_too_low_to_charge',
+        'reserved_a30',
+        'reserved_a31'
+    ], 'Device warning status')),
+    # Setting commands, `input_rule` is matched against the whole command received e.g. over MQTT
+    'PE': _setting(r'PE[abjkuvxyz]+', 'Enable flags'),
+    'PD': _setting(r'PD[abjkuvxyz]+', 'Disable flags'),
+    'PF': _setting(r'PF', 'Restore default settings'),
+    'F': _setting(r'F(50|60)', 'Output rating frequency'),
+    'POP': _setting(r'POP0[0-2]', 'Output source priority'),
+    'PCP': _setting(r'PCP0[0-3]', 'Charger source priority'),
+    'PGR': _setting(r'PGR0[01]', 'Grid working range'),
+    'PBT': _setting(r'PBT0[0-2]', 'Battery type'),
+    'PBCV': _setting(r'PBCV\d{2}\.\d', 'Battery re-charge voltage'),
+    'PBDV': _setting(r'PBDV\d{2}\.\d', 'Battery re-discharge voltage'),
+    'PCVV': _setting(r'PCVV\d{2}\.\d', 'Battery constant voltage charging voltage'),
+    'PBFT': _setting(r'PBFT\d{2}\.\d', 'Battery float charging voltage'),
+    'MCHGC': _setting(r'MCHGC0\d{2}', 'Max charging current'),
+    'MUCHGC': _setting(r'MUCHGC0\d{2}', 'Max utility charging current')
+}
@@ -1,18 +1,36 @@
-from common.model import ResponseMapping
+from typing import Optional
+
 from engine import InverterCore
 from engine.model import DeviceInfo
+from processor.model import DecodedResponse
+from .commands import COMMAND_DEFINITIONS
 
 
 class AxpertKing5kW(InverterCore):
+    query_commands = ['QPI', 'QID', 'QVFW', 'QPIRI', 'QFLAG', 'QPIGS', 'QMOD', 'QPIWS']
+    command_definitions = COMMAND_DEFINITIONS
 
-    async def invoke(self, command: str) -> ResponseMapping:
-        return await super().invoke(command)
+    async def invoke(self, command: str) -> Optional[DecodedResponse]:
+        return await self._query(command)
 
     async def fetch_device_information(self) -> DeviceInfo:
-        return await super().fetch_device_information()
+        protocol = await self._query('QPI')
+        serial_number = await self._query('QID')
+        firmware = await self._query('QVFW')
+        return DeviceInfo(
+            model='Axpert King 5kW',
+            device_name='Axpert King',
+            manufacturer='Voltronic Power',
+            # the lenient decoder leaves fields of empty or malformed payloads as None
+            firmware_version=(
+                firmware.firmware_version.replace('VERFW:', '') if firmware and firmware.firmware_version else None
+            ),
+            serial_number=serial_number.serial_number if serial_number else None,
+            protocol_id=protocol.protocol_id if protocol else None
+        )
 
-    async def fetch_settings(self) -> ResponseMapping:
-        return await super().fetch_settings()
+    async def fetch_settings(self) -> Optional[DecodedResponse]:
+        return await self._query('QPIRI')
 
-    async def fetch_status(self) -> ResponseMapping:
-        return await super().fetch_status()
+    async def fetch_status(self) -> Optional[DecodedResponse]:
+        return await self._query('QPIGS')
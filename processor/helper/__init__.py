@@ -1 +1,5 @@
 from .utilities import CyclicRedundancyCodeHelper
+from .caches import CommandFrameCache
+from .parsers import ResponseFrameParser
+from .decoders import ResponseDecoder, ResponseDecoderCompiler
+from .validators import CommandValidator
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable
+
+from .utilities import CyclicRedundancyCodeHelper
+from ..model import CommandFrame
+
+
+class CommandFrameCache:
+    """
+    Shared cache of ready-to-write command frames, the fixed query set is pinned when a plugin loads
+    while parameterised set-commands are kept in a bounded least recently used pool
+    """
+
+    def __init__(self, crc_calculator: CyclicRedundancyCodeHelper, max_size: int = 32) -> None:
+        """
+        :param crc_calculator: Helper used to encode frames on a cache miss
+        :param max_size: Maximum number of un-pinned frames to keep around
+        """
+        self._crc_calculator = crc_calculator
+        self._max_size = max_size
+        self._pinned: Dict[str, CommandFrame] = {}
+        self._recent: 'OrderedDict[str, CommandFrame]' = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._recent)
+
+    def __contains__(self, command: str) -> bool:
+        return command in self._pinned or command in self._recent
+
+    def __encode(self, command: str) -> CommandFrame:
+        encoded = self._crc_calculator.command_with_crc(command)
+        return CommandFrame(encoded, bytes(encoded))
+
+    def warm(self, commands: Iterable[str]) -> None:
+        """
+        Encodes and pins commands that are polled repeatedly, pinned frames are never evicted
+        :param commands: Commands to pre-compute frames for e.g. QPIGS, QPIRI
+        """
+        with self._lock:
+            for command in commands:
+                if command not in self._pinned:
+                    self._pinned[command] = self._recent.pop(command, None) or self.__encode(command)
+
+    def get(self, command: str) -> CommandFrame:
+        """
+        Looks up the frame for a command, encoding and caching it on a miss
+        :param command: Command without crc or terminator
+        :return: Command and its encoded frame
+        """
+        frame = self._pinned.get(command)
+        if frame is not None:
+            return frame
+        with self._lock:
+            frame = self._recent.get(command)
+            if frame is not None:
+                self._recent.move_to_end(command)
+                return frame
+            frame = self.__encode(command)
+            self._recent[command] = frame
+            if len(self._recent) > self._max_size:
+                self._recent.popitem(last=False)
+            return frame
+
+    def clear(self) -> None:
+        """
+        Drops every cached frame including pinned ones
+        """
+        with self._lock:
+            self._pinned.clear()
+            self._recent.clear()
@@ -0,0 +1,175 @@
+import keyword
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type, Union
+
+from common.model import CommandDefinition, CommandSpecification
+from ..model import DecodedResponse
+
+Payload = Union[bytes, bytearray, memoryview]
+
+
+class _Slot(NamedTuple):
+    name: str
+    index: int
+    converter: Optional[Callable[[bytes], Any]]
+    bit: Optional[int] = None
+    description: Optional[str] = None
+
+
+class ResponseDecoder:
+    """
+    Decoder compiled from a command specification, turns a response payload into a record in a single pass
+    """
+
+    def __init__(
+            self,
+            name: str,
+            record_type: Type[DecodedResponse],
+            slots: List[_Slot],
+            decode_fields: Callable[[List[bytes]], DecodedResponse]
+    ) -> None:
+        self.name = name
+        self.record_type = record_type
+        self._slots = slots
+        self._decode_fields = decode_fields
+
+    @property
+    def fields(self):
+        return self.record_type._fields
+
+    @property
+    def descriptions(self) -> Dict[str, Optional[str]]:
+        """
+        :return: Description of every field as given in the specification e.g. the unit `V`
+        """
+        return {slot.name: slot.description for slot in self._slots}
+
+    def __decode_leniently(self, fields: List[bytes]) -> DecodedResponse:
+        values = []
+        for slot in self._slots:
+            try:
+                raw = fields[slot.index]
+                if slot.bit is not None:
+                    values.append(raw[slot.bit:slot.bit + 1] == b'1')
+                else:
+                    values.append(slot.converter(raw))
+            except (IndexError, ValueError, UnicodeDecodeError):
+                values.append(None)
+        return self.record_type(*values)
+
+    def decode(self, payload: Payload) -> DecodedResponse:
+        """
+        Splits a payload on whitespace and converts each field, fields that are missing or malformed become None
+        :param payload: Response between `(` and the crc
+        :return: Record holding the converted fields
+        """
+        fields = payload.tobytes().split() if isinstance(payload, memoryview) else payload.split()
+        try:
+            return self._decode_fields(fields)
+        except (IndexError, ValueError, UnicodeDecodeError):
+            return self.__decode_leniently(fields)
+
+
+class ResponseDecoderCompiler:
+    """
+    Compiles `CommandDefinition`s into `ResponseDecoder`s. Every specification describes one whitespace separated
+    field of the response through its `type` and `payload_definition`:
+
+    - `float`, `int` or `str` with the field name as `payload_definition`
+    - `flags` with a list of names, one per character of a bit field e.g. `00010110`
+    - `option` with a `{name: {raw_value: label}}` mapping
+    """
+    __DEFAULT_FIELD: str = 'response'
+    __converters: Dict[Optional[str], Callable[[bytes], Any]] = {
+        None: bytes.decode,
+        'str': bytes.decode,
+        'int': int,
+        'float': float
+    }
+
+    @staticmethod
+    def __identifier(name: str) -> str:
+        identifier = re.sub(r'\W+', '_', name.strip()).strip('_').lower()
+        if not identifier or identifier[0].isdigit() or keyword.iskeyword(identifier):
+            identifier = f'field_{identifier}'
+        return identifier
+
+    @staticmethod
+    def __option(mapping: Dict[str, Any]) -> Callable[[bytes], Any]:
+        options = {str(key): value for key, value in mapping.items()}
+
+        def convert(raw: bytes) -> Any:
+            value = raw.decode()
+            return options.get(value, value)
+        return convert
+
+    def __slots_for(self, index: int, specification: CommandSpecification) -> List[_Slot]:
+        definition = specification.payload_definition
+        description = specification.description
+        if specification.type == 'flags':
+            return [
+                _Slot(self.__identifier(name), index, None, bit, description) for bit, name in enumerate(definition)
+            ]
+        if specification.type == 'option':
+            (name, mapping), = definition.items()
+            return [_Slot(self.__identifier(name), index, self.__option(mapping), description=description)]
+        converter = self.__converters.get(specification.type)
+        if converter is None:
+            raise ValueError(f'Unsupported field type: {specification.type} for {definition}')
+        return [_Slot(self.__identifier(definition), index, converter, description=description)]
+
+    @staticmethod
+    def __create_record_type(name: str, command: str, fields: List[str]) -> Type[DecodedResponse]:
+        arguments = ', '.join(fields)
+        assignments = ''.join(f'\n    self.{field} = {field}' for field in fields) or '\n    pass'
+        namespace: Dict[str, Any] = {}
+        exec(f'def __init__(self, {arguments}):{assignments}', namespace)
+        return type(name, (DecodedResponse,), {
+            '__slots__': tuple(fields),
+            '_fields': tuple(fields),
+            '_command': command,
+            '__init__': namespace['__init__']
+        })
+
+    @staticmethod
+    def __create_decode_fields(
+            record_type: Type[DecodedResponse],
+            slots: List[_Slot]
+    ) -> Callable[[List[bytes]], DecodedResponse]:
+        namespace: Dict[str, Any] = {'record': record_type}
+        expressions = []
+        for position, slot in enumerate(slots):
+            if slot.bit is not None:
+                expressions.append(f"fields[{slot.index}][{slot.bit}:{slot.bit + 1}] == b'1'")
+            else:
+                namespace[f'convert_{position}'] = slot.converter
+                expressions.append(f'convert_{position}(fields[{slot.index}])')
+        exec(f"def decode_fields(fields):\n    return record({', '.join(expressions)})", namespace)
+        return namespace['decode_fields']
+
+    def compile(self, command: str, definition: Optional[CommandDefinition] = None) -> ResponseDecoder:
+        """
+        Compiles a decoder for a single command
+        :param command: Command name e.g. QPIGS
+        :param definition: Response definition, without one the response is decoded as a single text field
+        :return: A decoder for responses to `command`
+        """
+        slots: List[_Slot] = []
+        if definition is None or not definition.specifications:
+            slots.append(_Slot(self.__DEFAULT_FIELD, 0, self.__converters['str']))
+        else:
+            for index, specification in enumerate(definition.specifications):
+                slots.extend(self.__slots_for(index, specification))
+        names = [slot.name for slot in slots]
+        if len(set(names)) != len(names):
+            raise ValueError(f'Duplicate field names in definition for command: {command}')
+        record_type = self.__create_record_type(self.__identifier(command).title().replace('_', ''), command, names)
+        return ResponseDecoder(command, record_type, slots, self.__create_decode_fields(record_type, slots))
+
+    def compile_all(self, definitions: Dict[str, CommandDefinition]) -> Dict[str, ResponseDecoder]:
+        """
+        Compiles decoders for every command in `definitions`
+        :param definitions: Response definitions keyed by command name
+        :return: Decoders keyed by command name
+        """
+        return {command: self.compile(command, definition) for command, definition in definitions.items()}
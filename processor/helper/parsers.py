@@ -0,0 +1,93 @@
+from typing import List, Optional, Union
+
+from .utilities import CyclicRedundancyCodeHelper
+from ..model import ResponseFrame
+
+FrameInput = Union[bytes, bytearray, memoryview]
+
+
+class ResponseFrameParser:
+    """
+    Incremental parser for `(<payload><crc_high><crc_low>\\r` response frames. Chunks can be fed as they arrive,
+    payloads of complete frames are returned as views into the received data rather than copies
+    """
+    __START: bytes = b'('
+    __END: bytes = b'\x0d'
+    __NAK: bytes = b'NAK'
+    __CRC_SIZE: int = 2
+
+    def __init__(self, max_frame_size: int = 1024) -> None:
+        """
+        :param max_frame_size: Partial frames growing beyond this size are considered garbled and dropped
+        """
+        self._max_frame_size = max_frame_size
+        self._pending = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: Number of bytes held back while waiting for the rest of a frame
+        """
+        return len(self._pending)
+
+    @staticmethod
+    def __create_frame(view: memoryview) -> ResponseFrame:
+        """
+        :param view: A frame from `(` up to but excluding the terminator
+        """
+        if len(view) < 1 + ResponseFrameParser.__CRC_SIZE:
+            return ResponseFrame(view[1:1], False, False)
+        body = view[:-ResponseFrameParser.__CRC_SIZE]
+        crc = CyclicRedundancyCodeHelper.to_crc(CyclicRedundancyCodeHelper.update(body))
+        is_valid = crc.crc_high == view[-2] and crc.crc_low == view[-1]
+        payload = body[1:]
+        return ResponseFrame(payload, is_valid, payload == ResponseFrameParser.__NAK)
+
+    def feed(self, chunk: FrameInput) -> List[ResponseFrame]:
+        """
+        Consumes the next chunk of received data
+        :param chunk: Bytes as they were read from the device
+        :return: Every frame completed by this chunk, including ones that failed the crc check
+        """
+        if self._pending:
+            data = b''.join((self._pending, chunk))
+            self._pending.clear()
+        elif isinstance(chunk, memoryview):
+            # views cannot be searched directly
+            data = chunk.tobytes()
+        else:
+            data = chunk
+        view = memoryview(data)
+        frames: List[ResponseFrame] = []
+        position = 0
+        while True:
+            start = data.find(self.__START, position)
+            if start < 0:
+                # bytes outside of a frame are line noise
+                break
+            end = data.find(self.__END, start)
+            if end < 0:
+                if len(data) - start <= self._max_frame_size:
+                    self._pending += view[start:]
+                break
+            # a second start marker means the earlier frame was cut short, only the latest one can be complete
+            start = data.rfind(self.__START, start, end)
+            frames.append(self.__create_frame(view[start:end]))
+            position = end + 1
+        return frames
+
+    def reset(self) -> None:
+        """
+        Drops any partially received frame
+        """
+        self._pending.clear()
+
+    @staticmethod
+    def parse(data: FrameInput) -> Optional[ResponseFrame]:
+        """
+        Parses a single complete response
+        :param data: Response including its terminator
+        :return: The last frame found in `data`, None when it does not contain a complete frame
+        """
+        frames = ResponseFrameParser().feed(data)
+        return frames[-1] if frames else None
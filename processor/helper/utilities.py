@@ -1,62 +1,90 @@
-from ctypes import c_uint8
-from typing import List
+import logging
+from typing import Tuple, Union
 
 from common.model.commands import Command, Crc
 from common.helper import LoggerFactory
 
+CrcInput = Union[str, bytes, bytearray, memoryview]
+
+
+def _build_crc_lookup(polynomial: int = 0x1021) -> Tuple[int, ...]:
+    """
+    Builds a byte-wise lookup table for CRC-16/XMODEM, the checksum used by the PI30 protocol family
+    :param polynomial: Generator polynomial
+    :return: 256 entries, one for every possible byte value
+    """
+    lookup = []
+    for byte in range(256):
+        checksum = byte << 8
+        for _ in range(8):
+            if checksum & 0x8000:
+                checksum = (checksum << 1) ^ polynomial
+            else:
+                checksum <<= 1
+        lookup.append(checksum & 0xffff)
+    return tuple(lookup)
+
 
 class CyclicRedundancyCodeHelper:
     """
     Credits: https://forums.aeva.asn.au/viewtopic.php?title=pip4048ms-inverter&p=53760&t=4332#p53760
     """
 
-    __crc_lookup: List[int] = [
-        0x0000, 0x1021, 0x2042, 0x3063,
-        0x4084, 0x50a5, 0x60c6, 0x70e7,
-        0x8108, 0x9129, 0xa14a, 0xb16b,
-        0xc18c, 0xd1ad, 0xe1ce, 0xf1ef
-    ]
+    __crc_lookup: Tuple[int, ...] = _build_crc_lookup()
+    __reserved_bytes = (0x28, 0x0d, 0x0a)
 
     def __init__(self, logger_factory: LoggerFactory) -> None:
         self._logger = logger_factory.create_logger(__name__)
 
     @staticmethod
-    def __create_crc(checksum: int) -> Crc:
-        checksum_low = c_uint8(checksum).value
-        checksum_high = c_uint8(checksum >> 8).value
+    def update(data: CrcInput, checksum: int = 0x0) -> int:
+        """
+        Feeds `data` into a running checksum, allowing a frame to be checked while it is still arriving e.g.
+        update(b'PI', update(b'Q')) == update(b'QPI')
+        :param data: Next part of the message, `bytes`, `bytearray` and `memoryview` are consumed without copying
+        :param checksum: Checksum returned by a previous call, or zero when starting a new message
+        :return: Raw (un-escaped) 16-bit checksum
+        """
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+        elif isinstance(data, memoryview) and data.format != 'B':
+            data = data.cast('B')
+        lookup = CyclicRedundancyCodeHelper.__crc_lookup
+        for byte in data:
+            checksum = ((checksum << 8) & 0xffff) ^ lookup[(checksum >> 8) ^ byte]
+        return checksum
+
+    @staticmethod
+    def to_crc(checksum: int) -> Crc:
+        """
+        Splits a raw checksum into its high and low bytes, escaping values that collide with frame delimiters
+        :param checksum: Raw checksum as returned by `update`
+        :return: CRC that can be written to the device
+        """
+        checksum_low = checksum & 0xff
+        checksum_high = (checksum >> 8) & 0xff
 
-        if checksum_low == 0x28 or checksum_low == 0x0d or checksum_low == 0x0a:
+        if checksum_low in CyclicRedundancyCodeHelper.__reserved_bytes:
             checksum_low += 1
-        if checksum_high == 0x28 or checksum_high == 0x0d or checksum_high == 0x0a:
+        if checksum_high in CyclicRedundancyCodeHelper.__reserved_bytes:
             checksum_high += 1
 
         return Crc(checksum_high, checksum_low)
 
-    def calculate_crc(self, command: str) -> Crc:
+    def calculate_crc(self, command: CrcInput) -> Crc:
         """
         Calculates a crc for the supplied command, also see c-code variant
         https://forums.aeva.asn.au/viewtopic.php?title=pip4048ms-inverter&p=53760&t=4332#p53760
         :param command: The command that requires a crc to be calculated
         :return: CRC for the given command
         """
-        checksum: int = 0x0
-        for character in command:
-            t_da = c_uint8(checksum >> 8)
-            da = t_da.value >> 4
-            checksum <<= 4
-            index = da ^ (ord(character) >> 4)
-            checksum ^= self.__crc_lookup[index]
-            t_da = c_uint8(checksum >> 8)
-            da = t_da.value >> 4
-            checksum <<= 4
-            index = da ^ (ord(character) & 0x0f)
-            checksum ^= self.__crc_lookup[index]
-
-        crc = self.__create_crc(checksum)
+        crc = self.to_crc(self.update(command))
 
-        self._logger.debug(
-            f'COMMAND: {command} -> CRC_HIGH: {crc.crc_high} CRC_LOW: {crc.crc_low} | FULL_CRC: {crc.crc_full}'
-        )
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                'COMMAND: %s -> CRC_HIGH: %s CRC_LOW: %s | FULL_CRC: %s',
+                command, crc.crc_high, crc.crc_low, crc.crc_full
+            )
         return crc
 
     def command_with_crc(self, command: str) -> Command:
@@ -66,4 +94,4 @@ class CyclicRedundancyCodeHelper:
         :return: Command
         """
         crc = self.calculate_crc(command)
-        return Command(command=command, crc=crc)
+        return Command(command=command, is_query=command.startswith('Q'), crc=crc)
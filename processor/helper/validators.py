@@ -0,0 +1,49 @@
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from common.model import CommandDefinition
+
+
+class CommandValidator:
+    """
+    Validates commands received from outside the process before they reach a device. Every definition whose
+    `input_rule` is set accepts commands starting with its name that fully match the rule, definitions without a rule
+    only accept their exact name. The rules are compiled once and tried from the longest name to the shortest
+    """
+    __CHARACTERS: Pattern = re.compile(r'[A-Za-z0-9.]+')
+
+    def __init__(self, definitions: Dict[str, CommandDefinition], max_length: int = 16) -> None:
+        """
+        :param definitions: Command definitions keyed by command name e.g. from `InverterCore.command_definitions`
+        :param max_length: Longest command accepted, PI30 commands fit in a single 16 byte exchange
+        """
+        self._max_length = max_length
+        self._rules: List[Tuple[str, Optional[Pattern]]] = sorted(
+            (
+                (name, re.compile(definition.validation.input_rule) if definition.validation.input_rule else None)
+                for name, definition in definitions.items()
+            ),
+            key=lambda rule: len(rule[0]),
+            reverse=True
+        )
+
+    def validate(self, command: str) -> Optional[str]:
+        """
+        :param command: Command without crc or terminator e.g. POP02
+        :return: The reason the command was rejected, None when it is valid
+        """
+        if not command or len(command) > self._max_length:
+            return f'Command length must be between 1 and {self._max_length}'
+        if not self.__CHARACTERS.fullmatch(command):
+            return 'Command contains unsupported characters'
+        for name, rule in self._rules:
+            if not command.startswith(name):
+                continue
+            if rule is None:
+                if command == name:
+                    return None
+                continue
+            if rule.fullmatch(command):
+                return None
+            return f'Command does not match the rule of {name}: {rule.pattern}'
+        return 'Unknown command'
@@ -0,0 +1 @@
+from .models import CommandFrame, ResponseFrame, DecodedResponse
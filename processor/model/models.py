@@ -1,3 +1,44 @@
+from typing import NamedTuple, Tuple, Iterator, Any
 
+from common.model import Command
 
 
+class CommandFrame(NamedTuple):
+    """
+    A command paired with the exact bytes that should be written to the device
+    """
+    command: Command
+    frame: bytes
+
+
+class ResponseFrame(NamedTuple):
+    """
+    A response frame found by the parser, `payload` is a view of the bytes between `(` and the crc
+    """
+    payload: memoryview
+    is_valid: bool
+    is_nak: bool
+
+
+class DecodedResponse:
+    """
+    Base class of the compact records produced by compiled response decoders, concrete record types are
+    generated per command with one slot per field. Iterating yields `(field, value)` pairs so `dict(record)` works
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    # command the record type was compiled for
+    _command: str = ''
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for name in self._fields:
+            yield name, getattr(self, name)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{name}={value!r}' for name, value in self)
+        return f'{type(self).__name__}({values})'
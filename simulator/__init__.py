@@ -0,0 +1,16 @@
+from typing import TYPE_CHECKING
+
+from common.helper import lazy_exports
+
+if TYPE_CHECKING:
+    from .devices import InverterSimulator
+    from .recordings import TrafficReplay
+    from .servers import SimulatorServerContract, SocketSimulatorServer, PtySimulatorServer
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'InverterSimulator': '.devices',
+    'TrafficReplay': '.recordings',
+    'SimulatorServerContract': '.servers',
+    'SocketSimulatorServer': '.servers',
+    'PtySimulatorServer': '.servers'
+})
@@ -0,0 +1,70 @@
+"""
+PI30 inverter simulator, configure the printed url as the `interface` of a serial device (`is_serial: true`):
+
+    python -m simulator --latency 0.05 --jitter 0.02 --corruption-rate 0.01
+    python -m simulator --pty --baud-rate 2400 --replay captured.jsonl
+"""
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from common.helper import LoggerFactory
+from .devices import InverterSimulator
+from .model import SimulatorProfile
+from .recordings import TrafficReplay
+from .servers import PtySimulatorServer, SimulatorServerContract, SocketSimulatorServer
+
+
+async def _serve(server: SimulatorServerContract) -> None:
+    print(await server.start(), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pty', action='store_true', help='Serve on a pseudo terminal instead of a TCP socket')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=0, help='Port to listen on, 0 picks a free one')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before the device answers')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random seconds added to the latency')
+    parser.add_argument('--corruption-rate', type=float, default=0.0, help='Probability of a damaged response')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Probability of not answering')
+    parser.add_argument('--baud-rate', type=int, help='Pace responses like a serial line at this baud rate')
+    parser.add_argument('--seed', type=int, help='Seed for a repeatable run')
+    parser.add_argument('--replay', help='Recording whose responses are served for the commands it holds')
+    parser.add_argument('--record', help='File to write every exchange to when the simulator stops')
+    parser.add_argument('--verbosity', default='INFO', help='Log level')
+    options = parser.parse_args(arguments)
+
+    profile = SimulatorProfile(
+        latency=options.latency,
+        jitter=options.jitter,
+        corruption_rate=options.corruption_rate,
+        drop_rate=options.drop_rate,
+        baud_rate=options.baud_rate,
+        seed=options.seed
+    )
+    replay = TrafficReplay.load(options.replay) if options.replay else None
+    simulator = InverterSimulator(profile, replay, record=options.record is not None)
+    # the parsed options carry the `verbosity` the factory reads
+    logger_factory = LoggerFactory(options)
+    if options.pty:
+        server = PtySimulatorServer(logger_factory, simulator)
+    else:
+        server = SocketSimulatorServer(logger_factory, simulator, options.host, options.port)
+    try:
+        asyncio.run(_serve(server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if options.record:
+            TrafficReplay.save(options.record, simulator.exchanges)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import random
+import re
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from processor.helper import CyclicRedundancyCodeHelper
+from .model import RecordedExchange, SimulatorProfile
+from .recordings import TrafficReplay
+
+# QPIRI fields in response order as described in HS_MS_MSX_RS232_Protocol (PI30)
+_DEFAULT_SETTINGS: Tuple[str, ...] = (
+    '230.0', '21.7', '230.0', '50.0', '21.7', '5000', '4000', '48.0', '46.0', '42.0', '56.4', '54.0', '0', '10',
+    '010', '1', '2', '3', '1', '01', '0', '0', '54.0', '0', '1'
+)
+_FLAGS = 'abjkuvxyz'
+_DEFAULT_ENABLED_FLAGS = 'akxy'
+
+
+class InverterSimulator:
+    """
+    Model of an Axpert/Voltronic inverter speaking PI30. Requests are checked against their crc, set-commands change
+    the settings reported by QPIRI and QFLAG and telemetry drifts between QPIGS samples. Faults, timing and replayed
+    responses are taken from the `SimulatorProfile` and an optional `TrafficReplay`
+    """
+    __TERMINATOR: bytes = b'\x0d'
+
+    def __init__(
+            self,
+            profile: Optional[SimulatorProfile] = None,
+            replay: Optional[TrafficReplay] = None,
+            record: bool = False
+    ) -> None:
+        """
+        :param profile: Timing and fault injection, defaults to a device that answers at once and never fails
+        :param replay: Recorded responses served instead of simulated ones for the commands it holds
+        :param record: Keep every exchange in `exchanges` e.g. to save a run with `TrafficReplay.save`
+        """
+        self._profile = profile if profile is not None else SimulatorProfile()
+        self._replay = replay
+        self._record = record
+        self._random = random.Random(self._profile.seed)
+        self._settings: List[str] = list(_DEFAULT_SETTINGS)
+        self._enabled_flags = set(_DEFAULT_ENABLED_FLAGS)
+        self._load_power = 650.0
+        self._pv_power = 1200.0
+        self._battery_voltage = 53.9
+        self._temperature = 35.0
+        self.exchanges: List[RecordedExchange] = []
+        self.dropped = 0
+        self.corrupted = 0
+        self._queries: Dict[str, Callable[[], bytes]] = {
+            'QPI': lambda: b'PI30',
+            'QID': lambda: b'92932004102453',
+            'QVFW': lambda: b'VERFW:00072.70',
+            'QMOD': self.__mode,
+            'QFLAG': self.__flags,
+            'QPIGS': self.__status,
+            'QPIRI': lambda: ' '.join(self._settings).encode(),
+            'QPIWS': lambda: b'0' * 32
+        }
+        # set-commands with the QPIRI field they change and how the argument is written there
+        self._settings_commands: List[Tuple[Pattern, Callable[[str], None]]] = [
+            (re.compile(r'POP0([0-2])'), self.__setter(16)),
+            (re.compile(r'PCP0([0-3])'), self.__setter(17)),
+            (re.compile(r'PGR0([01])'), self.__setter(15)),
+            (re.compile(r'PBT0([0-2])'), self.__setter(12)),
+            (re.compile(r'F(50|60)'), self.__setter(3, lambda value: f'{value}.0')),
+            (re.compile(r'PBCV(\d{2}\.\d)'), self.__setter(8)),
+            (re.compile(r'PBDV(\d{2}\.\d)'), self.__setter(22)),
+            (re.compile(r'PCVV(\d{2}\.\d)'), self.__setter(10)),
+            (re.compile(r'PBFT(\d{2}\.\d)'), self.__setter(11)),
+            (re.compile(r'MCHGC(0\d{2})'), self.__setter(14)),
+            (re.compile(r'MUCHGC0(\d{2})'), self.__setter(13)),
+            (re.compile(r'PE([abjkuvxyz]+)'), lambda flags: self._enabled_flags.update(flags)),
+            (re.compile(r'PD([abjkuvxyz]+)'), lambda flags: self._enabled_flags.difference_update(flags)),
+            (re.compile(r'PF()'), lambda _: self.__restore_defaults())
+        ]
+
+    @property
+    def settings(self) -> List[str]:
+        """
+        :return: Current QPIRI fields
+        """
+        return list(self._settings)
+
+    def __setter(self, index: int, convert: Callable[[str], str] = str) -> Callable[[str], None]:
+        def apply(value: str) -> None:
+            self._settings[index] = convert(value)
+        return apply
+
+    def __restore_defaults(self) -> None:
+        self._settings = list(_DEFAULT_SETTINGS)
+        self._enabled_flags = set(_DEFAULT_ENABLED_FLAGS)
+
+    def __mode(self) -> bytes:
+        # solar or SBU first runs from the battery, utility first from the line
+        return b'L' if self._settings[16] == '0' else b'B'
+
+    def __flags(self) -> bytes:
+        enabled = ''.join(flag for flag in _FLAGS if flag in self._enabled_flags)
+        disabled = ''.join(flag for flag in _FLAGS if flag not in self._enabled_flags)
+        return f'E{enabled}D{disabled}'.encode()
+
+    def __drift(self, value: float, deviation: float, low: float, high: float) -> float:
+        return min(high, max(low, value + self._random.gauss(0.0, deviation)))
+
+    def __status(self) -> bytes:
+        self._load_power = self.__drift(self._load_power, 50.0, 50.0, 4000.0)
+        self._pv_power = self.__drift(self._pv_power, 80.0, 0.0, 4500.0)
+        self._temperature = self.__drift(self._temperature, 0.3, 25.0, 60.0)
+        surplus = self._pv_power - self._load_power
+        self._battery_voltage = min(57.0, max(46.0, self._battery_voltage + surplus / 200000.0))
+        charging_current = max(0.0, surplus) / self._battery_voltage
+        discharge_current = max(0.0, -surplus) / self._battery_voltage
+        pv_voltage = 250.0 + self._random.uniform(-5.0, 5.0) if self._pv_power else 0.0
+        is_charging = '1' if charging_current >= 1 else '0'
+        capacity = round((self._battery_voltage - 46.0) / 11.0 * 100)
+        return (
+            f'{self._random.uniform(228.0, 232.0):05.1f} {self._random.uniform(49.9, 50.1):04.1f} '
+            f'{self._random.uniform(229.0, 231.0):05.1f} {50.0:04.1f} {round(self._load_power * 1.1):04d} '
+            f'{round(self._load_power):04d} {round(self._load_power / 40):03d} {self._random.randint(370, 380):03d} '
+            f'{self._battery_voltage:05.2f} {round(charging_current):03d} {capacity:03d} '
+            f'{round(self._temperature):04d} {self._pv_power / pv_voltage if pv_voltage else 0.0:04.1f} '
+            f'{pv_voltage:05.1f} {self._battery_voltage:05.2f} {round(discharge_current):05d} '
+            f'0001{is_charging}{is_charging}{is_charging}0 00 00 {round(self._pv_power):05d} 010'
+        ).encode()
+
+    @staticmethod
+    def frame(payload: bytes) -> bytes:
+        """
+        :param payload: Response without start byte, crc or terminator
+        :return: A complete response frame
+        """
+        data = b'(' + payload
+        return data + bytes(CyclicRedundancyCodeHelper.to_crc(CyclicRedundancyCodeHelper.update(data))) + b'\x0d'
+
+    def __parse(self, request: bytes) -> Optional[str]:
+        body = request.rstrip(self.__TERMINATOR)
+        command, crc = body[:-2], body[-2:]
+        if len(body) < 3 or bytes(CyclicRedundancyCodeHelper.to_crc(CyclicRedundancyCodeHelper.update(command))) != crc:
+            # a real device answers requests it cannot read with NAK
+            return None
+        try:
+            return command.decode('ascii')
+        except UnicodeDecodeError:
+            return None
+
+    def __execute(self, command: str) -> bytes:
+        query = self._queries.get(command)
+        if query is not None:
+            return query()
+        for pattern, apply in self._settings_commands:
+            match = pattern.fullmatch(command)
+            if match is not None:
+                apply(match.group(1))
+                return b'ACK'
+        return b'NAK'
+
+    def __corrupt(self, response: bytes) -> bytes:
+        damaged = bytearray(response)
+        # anything between `(` and the terminator, a damaged terminator would merge two frames
+        position = self._random.randrange(1, len(damaged) - 1)
+        damaged[position] = self._random.choice([byte for byte in range(0x20, 0x7f) if byte != damaged[position]])
+        return bytes(damaged)
+
+    def respond(self, request: bytes) -> Optional[bytes]:
+        """
+        :param request: Request frame including its crc and terminator
+        :return: The response frame, None when the profile decided to drop the request
+        """
+        command = self.__parse(request)
+        if self._random.random() < self._profile.drop_rate:
+            self.dropped += 1
+            return None
+        response = None
+        if command is not None and self._replay is not None:
+            response = self._replay.next_response(command)
+        if response is None:
+            response = self.frame(self.__execute(command) if command is not None else b'NAK')
+        if self._random.random() < self._profile.corruption_rate:
+            self.corrupted += 1
+            response = self.__corrupt(response)
+        if self._record:
+            self.exchanges.append(RecordedExchange(command or request.hex(), response))
+        return response
+
+    def delay_for(self, response: bytes) -> float:
+        """
+        :param response: Response about to be sent
+        :return: Seconds to wait before the response is complete
+        """
+        delay = self._profile.latency
+        if self._profile.jitter:
+            delay += self._random.uniform(0.0, self._profile.jitter)
+        if self._profile.baud_rate:
+            delay += len(response) * 10 / self._profile.baud_rate
+        return delay
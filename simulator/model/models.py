@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+
+@dataclass
+class SimulatorProfile:
+    # seconds before the device starts answering
+    latency: float = 0.0
+    # random seconds added to `latency`, uniformly distributed between 0 and `jitter`
+    jitter: float = 0.0
+    # probability of a response with one damaged byte, its crc no longer matches
+    corruption_rate: float = 0.0
+    # probability of a request not being answered at all
+    drop_rate: float = 0.0
+    # responses take as long as they would on a serial line at this baud rate (10 bits per byte), None sends at once
+    baud_rate: Optional[int] = None
+    # seed of the random generator behind jitter, faults and telemetry, None for a different run every time
+    seed: Optional[int] = None
+
+
+class RecordedExchange(NamedTuple):
+    """
+    A request and the raw response frame the device sent back, including `(`, the crc and the terminator
+    """
+    command: str
+    response: bytes
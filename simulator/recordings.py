@@ -0,0 +1,58 @@
+import json
+from itertools import cycle
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .model import RecordedExchange
+
+
+class TrafficReplay:
+    """
+    Recorded responses served again in the order they were captured, every command cycles through its own responses.
+    Recordings are JSON lines of `{"command": "QPIGS", "response": "<hex of the raw response frame>"}`
+    """
+
+    def __init__(self, exchanges: Iterable[RecordedExchange]) -> None:
+        """
+        :param exchanges: Recorded exchanges, in the order they were captured
+        """
+        responses: Dict[str, List[bytes]] = {}
+        for exchange in exchanges:
+            responses.setdefault(exchange.command, []).append(exchange.response)
+        self._responses: Dict[str, Iterator[bytes]] = {command: cycle(frames) for command, frames in responses.items()}
+
+    @property
+    def commands(self) -> List[str]:
+        return list(self._responses)
+
+    def next_response(self, command: str) -> Optional[bytes]:
+        """
+        :param command: Command without crc or terminator
+        :return: The next recorded response to `command`, None when it was never recorded
+        """
+        responses = self._responses.get(command)
+        return next(responses) if responses is not None else None
+
+    @staticmethod
+    def load(path: str) -> 'TrafficReplay':
+        """
+        :param path: File holding a recording
+        :return: Replay of the recording
+        """
+        exchanges = []
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    exchanges.append(RecordedExchange(entry['command'], bytes.fromhex(entry['response'])))
+        return TrafficReplay(exchanges)
+
+    @staticmethod
+    def save(path: str, exchanges: Iterable[RecordedExchange]) -> None:
+        """
+        Writes exchanges in the format read by `load`
+        :param path: File to write
+        :param exchanges: Exchanges in the order they happened
+        """
+        with open(path, 'w') as file:
+            for exchange in exchanges:
+                file.write(json.dumps({'command': exchange.command, 'response': exchange.response.hex()}) + '\n')
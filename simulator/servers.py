@@ -0,0 +1,188 @@
+import asyncio
+import os
+import tty
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Set
+
+from common.helper import LoggerFactory
+from .devices import InverterSimulator
+
+
+class SimulatorServerContract(ABC):
+    """
+    Serves an `InverterSimulator` to the dispatcher, requests are answered one at a time like on the half-duplex
+    serial line of a real device
+    """
+    _TERMINATOR: bytes = b'\x0d'
+
+    def __init__(self, logger_factory: LoggerFactory, simulator: Optional[InverterSimulator] = None) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param simulator: Device to serve, defaults to a simulator without faults
+        """
+        self._logger = logger_factory.create_logger(__name__)
+        self.simulator = simulator if simulator is not None else InverterSimulator()
+
+    @property
+    @abstractmethod
+    def url(self) -> str:
+        """
+        :return: Interface to configure for the device, opened through `serial.serial_for_url`
+        """
+        pass
+
+    async def _serve(self, reader: asyncio.StreamReader, write: Callable[[bytes], Awaitable[None]]) -> None:
+        try:
+            while True:
+                request = await reader.readuntil(self._TERMINATOR)
+                response = self.simulator.respond(request)
+                if response is None:
+                    continue
+                delay = self.simulator.delay_for(response)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await write(response)
+        except asyncio.LimitOverrunError as e:
+            self._logger.warning(f'Closing connection after a request without terminator: {e}')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    @abstractmethod
+    async def start(self) -> str:
+        """
+        :return: The url the simulator can be reached at
+        """
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+
+class SocketSimulatorServer(SimulatorServerContract):
+    """
+    Simulator reachable as `socket://<host>:<port>`, each connection talks to the same device
+    """
+
+    def __init__(
+            self,
+            logger_factory: LoggerFactory,
+            simulator: Optional[InverterSimulator] = None,
+            host: str = '127.0.0.1',
+            port: int = 0
+    ) -> None:
+        """
+        :param logger_factory: Factory for creating a logger
+        :param simulator: Device to serve, defaults to a simulator without faults
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 picks a free one
+        """
+        super().__init__(logger_factory, simulator)
+        self._host = host
+        self._port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return f'socket://{self._host}:{self._port}'
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def write(response: bytes) -> None:
+            writer.write(response)
+            await writer.drain()
+
+        handler = asyncio.current_task()
+        self._writers.add(writer)
+        self._handlers.add(handler)
+        try:
+            await self._serve(reader, write)
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self.__handle, self._host, self._port)
+        self._port = self._server.sockets[0].getsockname()[1]
+        self._logger.info(f'Simulator listening on {self.url}')
+        return self.url
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # connected clients end their handlers by closing, the server does not close them itself
+            for writer in list(self._writers):
+                writer.close()
+            # handlers see the closed connection on their next read, wait for them so none is left to be cancelled
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+
+class PtySimulatorServer(SimulatorServerContract):
+    """
+    Simulator behind a pseudo terminal, the device shows up as a serial port e.g. `/dev/pts/3`
+    """
+
+    def __init__(self, logger_factory: LoggerFactory, simulator: Optional[InverterSimulator] = None) -> None:
+        super().__init__(logger_factory, simulator)
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._transport: Optional[asyncio.BaseTransport] = None
+
+    @property
+    def url(self) -> str:
+        return os.ttyname(self._slave)
+
+    @staticmethod
+    def __wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def __write(self, response: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        view = memoryview(response)
+        while view:
+            try:
+                view = view[os.write(self._master, view):]
+            except BlockingIOError:
+                # the client is not reading, wait for room in the terminal buffer
+                waiter = loop.create_future()
+                loop.add_writer(self._master, self.__wake, waiter)
+                try:
+                    await waiter
+                finally:
+                    loop.remove_writer(self._master)
+
+    async def start(self) -> str:
+        self._master, self._slave = os.openpty()
+        # no echo or newline translation, `\r` terminates frames. The slave stays open here so the terminal survives
+        # clients closing and reopening the port
+        tty.setraw(self._slave)
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        self._transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(self._master, 'rb', buffering=0, closefd=False)
+        )
+        self._task = loop.create_task(self._serve(reader, self.__write))
+        self._logger.info(f'Simulator available at {self.url}')
+        return self.url
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmarks.suite import Metric, compare, save
+
+
+class TestBaselineComparison(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._baseline = {
+            'calculate_crc': {'value': 1000.0, 'unit': 'ns', 'higher_is_better': False},
+            'samples_per_second': {'value': 500.0, 'unit': 'samples/s', 'higher_is_better': True}
+        }
+
+    def test_results_within_tolerance_pass(self):
+        results = {
+            'calculate_crc': Metric(1200.0, 'ns'),
+            'samples_per_second': Metric(400.0, 'samples/s', higher_is_better=True)
+        }
+        self.assertEqual([], compare(results, self._baseline, 0.25))
+
+    def test_slower_timing_is_a_regression(self):
+        regressions = compare({'calculate_crc': Metric(1500.0, 'ns')}, self._baseline, 0.25)
+        self.assertEqual(1, len(regressions))
+        self.assertTrue(regressions[0].startswith('calculate_crc'))
+
+    def test_lower_throughput_is_a_regression(self):
+        regressions = compare(
+            {'samples_per_second': Metric(300.0, 'samples/s', higher_is_better=True)}, self._baseline, 0.25
+        )
+        self.assertEqual(1, len(regressions))
+
+    def test_improvements_and_new_metrics_pass(self):
+        results = {
+            'calculate_crc': Metric(100.0, 'ns'),
+            'samples_per_second': Metric(5000.0, 'samples/s', higher_is_better=True),
+            'cycle_p99': Metric(4.0, 'ms')
+        }
+        self.assertEqual([], compare(results, self._baseline, 0.0))
+
+    def test_growth_from_a_zero_baseline_is_a_regression(self):
+        baseline = {'retained_blocks_per_cycle': {'value': 0.0, 'unit': 'blocks', 'higher_is_better': False}}
+        self.assertEqual([], compare({'retained_blocks_per_cycle': Metric(0.5, 'blocks')}, baseline, 0.25))
+        regressions = compare({'retained_blocks_per_cycle': Metric(3.0, 'blocks')}, baseline, 0.25)
+        self.assertEqual(1, len(regressions))
+        self.assertTrue(regressions[0].startswith('retained_blocks_per_cycle'))
+
+    def test_saved_results_are_read_back_as_baseline(self):
+        results = {'calculate_crc': Metric(1500.0, 'ns')}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            save(path, results)
+            with open(path) as file:
+                baseline = json.load(file)
+        self.assertEqual([], compare(results, baseline, 0.0))
+        self.assertEqual(1, len(compare({'calculate_crc': Metric(2000.0, 'ns')}, baseline, 0.25)))
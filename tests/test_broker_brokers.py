@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from typing import Any, List
+from unittest import IsolatedAsyncioTestCase
+
+from paho.mqtt.client import MQTT_ERR_NO_CONN, MQTT_ERR_SUCCESS, MQTTMessage, MQTTMessageInfo
+
+from broker import Publisher, Subscriber
+from common.helper import MetricsRegistry
+from common.model import MQTTConfig
+from di import LoggerProvider
+
+
+class ThreadedClient:
+    """
+    Stand-in for the paho client that confirms messages from another thread after `delay` seconds
+    """
+
+    def __init__(self, delay: float = 0.02, rejected: List[str] = ()) -> None:
+        self.on_publish = None
+        self.on_disconnect = None
+        self.topics: List[str] = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._delay = delay
+        self._rejected = rejected
+        self._mid = 0
+        self._lock = threading.Lock()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def message_callback_add(self, topic: str, callback: Any) -> None:
+        pass
+
+    def __confirm(self, mid: int) -> None:
+        time.sleep(self._delay)
+        with self._lock:
+            self.concurrent -= 1
+        self.on_publish(self, None, mid)
+
+    def publish(self, topic: str, payload: Any, qos: int, retain: bool, properties: Any) -> MQTTMessageInfo:
+        self._mid += 1
+        info = MQTTMessageInfo(self._mid)
+        self.topics.append(topic)
+        if any(topic.endswith(rejected) for rejected in self._rejected):
+            info.rc = MQTT_ERR_NO_CONN
+            return info
+        info.rc = MQTT_ERR_SUCCESS
+        with self._lock:
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        threading.Thread(target=self.__confirm, args=(self._mid,), daemon=True).start()
+        return info
+
+
+class TestPublisher(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._config = MQTTConfig('voltronic', 'localhost', 1883, 'user', 'password')
+        self._logger = LoggerProvider.logger_factory_ioc().create_logger(__name__)
+
+    async def test_batch_is_pipelined(self):
+        client = ThreadedClient(delay=0.05)
+        publisher = Publisher(self._logger, client, self._config, max_in_flight=10)
+        payload = {f'field_{index}': index for index in range(10)}
+        started = time.monotonic()
+        result = await publisher.publish_message(payload)
+        self.assertTrue(result)
+        self.assertEqual(list(payload), result.published)
+        self.assertLess(time.monotonic() - started, 0.05 * 5)
+        self.assertEqual('homeassistant/sensor/voltronic/field_0', client.topics[0])
+
+    async def test_in_flight_messages_are_bounded(self):
+        client = ThreadedClient(delay=0.01)
+        publisher = Publisher(self._logger, client, self._config, max_in_flight=3)
+        result = await publisher.publish_batch({f'field_{index}': index for index in range(12)})
+        self.assertEqual(12, len(result.published))
+        self.assertLessEqual(client.max_concurrent, 3)
+
+    async def test_failures_are_reported_per_message(self):
+        client = ThreadedClient(rejected=['battery_voltage'])
+        publisher = Publisher(self._logger, client, self._config)
+        result = await publisher.publish_message({'grid_voltage': 230.0, 'battery_voltage': 52.1})
+        self.assertFalse(result)
+        self.assertEqual(['grid_voltage'], result.published)
+        self.assertIn('battery_voltage', result.failures)
+
+    async def test_unconfirmed_messages_time_out(self):
+        client = ThreadedClient(delay=1.0)
+        publisher = Publisher(self._logger, client, self._config, publish_timeout=0.05)
+        result = await publisher.publish_message({'grid_voltage': 230.0})
+        self.assertEqual({'grid_voltage'}, set(result.failures))
+
+    async def test_acknowledgements_and_failures_are_measured(self):
+        metrics = MetricsRegistry()
+        client = ThreadedClient(delay=0.02, rejected=['battery_voltage'])
+        publisher = Publisher(self._logger, client, self._config, metrics=metrics)
+        await publisher.publish_message({'grid_voltage': 230.0, 'pv_power': 1200, 'battery_voltage': 52.1})
+        latency = metrics.histogram('mppt_publish_ack_seconds', '')
+        self.assertEqual(2, latency.count)
+        self.assertGreaterEqual(latency.sum, 0.02 * 2)
+        self.assertEqual(2, metrics.counter('mppt_published_messages_total', '').value)
+        self.assertEqual(1, metrics.counter('mppt_publish_failures_total', '').value)
+        self.assertEqual(0, metrics.gauge('mppt_publish_in_flight', '').value)
+
+
+class RecordingIngestor:
+
+    def __init__(self) -> None:
+        self.commands: List[str] = []
+        self.threads: List[int] = []
+
+    def submit(self, command: str) -> bool:
+        self.commands.append(command)
+        self.threads.append(threading.get_ident())
+        return True
+
+
+class TestSubscriber(IsolatedAsyncioTestCase):
+
+    async def test_commands_are_routed_to_the_device_on_the_event_loop(self):
+        config = MQTTConfig('voltronic', 'localhost', 1883, 'user', 'password')
+        subscriber = Subscriber(LoggerProvider.logger_factory_ioc().create_logger(__name__), ThreadedClient(), config)
+        ingestor = RecordingIngestor()
+        subscriber.register('inverter_1', ingestor)
+        messages = []
+        for topic, payload in (('inverter_1/command', b' POP02\n'), ('inverter_2/command', b'POP01'), ('other', b'x')):
+            message = MQTTMessage(topic=f'homeassistant/sensor/voltronic/{topic}'.encode())
+            message.payload = payload
+            messages.append(message)
+        network = threading.Thread(target=lambda: [subscriber._on_message(None, None, message) for message in messages])
+        network.start()
+        network.join()
+        await asyncio.sleep(0)
+        self.assertEqual(['POP02'], ingestor.commands)
+        self.assertEqual([threading.get_ident()], ingestor.threads)
@@ -0,0 +1,40 @@
+import json
+from unittest import TestCase
+
+from broker.helper import StateEncoder
+from common.model import CommandDefinition, CommandSpecification, CommandValidation
+from processor.helper import ResponseDecoderCompiler
+
+
+class TestStateEncoder(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        definition = CommandDefinition(
+            specifications=[
+                CommandSpecification('float', 'V', 'battery_voltage'),
+                CommandSpecification('int', '%', 'battery_capacity'),
+                CommandSpecification('flags', None, ['is_load_on', 'is_charging_on']),
+                CommandSpecification('option', None, {'device_mode': {'B': 'Battery "backup"'}})
+            ],
+            validation=CommandValidation(input_rule=None, output_rule=None)
+        )
+        self._decoder = ResponseDecoderCompiler().compile('QPIGS', definition)
+        self._encoder = StateEncoder()
+
+    def test_encode_matches_json(self):
+        record = self._decoder.decode(b'57.50 100 10 B')
+        actual = self._encoder.encode(record)
+        self.assertEqual(dict(record), json.loads(actual))
+        self.assertTrue(actual.startswith('{"battery_voltage":57.5,"battery_capacity":100,'))
+
+    def test_encode_missing_and_non_finite_values_as_null(self):
+        record = self._decoder.decode(b'nan ---')
+        actual = json.loads(self._encoder.encode(record))
+        self.assertIsNone(actual['battery_voltage'])
+        self.assertIsNone(actual['battery_capacity'])
+
+    def test_encoder_is_compiled_once_per_record_type(self):
+        self._encoder.encode(self._decoder.decode(b'57.50 100 10 B'))
+        self._encoder.encode(self._decoder.decode(b'52.00 80 01 B'))
+        self.assertEqual(1, len(self._encoder._encoders))
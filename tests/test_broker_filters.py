@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from broker.helper import DeadbandFilter
+from broker.model import PublishResult
+from common.model import Deadband, PublishConfig
+
+
+class TestDeadbandFilter(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._filter = DeadbandFilter(PublishConfig(
+            deadband=Deadband(absolute=0.5),
+            field_deadbands={'battery_capacity': Deadband(percent=10.0)},
+            full_refresh_interval=60.0
+        ))
+
+    def __publish(self, payload, now):
+        selected = self._filter.select(payload, now)
+        self._filter.acknowledge(selected, PublishResult(list(selected), {}), now)
+        return selected
+
+    def test_values_within_deadband_are_suppressed(self):
+        self.__publish({'grid_voltage': 230.0, 'device_mode': 'Line'}, now=0.0)
+        self.assertEqual({}, self.__publish({'grid_voltage': 230.4, 'device_mode': 'Line'}, now=1.0))
+        self.assertEqual(
+            {'grid_voltage': 230.6}, self.__publish({'grid_voltage': 230.6, 'device_mode': 'Line'}, now=2.0)
+        )
+        self.assertEqual(
+            {'device_mode': 'Battery'}, self.__publish({'grid_voltage': 230.6, 'device_mode': 'Battery'}, now=3.0)
+        )
+
+    def test_drift_is_measured_from_last_published_value(self):
+        self.__publish({'battery_capacity': 50}, now=0.0)
+        self.assertEqual({}, self.__publish({'battery_capacity': 54}, now=1.0))
+        self.assertEqual({'battery_capacity': 56}, self.__publish({'battery_capacity': 56}, now=2.0))
+
+    def test_full_refresh_on_interval_and_reconnect(self):
+        payload = {'grid_voltage': 230.0, 'is_load_on': True}
+        self.__publish(payload, now=0.0)
+        self.assertEqual({}, self.__publish(payload, now=30.0))
+        self.assertEqual(payload, self.__publish(payload, now=60.0))
+        self._filter.request_refresh()
+        self.assertEqual(payload, self.__publish(payload, now=61.0))
+        self.assertEqual({}, self.__publish(payload, now=62.0))
+
+    def test_interleaved_devices_are_refreshed_separately(self):
+        first = {'first/grid_voltage': 230.0, 'first/device_mode': 'Line'}
+        second = {'second/grid_voltage': 231.0, 'second/device_mode': 'Line'}
+        self.__publish(first, now=0.0)
+        self.__publish(second, now=0.5)
+        self.assertEqual({}, self.__publish(first, now=30.0))
+        self.assertEqual({}, self.__publish(second, now=30.5))
+        self.assertEqual(first, self.__publish(first, now=60.0))
+        self.assertEqual(second, self.__publish(second, now=60.5))
+        self._filter.request_refresh()
+        self.assertEqual(first, self.__publish(first, now=61.0))
+        self.assertEqual(second, self.__publish(second, now=61.5))
+        self.assertEqual({}, self.__publish(first, now=62.0))
+        self.assertEqual({}, self.__publish(second, now=62.5))
+
+    def test_failed_refresh_is_retried(self):
+        payload = {'grid_voltage': 230.0}
+        self.__publish(payload, now=0.0)
+        selected = self._filter.select(payload, now=60.0)
+        self._filter.acknowledge(selected, PublishResult([], {'grid_voltage': 'Timed out'}), now=60.0)
+        self.assertEqual(payload, self._filter.select(payload, now=61.0))
+
+    def test_failed_values_are_retried(self):
+        self.__publish({'grid_voltage': 230.0}, now=0.0)
+        selected = self._filter.select({'grid_voltage': 240.0}, now=1.0)
+        self._filter.acknowledge(selected, PublishResult([], {'grid_voltage': 'Timed out'}))
+        self.assertEqual({'grid_voltage': 240.0}, self._filter.select({'grid_voltage': 240.0}, now=2.0))
@@ -0,0 +1,130 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import IsolatedAsyncioTestCase
+
+from broker.homeassistant.hassio import Discovery
+from broker.model import PublishResult
+from common.model import (
+    CommandDefinition, CommandSpecification, CommandValidation, DeviceConfig, MQTTConfig, SwitchPayload
+)
+from di import LoggerProvider
+from engine import InverterCore
+from engine.model import DeviceInfo
+from processor.helper import ResponseDecoderCompiler
+
+
+class RecordingPublisher:
+
+    def __init__(self) -> None:
+        self.config = MQTTConfig('voltronic', 'localhost', 1883, 'user', 'password')
+        self.messages: List[Tuple[str, Dict[str, Any]]] = []
+
+    def topic_for(self, key: str, component: str = 'sensor') -> str:
+        return f'homeassistant/{component}/{self.config.topic}/{key}'
+
+    async def publish_message(self, payload: Dict[str, Any], component: str = 'sensor') -> PublishResult:
+        self.messages.append((component, payload))
+        return PublishResult(list(payload), {})
+
+
+class StaticInverter(InverterCore):
+
+    def __init__(self) -> None:
+        super().__init__(DeviceConfig('/dev/hidraw0', 2400, False), LoggerProvider.logger_factory_ioc())
+        self.device_information_calls = 0
+        # serial numbers reported by the first fetches, None when QID was not answered
+        self.serial_numbers: List[Optional[str]] = []
+
+    async def fetch_device_information(self) -> DeviceInfo:
+        self.device_information_calls += 1
+        serial_number = self.serial_numbers.pop(0) if self.serial_numbers else '9283'
+        return DeviceInfo('Axpert King 5kW', 'Axpert King', 'Voltronic Power', '00072.70', serial_number, 'PI30')
+
+
+def _definition(*specifications: CommandSpecification) -> CommandDefinition:
+    return CommandDefinition(list(specifications), CommandValidation(input_rule=None, output_rule=None))
+
+
+class TestDiscovery(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._publisher = RecordingPublisher()
+        self._inverter = StaticInverter()
+        self._inverter.response_decoders = ResponseDecoderCompiler().compile_all({
+            'QPIGS': _definition(
+                CommandSpecification('float', 'V', 'grid_voltage'),
+                CommandSpecification('int', '%', 'battery_capacity')
+            ),
+            'QMOD': _definition(CommandSpecification('option', 'Device mode', {'device_mode': {'B': 'Battery'}}))
+        })
+        switch = SwitchPayload('Buzzer', None, 'homeassistant/switch/voltronic/buzzer/set', '{{ value }}')
+        self._discovery = Discovery(
+            LoggerProvider.logger_factory_ioc(), self._inverter, self._publisher, switches=[switch]
+        )
+
+    def __sensors(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for component, payload in self._publisher.messages
+                for key, value in payload.items() if component == 'sensor'}
+
+    async def test_configuration_is_published_once(self):
+        await self._discovery.describe('QPIGS')
+        self.assertTrue(await self._discovery.broadcast_discovery())
+        self.assertTrue(await self._discovery.broadcast_discovery())
+        await self._discovery.describe('QPIGS')
+        self.assertTrue(await self._discovery.broadcast_discovery())
+        self.assertEqual(['switch', 'sensor'], sorted({component for component, _ in self._publisher.messages},
+                                                      reverse=True))
+        self.assertEqual(2, len(self._publisher.messages))
+        self.assertEqual(1, self._inverter.device_information_calls)
+        sensor = self.__sensors()['hidraw0_grid_voltage/config']
+        self.assertEqual('voltage', sensor['device_class'])
+        self.assertEqual('9283_grid_voltage', sensor['unique_id'])
+        self.assertEqual(['9283'], sensor['device']['identifiers'])
+
+    async def test_new_command_changes_hash(self):
+        await self._discovery.describe('QPIGS')
+        await self._discovery.broadcast_discovery()
+        self._publisher.messages.clear()
+        await self._discovery.describe('QMOD')
+        await self._discovery.broadcast_discovery()
+        self.assertIn('hidraw0_device_mode/config', self.__sensors())
+
+    async def test_birth_message_republishes(self):
+        await self._discovery.broadcast_discovery()
+        self._publisher.messages.clear()
+        self._discovery.on_status_message(b'offline')
+        self._discovery.on_status_message(b'online')
+        await asyncio.sleep(0.01)
+        self.assertEqual(1, len(self._publisher.messages))
+
+    async def test_nothing_is_discovered_until_the_serial_number_is_known(self):
+        self._inverter.serial_numbers = [None, None]
+        discovery = Discovery(
+            LoggerProvider.logger_factory_ioc(), self._inverter, self._publisher, retry_interval=0.0
+        )
+        await discovery.describe('QPIGS')
+        self.assertFalse(await discovery.broadcast_discovery())
+        self.assertEqual([], self._publisher.messages)
+        await discovery.describe('QPIGS')
+        self.assertTrue(await discovery.broadcast_discovery())
+        self.assertEqual('9283_grid_voltage', self.__sensors()['hidraw0_grid_voltage/config']['unique_id'])
+        self.assertEqual(3, self._inverter.device_information_calls)
+
+    async def test_device_name_identifies_device_without_serial_number(self):
+        self._inverter.serial_numbers = [None] * 5
+        discovery = Discovery(
+            LoggerProvider.logger_factory_ioc(), self._inverter, self._publisher, retry_interval=0.0
+        )
+        for _ in range(5):
+            await discovery.describe('QPIGS')
+        self.assertTrue(await discovery.broadcast_discovery())
+        self.assertEqual(['hidraw0'], self.__sensors()['hidraw0_grid_voltage/config']['device']['identifiers'])
+        await discovery.describe('QPIGS')
+        self.assertEqual(5, self._inverter.device_information_calls)
+
+    async def test_device_configuration_is_serialised(self):
+        await self._discovery.broadcast_device_configuration()
+        _, payload = self._publisher.messages[0]
+        self.assertEqual('9283', json.loads(next(iter(payload.values())))['serial_number'])
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase
+
+from benchmarks.fixtures import MinimalBroker
+from broker import Publisher
+from broker.helper import create_default_client
+from common.model import MQTTConfig
+from di import LoggerProvider
+
+
+class TestAsyncioClientLoop(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self._broker = MinimalBroker(record=True)
+        port = await self._broker.start()
+        logger = LoggerProvider.logger_factory_ioc().create_logger(__name__)
+        config = MQTTConfig('voltronic', '127.0.0.1', port, 'user', 'password')
+        self._publisher = Publisher(logger, create_default_client(logger, config), config)
+
+    async def asyncTearDown(self) -> None:
+        await self._broker.close()
+        await super().asyncTearDown()
+
+    async def __wait_until_connected(self) -> None:
+        for _ in range(100):
+            if self._publisher._client.is_connected():
+                return
+            await asyncio.sleep(0.01)
+        self.fail('Client did not connect')
+
+    async def test_client_shares_event_loop(self):
+        threads = threading.active_count()
+        task = asyncio.create_task(self._publisher.start())
+        await self.__wait_until_connected()
+        result = await self._publisher.publish_message({'grid_voltage': 230.0, 'battery_voltage': 52.1})
+        self.assertTrue(result)
+        self.assertEqual(threads, threading.active_count())
+        self._publisher.stop()
+        await asyncio.wait_for(task, 1.0)
+        await asyncio.sleep(0.05)
+        self.assertEqual([1, 3, 3, 14], [packet_type for packet_type, _ in self._broker.received])
+
+    async def test_reconnects_after_connection_loss(self):
+        self._broker.drop_connections = 1
+        task = asyncio.create_task(self._publisher.start())
+        for _ in range(300):
+            if self._broker.connections == 2 and self._publisher._client.is_connected():
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(2, self._broker.connections)
+        self._publisher.stop()
+        await asyncio.wait_for(task, 1.0)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import types
+from unittest import TestCase
+
+from common.helper import lazy_exports
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyExports(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._package = types.ModuleType('lazy_package')
+        sys.modules['lazy_package'] = self._package
+        self._package.__getattr__, self._package.__dir__ = lazy_exports('lazy_package', {'dumps': 'json'})
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        del sys.modules['lazy_package']
+
+    def test_export_is_resolved_and_kept_on_first_access(self):
+        import json
+        self.assertIs(self._package.dumps, json.dumps)
+        self.assertIs(vars(self._package)['dumps'], json.dumps)
+
+    def test_unknown_name_raises_attribute_error(self):
+        with self.assertRaises(AttributeError):
+            getattr(self._package, 'loads')
+
+    def test_exports_are_listed(self):
+        self.assertIn('dumps', dir(self._package))
+
+
+class TestImportSideEffects(TestCase):
+
+    @staticmethod
+    def __loaded_after(statement: str) -> set:
+        # modules are checked in a fresh interpreter, this process has most of them imported already
+        script = (
+            'import sys\n'
+            'from common.helper import FileSystem\n'
+            'def refuse(*args, **kwargs):\n'
+            '    raise AssertionError("configuration was read at import")\n'
+            'FileSystem.load_configuration = refuse\n'
+            f'{statement}\n'
+            'print(" ".join(sys.modules))'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=_ROOT, check=True, capture_output=True, text=True
+        )
+        return set(output.stdout.split())
+
+    def test_packages_do_not_import_heavy_dependencies(self):
+        for package in ('broker', 'dispatcher', 'engine', 'common.helper'):
+            with self.subTest(package=package):
+                loaded = self.__loaded_after(f'import {package}')
+                self.assertFalse({'paho', 'serial', 'dacite', 'yaml'} & loaded)
+
+    def test_dependencies_do_not_read_configuration(self):
+        loaded = self.__loaded_after('import di.dependencies')
+        self.assertFalse({'paho', 'serial', 'dacite'} & loaded)
@@ -0,0 +1,69 @@
+import logging
+import queue
+from unittest import TestCase
+
+from common.helper import DeferredQueueHandler, LoggerFactory, RateLimitFilter
+from common.model import Configuration
+
+
+def _record(message: str = 'Write result -> %s', *args, level: int = logging.DEBUG, line: int = 10):
+    return logging.LogRecord('dispatcher.dispatchers', level, __file__, line, message, args, None)
+
+
+class TestRateLimitFilter(TestCase):
+
+    def test_burst_passes_then_call_site_is_limited(self):
+        rate_limit = RateLimitFilter(rate=0, burst=3, sample_every=0)
+        passed = [rate_limit.filter(_record()) for _ in range(10)]
+        self.assertEqual([True] * 3 + [False] * 7, passed)
+
+    def test_call_sites_are_limited_independently(self):
+        rate_limit = RateLimitFilter(rate=0, burst=1, sample_every=0)
+        self.assertTrue(rate_limit.filter(_record(line=10)))
+        self.assertFalse(rate_limit.filter(_record(line=10)))
+        self.assertTrue(rate_limit.filter(_record(line=20)))
+
+    def test_limited_call_site_is_sampled_with_suppressed_count(self):
+        rate_limit = RateLimitFilter(rate=0, burst=1, sample_every=5)
+        records = [_record() for _ in range(11)]
+        passed = [record for record in records if rate_limit.filter(record)]
+        self.assertEqual([records[0], records[5], records[10]], passed)
+        self.assertTrue(passed[1].msg.endswith('[4 similar messages suppressed]'))
+
+    def test_warnings_are_never_limited(self):
+        rate_limit = RateLimitFilter(rate=0, burst=0, sample_every=0)
+        self.assertTrue(rate_limit.filter(_record(level=logging.WARNING)))
+
+
+class TestDeferredQueueHandler(TestCase):
+
+    def test_immutable_arguments_are_formatted_later(self):
+        handler = DeferredQueueHandler(queue.Queue())
+        handler.handle(_record('Write result -> %s', b'(PI30'))
+        record = handler.queue.get_nowait()
+        self.assertEqual((b'(PI30',), record.args)
+        self.assertEqual("Write result -> b'(PI30'", record.getMessage())
+
+    def test_mutable_arguments_are_formatted_immediately(self):
+        handler = DeferredQueueHandler(queue.Queue())
+        buffer = bytearray(b'(PI30')
+        handler.handle(_record('Write result -> %s', buffer))
+        buffer[:] = b'(NAK'
+        self.assertEqual("Write result -> bytearray(b'(PI30')", handler.queue.get_nowait().getMessage())
+
+    def test_records_are_dropped_when_queue_is_full(self):
+        handler = DeferredQueueHandler(queue.Queue(1))
+        handler.handle(_record())
+        handler.handle(_record())
+        self.assertEqual(1, handler.dropped)
+
+
+class TestLoggerFactory(TestCase):
+
+    def test_loggers_share_one_queue_handler(self):
+        factory = LoggerFactory(Configuration(mqtt=None, verbosity='DEBUG', plugin='generic-inverter'))
+        first, second = factory.create_logger('tests.first'), factory.create_logger('tests.second')
+        self.assertEqual(first.handlers, second.handlers)
+        self.assertEqual([LoggerFactory.backend().handler], first.handlers)
+        self.assertFalse(first.propagate)
+        self.assertIs(logging.Logger, logging.getLoggerClass())
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from common.helper import Histogram, MetricsRegistry
+
+
+class TestHistogram(TestCase):
+
+    def test_observations_are_counted_in_cumulative_buckets(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual([(0.1, 2), (1.0, 3), (float('inf'), 4)], histogram.buckets)
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(2.65, histogram.sum)
+
+    def test_quantile_is_interpolated_within_its_bucket(self):
+        histogram = Histogram((1.0, 2.0))
+        for value in (1.5, 1.5, 1.5, 1.5):
+            histogram.observe(value)
+        self.assertAlmostEqual(1.5, histogram.quantile(0.5))
+        self.assertAlmostEqual(1.99, histogram.quantile(0.99))
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_quantile_above_the_last_bound_is_the_last_bound(self):
+        histogram = Histogram((1.0,))
+        histogram.observe(5.0)
+        self.assertEqual(1.0, histogram.quantile(0.99))
+
+
+class TestMetricsRegistry(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._metrics = MetricsRegistry()
+
+    def test_same_name_and_labels_return_the_same_metric(self):
+        counter = self._metrics.counter('frames_total', 'Frames', device='usb0')
+        self.assertIs(counter, self._metrics.counter('frames_total', 'Frames', device='usb0'))
+        self.assertIsNot(counter, self._metrics.counter('frames_total', 'Frames', device='usb1'))
+
+    def test_name_cannot_change_its_kind(self):
+        self._metrics.counter('frames_total', 'Frames')
+        with self.assertRaises(ValueError):
+            self._metrics.gauge('frames_total', 'Frames')
+
+    def test_gauge_reads_its_function_on_collection(self):
+        depth = [3]
+        gauge = self._metrics.gauge('queue_depth', 'Depth', lambda: depth[0])
+        depth[0] = 5
+        self.assertEqual(5, gauge.value)
+
+    def test_prometheus_text_format(self):
+        self._metrics.counter('frames_total', 'Frames written', device='usb"0').inc(2)
+        self._metrics.histogram('latency_seconds', 'Latency', buckets=(0.5,), command='QPIGS').observe(0.25)
+        self.assertEqual(
+            '# HELP frames_total Frames written\n'
+            '# TYPE frames_total counter\n'
+            'frames_total{device="usb\\"0"} 2.0\n'
+            '# HELP latency_seconds Latency\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{command="QPIGS",le="0.5"} 1\n'
+            'latency_seconds_bucket{command="QPIGS",le="+Inf"} 1\n'
+            'latency_seconds_sum{command="QPIGS"} 0.25\n'
+            'latency_seconds_count{command="QPIGS"} 1\n',
+            self._metrics.render()
+        )
+
+    def test_text_file_is_replaced(self):
+        self._metrics.counter('frames_total', 'Frames').inc()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.prom')
+            self._metrics.write_text_file(path)
+            self._metrics.write_text_file(path)
+            with open(path) as file:
+                self.assertEqual(self._metrics.render(), file.read())
+            self.assertEqual(['metrics.prom'], os.listdir(directory))
+
+    def test_snapshot_reports_counter_rates_since_the_previous_snapshot(self):
+        counter = self._metrics.counter('frames_total', 'Frames', device='usb0')
+        self._metrics.histogram('latency_seconds', 'Latency').observe(0.02)
+        first = self._metrics.snapshot()
+        self.assertIsNone(first['metrics']['frames_total'][0]['rate'])
+        counter.inc(10)
+        second = json.loads(json.dumps(self._metrics.snapshot()))
+        entry = second['metrics']['frames_total'][0]
+        self.assertEqual({'device': 'usb0'}, entry['labels'])
+        self.assertEqual(10, entry['value'])
+        self.assertGreater(entry['rate'], 0)
+        self.assertEqual(1, second['metrics']['latency_seconds'][0]['count'])
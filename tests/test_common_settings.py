@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from common.model import Configuration, DeviceConfig
+
+
+class TestConfiguration(TestCase):
+
+    def test_devices_are_listed_with_the_single_device_first(self):
+        configuration = Configuration(
+            mqtt=None, verbosity='INFO', plugin='axpert-king-5kw',
+            device=DeviceConfig('/dev/hidraw0', 2400, False),
+            devices=[DeviceConfig('/dev/hidraw1', 2400, False)]
+        )
+        self.assertEqual(['hidraw0', 'hidraw1'], [device.device_name for device in configuration.device_configs])
+
+    def test_explicit_name_clashing_with_interface_name_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'hidraw0'):
+            Configuration(
+                mqtt=None, verbosity='INFO', plugin='axpert-king-5kw',
+                device=DeviceConfig('/dev/hidraw0', 2400, False),
+                devices=[DeviceConfig('/dev/ttyUSB0', 2400, True, name='hidraw0')]
+            )
+
+    def test_same_interface_name_in_other_directories_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Configuration(
+                mqtt=None, verbosity='INFO', plugin='axpert-king-5kw',
+                devices=[DeviceConfig('/dev/ttyUSB0', 2400, True), DeviceConfig('/dev/serial/ttyUSB0', 2400, True)]
+            )
@@ -0,0 +1,94 @@
+import math
+import os
+import shutil
+import struct
+import tempfile
+from unittest import TestCase
+
+from common.helper import RingBufferStore
+
+
+class TestRingBufferStore(TestCase):
+    __FIELDS = ('battery_voltage', 'pv_input_voltage', 'is_load_on')
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._directory)
+        super().tearDown()
+
+    def __create_store(self, capacity: int = 10, fields=__FIELDS) -> RingBufferStore:
+        record_size = 8 + 4 * len(fields)
+        store = RingBufferStore('inverter.ring', fields, 4096 + capacity * record_size, self._directory)
+        self.addCleanup(store.close)
+        return store
+
+    def test_samples_are_read_back(self):
+        store = self.__create_store()
+        store.append([53.5, 120.25, True], timestamp=100.0)
+        store.append([53.75, None, False], timestamp=105.0)
+        samples = list(store.query())
+        self.assertEqual([100.0, 105.0], [sample.timestamp for sample in samples])
+        self.assertEqual((53.5, 120.25, 1.0), samples[0].values)
+        self.assertEqual((53.75, None, 0.0), samples[1].values)
+
+    def test_file_never_grows_past_its_size(self):
+        store = self.__create_store(capacity=4)
+        size = os.path.getsize(store.path)
+        for second in range(10):
+            store.append([float(second), 0.0, False], timestamp=float(second))
+        self.assertEqual(size, os.path.getsize(store.path))
+        self.assertEqual(4, len(store))
+        self.assertEqual([6.0, 7.0, 8.0, 9.0], [sample.timestamp for sample in store.query()])
+
+    def test_range_query_after_wrapping(self):
+        store = self.__create_store(capacity=5)
+        for second in range(12):
+            store.append([float(second), 0.0, False], timestamp=float(second))
+        self.assertEqual([8.0, 9.0], [sample.timestamp for sample in store.query(8.0, 10.0)])
+        self.assertEqual([7.0], [sample.timestamp for sample in store.query(end=7.5)])
+        self.assertEqual([], list(store.query(20.0)))
+        self.assertEqual([10.0, 11.0], [sample.timestamp for sample in store.latest(2)])
+
+    def test_earlier_timestamp_keeps_order(self):
+        store = self.__create_store()
+        store.append([1.0, 0.0, False], timestamp=100.0)
+        store.append([2.0, 0.0, False], timestamp=50.0)
+        self.assertEqual([100.0, 100.0], [sample.timestamp for sample in store.query()])
+
+    def test_samples_survive_reopening(self):
+        store = self.__create_store(capacity=3)
+        for second in range(4):
+            store.append([float(second), 0.0, False], timestamp=float(second))
+        store.close()
+        reopened = self.__create_store(capacity=3)
+        self.assertEqual([1.0, 2.0, 3.0], [sample.timestamp for sample in reopened.query()])
+
+    def test_record_left_by_interrupted_append_is_skipped(self):
+        store = self.__create_store(capacity=3)
+        for second in range(4):
+            store.append([float(second), 0.0, False], timestamp=float(second))
+        store.close()
+        # an append stopped right after invalidating the oldest record, the one of second 1
+        with open(store.path, 'r+b') as file:
+            file.seek(4096 + (4 % 3) * (8 + 4 * len(self.__FIELDS)))
+            file.write(struct.pack('<d', math.nan))
+        reopened = self.__create_store(capacity=3)
+        self.assertEqual([2.0, 3.0], [sample.timestamp for sample in reopened.query()])
+        self.assertEqual([3.0], [sample.timestamp for sample in reopened.query(2.5)])
+        self.assertEqual([2.0, 3.0], [sample.timestamp for sample in reopened.latest(3)])
+        reopened.append([5.0, 0.0, False], timestamp=5.0)
+        self.assertEqual([2.0, 3.0, 5.0], [sample.timestamp for sample in reopened.query()])
+
+    def test_store_with_other_fields_starts_over(self):
+        store = self.__create_store()
+        store.append([1.0, 0.0, False], timestamp=1.0)
+        store.close()
+        reopened = self.__create_store(fields=('battery_voltage', 'pv_input_voltage', 'is_charging_on'))
+        self.assertEqual(0, len(reopened))
+
+    def test_wrong_number_of_values_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.__create_store().append([1.0])
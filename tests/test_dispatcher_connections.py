@@ -0,0 +1,36 @@
+from unittest import IsolatedAsyncioTestCase
+
+from common.model import DeviceConfig
+from di import LoggerProvider
+from dispatcher.connections import SerialConnectionPool
+
+
+class TestSerialConnectionPool(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._device_config = DeviceConfig(interface='loop://', baud_rate=2400, is_serial=True)
+        self._connection_pool = SerialConnectionPool(LoggerProvider.logger_factory_ioc())
+
+    def tearDown(self) -> None:
+        self._connection_pool.close()
+        super().tearDown()
+
+    async def test_acquire_reuses_open_transport(self):
+        async with self._connection_pool.acquire(self._device_config) as first:
+            self.assertEqual(b'QPI\xbe\xac\r', await first.exchange(b'QPI\xbe\xac\r', timeout=1))
+        async with self._connection_pool.acquire(self._device_config) as second:
+            self.assertIs(first, second)
+
+    async def test_acquire_reopens_closed_transport(self):
+        async with self._connection_pool.acquire(self._device_config) as first:
+            first.close()
+        async with self._connection_pool.acquire(self._device_config) as second:
+            self.assertIsNot(first, second)
+            self.assertTrue(second.is_open)
+
+    async def test_acquire_discards_transport_on_error(self):
+        with self.assertRaises(OSError):
+            async with self._connection_pool.acquire(self._device_config) as first:
+                raise OSError('device went away')
+        self.assertFalse(first.is_open)
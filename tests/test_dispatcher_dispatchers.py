@@ -0,0 +1,87 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+from unittest import IsolatedAsyncioTestCase
+
+from common.helper import MetricsRegistry
+from common.model import DeviceConfig
+from di import LoggerProvider
+from di.dependencies import CrcProvider, FrameCacheProvider
+from dispatcher import BusTimer, CommandDispatcher
+from simulator import InverterSimulator
+
+
+class FlakyTransport:
+    """
+    Answers like the simulator once the first `failures` exchanges raised an I/O error
+    """
+
+    def __init__(self, failures: int) -> None:
+        self._failures = failures
+        self._simulator = InverterSimulator()
+
+    async def exchange(self, frame: bytes, timeout: float) -> bytes:
+        if self._failures > 0:
+            self._failures -= 1
+            raise OSError('device went away')
+        return self._simulator.respond(frame)
+
+
+class FlakyConnectionPool:
+
+    def __init__(self, failures: int) -> None:
+        self._transport = FlakyTransport(failures)
+
+    @asynccontextmanager
+    async def acquire(self, device_config: DeviceConfig) -> AsyncIterator[FlakyTransport]:
+        yield self._transport
+
+
+class TestCommandDispatcher(IsolatedAsyncioTestCase):
+
+    def __dispatcher(self, failures: int, metrics: MetricsRegistry) -> CommandDispatcher:
+        dispatcher = CommandDispatcher(
+            LoggerProvider.logger_factory_ioc(),
+            DeviceConfig('flaky://', 2400, True, name='flaky'),
+            CrcProvider.crc_ioc(),
+            FrameCacheProvider.frame_cache_ioc(),
+            FlakyConnectionPool(failures),
+            metrics=metrics
+        )
+        self.addAsyncCleanup(dispatcher.stop)
+        return dispatcher
+
+    @staticmethod
+    def __counted(metrics: MetricsRegistry, name: str) -> List[float]:
+        return [entry['value'] for entry in metrics.snapshot()['metrics'].get(name, [])]
+
+    async def test_successful_retry_is_not_counted_as_failure(self):
+        metrics = MetricsRegistry()
+        self.assertIsNotNone(await self.__dispatcher(1, metrics).execute('QPI'))
+        self.assertEqual([1.0], self.__counted(metrics, 'mppt_command_retries_total'))
+        self.assertEqual([], self.__counted(metrics, 'mppt_command_failures_total'))
+
+    async def test_failed_retry_is_counted_once(self):
+        metrics = MetricsRegistry()
+        self.assertIsNone(await self.__dispatcher(2, metrics).execute('QPI'))
+        self.assertEqual(1, metrics.counter(
+            'mppt_command_failures_total', '', device='flaky', command='QPI', reason='io_error'
+        ).value)
+
+    async def test_rejection_is_returned_to_user_commands_only(self):
+        metrics = MetricsRegistry()
+        dispatcher = self.__dispatcher(0, metrics)
+        self.assertTrue((await dispatcher.queue_pending_command('POP07')).is_nak())
+        self.assertIsNone(await dispatcher.execute('POP07'))
+        self.assertEqual(2, metrics.counter(
+            'mppt_command_failures_total', '', device='flaky', command='POP07', reason='nak'
+        ).value)
+
+    async def test_bus_time_is_added_to_the_timer_of_the_caller(self):
+        metrics = MetricsRegistry()
+        dispatcher = self.__dispatcher(0, metrics)
+        with BusTimer() as timer:
+            await dispatcher.execute('QPI')
+            await dispatcher.execute('QPIGS')
+        self.assertEqual(2, timer.exchanges)
+        busy = metrics.counter('mppt_serial_busy_seconds_total', '', device='flaky')
+        self.assertAlmostEqual(busy.value, timer.seconds)
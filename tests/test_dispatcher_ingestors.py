@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+from unittest import IsolatedAsyncioTestCase
+
+from common.model import Command, CommandDefinition, CommandValidation, RawResponse
+from di import LoggerProvider
+from dispatcher import CommandIngestor
+from processor.helper import CommandValidator
+
+
+class GatedDispatcher:
+
+    def __init__(self) -> None:
+        self.executed: List[str] = []
+        # command -> response frame, None when the device does not answer
+        self.responses: Dict[str, Optional[bytes]] = {}
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def queue_pending_command(self, cmd: str) -> Optional[RawResponse]:
+        await self.gate.wait()
+        self.executed.append(cmd)
+        response = self.responses.get(cmd, b'(ACK9 \r')
+        return RawResponse(response, Command(cmd)) if response is not None else None
+
+
+class TestCommandIngestor(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self._dispatcher = GatedDispatcher()
+        self._acknowledgements: List[Dict[str, Any]] = []
+        self._executed: List[str] = []
+        validator = CommandValidator({
+            'QPIGS': CommandDefinition([], CommandValidation(input_rule=None, output_rule=None)),
+            'POP': CommandDefinition([], CommandValidation(input_rule=r'POP0[0-2]', output_rule=None))
+        })
+        self._ingestor = CommandIngestor(
+            LoggerProvider.logger_factory_ioc(),
+            self._dispatcher,
+            validator,
+            self.__acknowledge,
+            max_queued=2,
+            dedupe_window=0.1,
+            on_executed=self._executed.append
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self._ingestor.stop()
+        await super().asyncTearDown()
+
+    async def __acknowledge(self, acknowledgement: Dict[str, Any]) -> None:
+        self._acknowledgements.append(acknowledgement)
+
+    async def __settle(self) -> None:
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    def __statuses(self) -> Dict[str, str]:
+        return {acknowledgement['command']: acknowledgement['status'] for acknowledgement in self._acknowledgements}
+
+    async def test_valid_commands_are_dispatched_and_acknowledged(self):
+        self.assertTrue(self._ingestor.submit('POP02'))
+        await self.__settle()
+        self.assertEqual(['POP02'], self._dispatcher.executed)
+        self.assertEqual([{'command': 'POP02', 'status': 'ok', 'detail': 'ACK'}], self._acknowledgements)
+
+    async def test_executed_commands_are_reported_whatever_the_outcome(self):
+        self._dispatcher.responses = {'POP01': None}
+        self.assertTrue(self._ingestor.submit('POP01'))
+        self.assertTrue(self._ingestor.submit('POP02'))
+        self.assertFalse(self._ingestor.submit('POP07'))
+        await self.__settle()
+        self.assertEqual(['POP01', 'POP02'], self._executed)
+
+    async def test_malformed_commands_are_rejected(self):
+        self.assertFalse(self._ingestor.submit('POP07'))
+        self.assertFalse(self._ingestor.submit('QPIGS\r'))
+        self.assertFalse(self._ingestor.submit('FOO'))
+        await self.__settle()
+        self.assertEqual([], self._dispatcher.executed)
+        self.assertEqual({'POP07': 'rejected', 'QPIGS\r': 'rejected', 'FOO': 'rejected'}, self.__statuses())
+
+    async def test_device_rejection_is_told_apart_from_no_response(self):
+        self._dispatcher.responses = {'POP01': b'(NAKss\r', 'POP02': None}
+        self.assertTrue(self._ingestor.submit('POP01'))
+        self.assertTrue(self._ingestor.submit('POP02'))
+        await self.__settle()
+        self.assertEqual({'command': 'POP01', 'status': 'rejected', 'detail': 'NAK'}, self._acknowledgements[0])
+        self.assertEqual({'command': 'POP02', 'status': 'failed', 'detail': 'No valid response from device'},
+                         self._acknowledgements[1])
+
+    async def test_duplicates_within_window_are_dropped(self):
+        self.assertTrue(self._ingestor.submit('POP01'))
+        self.assertFalse(self._ingestor.submit('POP01'))
+        await asyncio.sleep(0.11)
+        self.assertTrue(self._ingestor.submit('POP01'))
+        await self.__settle()
+        self.assertEqual(['POP01', 'POP01'], self._dispatcher.executed)
+
+    async def test_full_queue_rejects_commands(self):
+        self._dispatcher.gate.clear()
+        self.assertTrue(self._ingestor.submit('POP00'))
+        await self.__settle()
+        accepted = [self._ingestor.submit(command) for command in ('POP01', 'POP02', 'QPIGS')]
+        await self.__settle()
+        self.assertEqual('busy', self.__statuses()['QPIGS'])
+        self.assertEqual(1, accepted.count(False))
+        self._dispatcher.gate.set()
+        await self.__settle()
+        self.assertEqual(['POP00', 'POP01', 'POP02'], self._dispatcher.executed)
+
+    async def test_commands_from_other_threads_are_handed_to_the_loop(self):
+        loop = asyncio.get_running_loop()
+        thread = threading.Thread(target=loop.call_soon_threadsafe, args=(self._ingestor.submit, 'QPIGS'))
+        thread.start()
+        thread.join()
+        await self.__settle()
+        self.assertEqual(['QPIGS'], self._dispatcher.executed)
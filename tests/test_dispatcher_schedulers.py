@@ -0,0 +1,61 @@
+import asyncio
+from typing import List, Optional
+from unittest import IsolatedAsyncioTestCase
+
+from common.model import RawResponse, Command
+from di import LoggerProvider
+from dispatcher import CommandScheduler, CommandPriority
+
+
+class TestCommandScheduler(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self._executed: List[str] = []
+        self._bus = asyncio.Event()
+        self._scheduler = CommandScheduler(LoggerProvider.logger_factory_ioc(), self.__execute, max_pending=3)
+
+    async def asyncTearDown(self) -> None:
+        await self._scheduler.stop()
+        await super().asyncTearDown()
+
+    async def __execute(self, command: str) -> Optional[RawResponse]:
+        await self._bus.wait()
+        self._executed.append(command)
+        return RawResponse(b'(ACK9 \r', Command(command))
+
+    async def test_user_commands_are_sent_ahead_of_telemetry(self):
+        blocking = self._scheduler.submit_nowait('QPIRI')
+        await asyncio.sleep(0)
+        telemetry = self._scheduler.submit_nowait('QPIGS')
+        user = self._scheduler.submit_nowait('POP02', CommandPriority.USER)
+        self._bus.set()
+        await asyncio.gather(blocking, telemetry, user)
+        self.assertEqual(['QPIRI', 'POP02', 'QPIGS'], self._executed)
+
+    async def test_duplicate_queries_are_coalesced(self):
+        first = asyncio.create_task(self._scheduler.submit('QPIGS'))
+        second = asyncio.create_task(self._scheduler.submit('QPIGS'))
+        await asyncio.sleep(0)
+        self.assertEqual(1, self._scheduler.depth)
+        self._bus.set()
+        self.assertIs(await first, await second)
+        self.assertEqual(['QPIGS'], self._executed)
+
+    async def test_set_commands_are_not_coalesced(self):
+        self._bus.set()
+        await asyncio.gather(self._scheduler.submit('PE'), self._scheduler.submit('PE'))
+        self.assertEqual(['PE', 'PE'], self._executed)
+
+    async def test_backpressure(self):
+        for command in ('QPIGS', 'QPIRI', 'QMOD'):
+            self._scheduler.submit_nowait(command)
+        with self.assertRaises(asyncio.QueueFull):
+            self._scheduler.submit_nowait('QPIWS')
+        waiting = asyncio.create_task(self._scheduler.submit('QPIWS'))
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiting.done())
+        self._bus.set()
+        await waiting
+        self.assertEqual(['QPIGS', 'QPIRI', 'QMOD', 'QPIWS'], self._executed)
+        self.assertEqual(0, self._scheduler.depth)
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+import tty
+from unittest import IsolatedAsyncioTestCase
+
+import serial
+
+from dispatcher.transports import SerialTransport, HidRawTransport
+
+
+class TestSerialTransport(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        # the master side plays the inverter while the transport opens the slave like a real serial port
+        self._inverter_fd, self._port_fd = os.openpty()
+        self._transport = SerialTransport(serial.serial_for_url(os.ttyname(self._port_fd), 2400))
+
+    def tearDown(self) -> None:
+        self._transport.close()
+        os.close(self._port_fd)
+        os.close(self._inverter_fd)
+        super().tearDown()
+
+    async def __respond(self, *chunks: bytes, delay: float = 0.01) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, os.read, self._inverter_fd, 64)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            os.write(self._inverter_fd, chunk)
+
+    async def test_exchange_reads_frame_arriving_in_chunks(self):
+        responder = asyncio.create_task(self.__respond(b'(NA', b'Kss\r'))
+        response = await self._transport.exchange(b'QPI\xbe\xac\r', timeout=1)
+        await responder
+        self.assertEqual(b'(NAKss\r', response)
+
+    async def test_exchange_does_not_block_event_loop(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        responder = asyncio.create_task(self.__respond(b'(NAKss\r', delay=0.1))
+        await self._transport.exchange(b'QPI\xbe\xac\r', timeout=1)
+        await responder
+        ticking.cancel()
+        self.assertGreater(ticks, 5)
+
+    async def test_exchange_times_out(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await self._transport.exchange(b'QPI\xbe\xac\r', timeout=0.05)
+
+
+class TestHidRawTransport(IsolatedAsyncioTestCase):
+    # pacing of the previous aiofiles based implementation, which slept after every 8 byte chunk
+    __LEGACY_CHUNK_DELAY = 0.16
+
+    def setUp(self) -> None:
+        super().setUp()
+        # a raw pty stands in for the hidraw node, the master side plays the inverter
+        self._inverter_fd, self._port_fd = os.openpty()
+        tty.setraw(self._port_fd)
+        self._transport = HidRawTransport(os.ttyname(self._port_fd))
+
+    def tearDown(self) -> None:
+        self._transport.close()
+        os.close(self._port_fd)
+        os.close(self._inverter_fd)
+        super().tearDown()
+
+    async def __respond(self, frame_size: int, *reports: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        received = b''
+        while len(received) < frame_size:
+            received += await loop.run_in_executor(None, os.read, self._inverter_fd, 64)
+        for report in reports:
+            os.write(self._inverter_fd, report)
+        return received
+
+    async def test_write_sends_zero_padded_reports(self):
+        frame = b'POP02\xe2\x0b\r'
+        responder = asyncio.create_task(self.__respond(16, b'(ACK9 \r\x00'))
+        await self._transport.exchange(frame + frame[:1], timeout=1)
+        self.assertEqual(frame + frame[:1] + bytes(7), await responder)
+
+    async def test_read_frame_drops_report_padding(self):
+        responder = asyncio.create_task(self.__respond(8, b'(NAKss\r\x00', b'\x00' * 8))
+        response = await self._transport.exchange(b'QPIGS\xb7\xa9\r', timeout=1)
+        await responder
+        self.assertEqual(b'(NAKss\r', response)
+
+    async def test_exchange_is_faster_than_fixed_chunk_pacing(self):
+        frame = b'MUCHGC0020\x0b\xa5\r'  # 13 bytes, spans two reports
+        legacy = 2 * self.__LEGACY_CHUNK_DELAY
+        responder = asyncio.create_task(self.__respond(16, b'(ACK9 \r\x00'))
+        started = time.monotonic()
+        await self._transport.exchange(frame, timeout=1)
+        elapsed = time.monotonic() - started
+        await responder
+        self.assertLess(elapsed, legacy / 4)
+        self.assertEqual(0.0, self._transport.pace)
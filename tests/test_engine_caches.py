@@ -0,0 +1,104 @@
+import asyncio
+from collections import Counter
+from typing import Optional
+from unittest import IsolatedAsyncioTestCase
+
+from common.model import DeviceConfig
+from di import LoggerProvider
+from engine import InverterCore
+from engine.model import CachePolicy, DeviceInfo
+from engine.plugin import CachedInverterCore
+
+
+class CountingInverter(InverterCore):
+
+    def __init__(self) -> None:
+        super().__init__(DeviceConfig('loop://', 2400, True), LoggerProvider.logger_factory_ioc())
+        self.calls = Counter()
+        # serial numbers reported by the first fetches of the device information, None when QID was not answered
+        self.serial_numbers = []
+
+    async def __respond(self, name: str) -> Optional[str]:
+        self.calls[name] += 1
+        await asyncio.sleep(0.01)
+        return f'{name}-{self.calls[name]}'
+
+    async def invoke(self, command: str) -> Optional[str]:
+        return await self.__respond(command)
+
+    async def fetch_device_information(self) -> DeviceInfo:
+        self.calls['device_information'] += 1
+        serial_number = self.serial_numbers.pop(0) if self.serial_numbers else '9283'
+        return DeviceInfo('Axpert King 5kW', 'Axpert King', 'Voltronic Power', '00072.70', serial_number, 'PI30')
+
+    async def fetch_settings(self) -> Optional[str]:
+        return await self.__respond('settings')
+
+    async def fetch_status(self) -> Optional[str]:
+        return await self.__respond('status')
+
+
+class TestCachedInverterCore(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._inverter = CountingInverter()
+        self._cached = CachedInverterCore(
+            self._inverter,
+            LoggerProvider.logger_factory_ioc(),
+            CachePolicy(status=0.05, queries={'QPIRI': 60})
+        )
+
+    async def test_responses_are_cached_until_expiry(self):
+        self.assertEqual('status-1', await self._cached.fetch_status())
+        self.assertEqual('status-1', await self._cached.fetch_status())
+        await asyncio.sleep(0.06)
+        self.assertEqual('status-2', await self._cached.fetch_status())
+
+    async def test_concurrent_callers_share_one_request(self):
+        results = await asyncio.gather(*(self._cached.fetch_settings() for _ in range(5)))
+        self.assertEqual(['settings-1'] * 5, results)
+        self.assertEqual(1, self._inverter.calls['settings'])
+
+    async def test_set_command_invalidates_affected_entries(self):
+        await self._cached.fetch_settings()
+        await self._cached.invoke('QPIRI')
+        await self._cached.fetch_status()
+        await self._cached.invoke('POP02')
+        self.assertEqual('settings-2', await self._cached.fetch_settings())
+        self.assertEqual('QPIRI-2', await self._cached.invoke('QPIRI'))
+        self.assertEqual('status-1', await self._cached.fetch_status())
+
+    async def test_uncached_queries_pass_through(self):
+        await self._cached.invoke('QMOD')
+        await self._cached.invoke('QMOD')
+        self.assertEqual(2, self._inverter.calls['QMOD'])
+
+    async def test_incomplete_device_information_is_fetched_again(self):
+        self._inverter.serial_numbers = [None]
+        self.assertIsNone((await self._cached.fetch_device_information()).serial_number)
+        self.assertEqual('9283', (await self._cached.fetch_device_information()).serial_number)
+        await self._cached.fetch_device_information()
+        self.assertEqual(2, self._inverter.calls['device_information'])
+
+    async def test_set_command_sent_elsewhere_invalidates_affected_entries(self):
+        await self._cached.fetch_settings()
+        self._cached.invalidate_for('QPIGS')
+        self.assertEqual('settings-1', await self._cached.fetch_settings())
+        self._cached.invalidate_for('POP02')
+        self.assertEqual('settings-2', await self._cached.fetch_settings())
+
+    async def test_only_flag_commands_invalidate_flags(self):
+        policy = CachePolicy(queries={'QFLAG': 60})
+        cached = CachedInverterCore(self._inverter, LoggerProvider.logger_factory_ioc(), policy)
+        await cached.invoke('QFLAG')
+        await cached.invoke('POP02')
+        self.assertEqual('QFLAG-1', await cached.invoke('QFLAG'))
+        await cached.invoke('PEa')
+        self.assertEqual('QFLAG-2', await cached.invoke('QFLAG'))
+        await cached.invoke('PDb')
+        self.assertEqual('QFLAG-3', await cached.invoke('QFLAG'))
+
+    def test_plugin_definitions_are_those_of_the_wrapped_inverter(self):
+        self._inverter.response_decoders = {'QPIGS': None}
+        self.assertIs(self._inverter.response_decoders, self._cached.response_decoders)
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from common.helper import FileSystem
+from di import LoggerProvider
+from engine.helper import PluginManifestIndex, PluginUtility
+from engine.model import DependencyModule, PluginConfig, PluginRunTimeConfig
+
+
+class TestPluginManifestIndex(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._directory = tempfile.mkdtemp()
+        self._plugin_path = os.path.join(self._directory, 'axpert')
+        os.mkdir(self._plugin_path)
+        with open(os.path.join(self._plugin_path, 'plugin.yaml'), 'w') as file:
+            file.write("name: 'Axpert'\n")
+        self._config = PluginConfig(
+            name='Axpert',
+            alias='axpert',
+            creator='wax911',
+            runtime=PluginRunTimeConfig('main.py', None),
+            repository='https://github.com/wax911/mppt-solar-plugins/',
+            description='Plugin for Axpert inverters',
+            version='0.0.1',
+            requirements=[DependencyModule('PyYAML', '5.3.1')]
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._directory)
+        super().tearDown()
+
+    def __create_index(self) -> PluginManifestIndex:
+        return PluginManifestIndex(LoggerProvider.logger_factory_ioc(), self._directory)
+
+    def test_index_survives_restart(self):
+        index = self.__create_index()
+        index.put(self._plugin_path, self._config)
+        index.save()
+        self.assertEqual(self._config, self.__create_index().get(self._plugin_path))
+
+    def test_changed_manifest_is_not_reused(self):
+        index = self.__create_index()
+        index.put(self._plugin_path, self._config)
+        time.sleep(0.01)
+        with open(os.path.join(self._plugin_path, 'plugin.yaml'), 'a') as file:
+            file.write("alias: 'axpert-king'\n")
+        self.assertIsNone(index.get(self._plugin_path))
+
+    def test_invalidated_entry_is_dropped(self):
+        index = self.__create_index()
+        index.put(self._plugin_path, self._config)
+        index.invalidate(self._plugin_path)
+        index.save()
+        self.assertIsNone(self.__create_index().get(self._plugin_path))
+
+
+class TestPluginUtility(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._directory = tempfile.mkdtemp()
+        self._index = PluginManifestIndex(LoggerProvider.logger_factory_ioc(), self._directory)
+        self._utility = PluginUtility(LoggerProvider.logger_factory_ioc(), self._index)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._directory)
+        super().tearDown()
+
+    def test_setup_indexes_plugin_with_satisfied_requirements(self):
+        self.assertEqual('main.py', self._utility.setup_plugin_configuration('plugins', 'axpert-king-5kw'))
+        self._utility.save_index()
+        index = PluginManifestIndex(LoggerProvider.logger_factory_ioc(), self._directory)
+        indexed = index.get(os.path.join(FileSystem.get_plugins_directory(), 'axpert-king-5kw'))
+        self.assertEqual('Axpert King 5kW Plugin', indexed.name)
+
+    def test_empty_manifest_is_skipped_without_error(self):
+        with self.assertNoLogs('engine.helper.helpers', level='ERROR'):
+            self.assertIsNone(self._utility.read_plugin_configuration('plugins', 'protocol-pi41'))
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from unittest import IsolatedAsyncioTestCase
+
+from common.helper import MetricsRegistry
+from common.model import DeviceConfig, PollConfig
+from di import LoggerProvider
+from dispatcher import BusTimer
+from engine import InverterCore
+from engine.helper import PollPlanner
+
+
+class TimedInverter(InverterCore):
+    """
+    Inverter whose commands hold the bus for a fixed time, commands listed in `failures` fail that many times first
+    """
+
+    def __init__(
+            self,
+            poll_interval: float,
+            poll: PollConfig,
+            durations: Dict[str, float],
+            failures: Optional[Dict[str, int]] = None,
+            name: str = 'timed'
+    ) -> None:
+        super().__init__(
+            DeviceConfig('loop://', 2400, True, name=name, poll_interval=poll_interval, poll=poll),
+            LoggerProvider.logger_factory_ioc()
+        )
+        self._durations = durations
+        self._failures = dict(failures or {})
+        self.polls: List[Tuple[float, str]] = []
+
+    async def invoke(self, command: str) -> Optional[str]:
+        self.polls.append((time.monotonic(), command))
+        await asyncio.sleep(self._durations.get(command, 0.0))
+        if self._failures.get(command, 0) > 0:
+            self._failures[command] -= 1
+            return None
+        return command
+
+    async def fetch_status(self) -> Optional[str]:
+        return await self.invoke(PollPlanner.STATUS)
+
+    def count(self, command: str) -> int:
+        return sum(1 for _, polled in self.polls if polled == command)
+
+
+class QueuedInverter(TimedInverter):
+    """
+    Inverter whose commands wait `queued` seconds behind other commands before holding the bus for their duration
+    """
+
+    def __init__(self, poll_interval: float, poll: PollConfig, durations: Dict[str, float], queued: float) -> None:
+        super().__init__(poll_interval, poll, durations, name='queued')
+        self._queued = queued
+
+    async def invoke(self, command: str) -> Optional[str]:
+        await asyncio.sleep(self._queued)
+        BusTimer.add(self._durations.get(command, 0.0))
+        return command
+
+
+class TestPollPlanner(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._samples: List[str] = []
+
+    async def __on_sample(self, device: DeviceConfig, sample: str) -> None:
+        self._samples.append(sample)
+
+    def __planner(self, inverter: InverterCore, metrics: Optional[MetricsRegistry] = None, seed: int = 1):
+        return PollPlanner(LoggerProvider.logger_factory_ioc(), inverter, self.__on_sample, metrics, seed)
+
+    @staticmethod
+    async def __run_for(planner: PollPlanner, duration: float) -> None:
+        try:
+            await asyncio.wait_for(planner.run(), duration)
+        except asyncio.TimeoutError:
+            pass
+
+    async def test_status_takes_the_budget_left_by_other_commands(self):
+        poll = PollConfig(commands={'QPIRI': 0.2}, bus_budget=0.5, jitter=0.0)
+        inverter = TimedInverter(0.0, poll, {PollPlanner.STATUS: 0.01, 'QPIRI': 0.01})
+        planner = self.__planner(inverter)
+        await self.__run_for(planner, 0.4)
+        # QPIRI takes 5% of the bus, the status gets the remaining 45%
+        self.assertAlmostEqual(0.01 / 0.45, planner.intervals[PollPlanner.STATUS], delta=0.01)
+        self.assertAlmostEqual(0.2, planner.intervals['QPIRI'], delta=0.01)
+        self.assertLessEqual(planner.bus_share, 0.5 + 0.05)
+        self.assertGreaterEqual(inverter.count('QPIRI'), 2)
+        self.assertGreater(inverter.count(PollPlanner.STATUS), 8)
+
+    async def test_status_is_not_polled_faster_than_its_interval(self):
+        poll = PollConfig(jitter=0.0)
+        inverter = TimedInverter(0.1, poll, {PollPlanner.STATUS: 0.0})
+        planner = self.__planner(inverter)
+        await self.__run_for(planner, 0.35)
+        self.assertEqual(0.1, planner.intervals[PollPlanner.STATUS])
+        self.assertLessEqual(inverter.count(PollPlanner.STATUS), 4)
+
+    async def test_commands_over_half_the_budget_are_stretched(self):
+        poll = PollConfig(commands={'QMOD': 0.02}, bus_budget=0.8, jitter=0.0)
+        inverter = TimedInverter(1.0, poll, {'QMOD': 0.02})
+        planner = self.__planner(inverter)
+        await self.__run_for(planner, 0.2)
+        # QMOD alone would keep the bus busy all the time, it is limited to half the budget
+        self.assertAlmostEqual(0.02 / 0.4, planner.intervals['QMOD'], delta=0.01)
+
+    async def test_failing_command_backs_off_and_recovers(self):
+        poll = PollConfig(commands={'QPIWS': 0.02}, jitter=0.0)
+        inverter = TimedInverter(1.0, poll, {}, failures={'QPIWS': 3})
+        planner = self.__planner(inverter)
+        await self.__run_for(planner, 0.2)
+        polled_at = [at for at, command in inverter.polls if command == 'QPIWS']
+        gaps = [later - earlier for earlier, later in zip(polled_at, polled_at[1:])]
+        # backs off to 0.1, 0.2 and 0.4 seconds after the three failures
+        self.assertGreater(gaps[0], 0.09)
+        await self.__run_for(planner, 1.5)
+        self.assertEqual(0.02, planner.intervals['QPIWS'])
+        self.assertIn('QPIWS', self._samples)
+
+    async def test_jitter_spreads_devices_started_together(self):
+        poll = PollConfig(jitter=1.0)
+        inverters = [TimedInverter(0.2, poll, {}, name=f'inverter-{index}') for index in range(3)]
+        planners = [self.__planner(inverter, seed=index) for index, inverter in enumerate(inverters)]
+        await asyncio.wait_for(asyncio.gather(*(self.__run_for(planner, 0.25) for planner in planners)), 1)
+        first_polls = sorted(inverter.polls[0][0] for inverter in inverters)
+        self.assertGreater(min(later - earlier for earlier, later in zip(first_polls, first_polls[1:])), 0.005)
+
+    async def test_intervals_are_exposed_as_metrics(self):
+        metrics = MetricsRegistry()
+        inverter = TimedInverter(0.5, PollConfig(commands={'QMOD': 30.0}), {}, name='metered')
+        self.__planner(inverter, metrics)
+        self.assertEqual(30.0, metrics.gauge('mppt_poll_interval_seconds', '', device='metered', command='QMOD').value)
+        self.assertEqual(0.0, metrics.gauge('mppt_poll_bus_share', '', device='metered').value)
+
+    async def test_time_queued_behind_other_commands_is_not_bus_time(self):
+        poll = PollConfig(bus_budget=0.5, jitter=0.0)
+        inverter = QueuedInverter(0.0, poll, {PollPlanner.STATUS: 0.01}, queued=0.05)
+        planner = self.__planner(inverter)
+        await self.__run_for(planner, 0.2)
+        self.assertAlmostEqual(0.02, planner.intervals[PollPlanner.STATUS])
+
+    def test_command_intervals_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.__planner(TimedInverter(1.0, PollConfig(commands={'QPIRI': 0.0}), {}))
+
+    def test_bus_budget_must_be_a_share(self):
+        with self.assertRaises(ValueError):
+            self.__planner(TimedInverter(1.0, PollConfig(bus_budget=0.0), {}))
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Dict, Optional
+from unittest import TestCase
+
+from common.model import Command, DeviceConfig, RawResponse
+from di import LoggerProvider
+from di.dependencies import FrameCacheProvider
+from engine import InverterCore
+from engine.helper import PluginRegistry, PluginUtility
+from engine.plugin import IPluginRegistry
+from simulator import InverterSimulator
+
+
+class FramedDispatcher:
+    """
+    Answers every command with a frame around its payload in `payloads`
+    """
+
+    def __init__(self, payloads: Dict[str, bytes]) -> None:
+        self._payloads = payloads
+
+    async def execute(self, cmd: str) -> Optional[RawResponse]:
+        return RawResponse(InverterSimulator.frame(self._payloads[cmd]), Command(cmd))
+
+
+class TestPluginRegistryMetaclass(TestCase):
+
+    def test_subclasses_are_registered_by_module(self):
+        class FirstInverter(InverterCore):
+            pass
+
+        class SecondInverter(InverterCore):
+            pass
+
+        classes = IPluginRegistry.classes_in(__name__)
+        self.assertIn(FirstInverter, classes)
+        self.assertIn(SecondInverter, classes)
+        self.assertNotIn(InverterCore, IPluginRegistry.classes_in(InverterCore.__module__))
+
+
+class TestPluginRegistry(TestCase):
+    __ALIAS = 'axpert-king-5kw'
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._logger_factory = LoggerProvider.logger_factory_ioc()
+        self._frame_cache = FrameCacheProvider.frame_cache_ioc()
+        self._registry = PluginRegistry(self._logger_factory, PluginUtility(self._logger_factory), self._frame_cache)
+        self._registry.index()
+
+    @staticmethod
+    def __device(name: str) -> DeviceConfig:
+        return DeviceConfig('loop://', 2400, True, name=name)
+
+    def test_plugins_are_indexed_by_alias(self):
+        self.assertIn(self.__ALIAS, self._registry.aliases)
+        self.assertEqual('main.py', self._registry.manifest(self.__ALIAS).runtime.main)
+
+    def test_plugin_is_loaded_with_compiled_decoders(self):
+        plugin = self._registry.load(self.__ALIAS)
+        self.assertEqual('AxpertKing5kW', plugin.__name__)
+        self.assertIn('QPIGS', plugin.response_decoders)
+        self.assertIs(plugin, self._registry.load(self.__ALIAS))
+
+    def test_unknown_alias_is_not_loaded(self):
+        self.assertIsNone(self._registry.load('unknown'))
+        self.assertIsNone(self._registry.inverter('unknown', self.__device('inverter_1')))
+
+    def test_inverters_are_pooled_per_device(self):
+        first = self._registry.inverter(self.__ALIAS, self.__device('inverter_1'))
+        second = self._registry.inverter(self.__ALIAS, self.__device('inverter_2'))
+        self.assertIs(first, self._registry.inverter(self.__ALIAS, self.__device('inverter_1')))
+        self.assertIsNot(first, second)
+        self.assertIs(type(first), type(second))
+        self.assertEqual('inverter_2', second.device_config.device_name)
+
+    def test_plugin_without_protocol_has_none(self):
+        self.assertIsNone(self._registry.protocol(self.__ALIAS))
+
+    def test_empty_firmware_version_leaves_device_information_incomplete(self):
+        dispatcher = FramedDispatcher({'QPI': b'PI30', 'QID': b'92932004102453', 'QVFW': b''})
+        inverter = self._registry.inverter(self.__ALIAS, self.__device('empty-firmware'), dispatcher)
+        device_info = asyncio.run(inverter.fetch_device_information())
+        self.assertEqual('92932004102453', device_info.serial_number)
+        self.assertIsNone(device_info.firmware_version)
+        self.assertFalse(device_info.is_complete)
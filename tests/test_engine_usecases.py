@@ -0,0 +1,60 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from unittest import IsolatedAsyncioTestCase
+
+from common.model import DeviceConfig
+from di import LoggerProvider
+from engine import InverterCore
+from engine.interactor.usecases import PollingUseCase
+
+
+class SlowInverter(InverterCore):
+
+    def __init__(self, name: str, delay: float, fail: bool = False) -> None:
+        super().__init__(
+            DeviceConfig('loop://', 2400, True, name=name, poll_interval=0.05),
+            LoggerProvider.logger_factory_ioc()
+        )
+        self._delay = delay
+        self._fail = fail
+        self.polls = 0
+
+    async def fetch_status(self) -> Optional[str]:
+        self.polls += 1
+        await asyncio.sleep(self._delay)
+        if self._fail:
+            raise OSError('Device disconnected')
+        return f'{self.device_config.device_name}-{self.polls}'
+
+
+class TestPollingUseCase(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._samples: List[Tuple[str, str]] = []
+
+    async def __on_sample(self, device: DeviceConfig, sample: str) -> None:
+        self._samples.append((device.device_name, sample))
+
+    async def __run_for(self, inverters: List[InverterCore], duration: float) -> None:
+        use_case = PollingUseCase(LoggerProvider.logger_factory_ioc(), inverters, self.__on_sample)
+        try:
+            await asyncio.wait_for(use_case.run(), duration)
+        except asyncio.TimeoutError:
+            pass
+
+    async def test_devices_are_polled_concurrently(self):
+        inverters = [SlowInverter(f'inverter-{index}', 0.04) for index in range(4)]
+        started = time.monotonic()
+        await self.__run_for(inverters, 0.03 + 0.04)
+        self.assertLess(time.monotonic() - started, 0.15)
+        self.assertEqual({f'inverter-{index}' for index in range(4)}, {name for name, _ in self._samples})
+
+    async def test_failing_device_does_not_stop_others(self):
+        healthy = SlowInverter('healthy', 0.0)
+        failing = SlowInverter('failing', 0.0, fail=True)
+        await self.__run_for([healthy, failing], 0.18)
+        self.assertGreaterEqual(failing.polls, 2)
+        self.assertGreaterEqual(healthy.polls, 2)
+        self.assertTrue(all(name == 'healthy' for name, _ in self._samples))
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from common.model import CommandDefinition, CommandSpecification, CommandValidation
+from processor.helper import ResponseDecoderCompiler
+
+
+class TestResponseDecoderCompiler(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._definition = CommandDefinition(
+            specifications=[
+                CommandSpecification('float', 'V', 'battery_voltage'),
+                CommandSpecification('int', '%', 'battery_capacity'),
+                CommandSpecification('flags', None, ['is_load_on', 'is_charging_on']),
+                CommandSpecification('option', None, {'device_mode': {'B': 'Battery'}})
+            ],
+            validation=CommandValidation(input_rule=None, output_rule=None)
+        )
+        self._decoder = ResponseDecoderCompiler().compile('QPIGS', self._definition)
+
+    def test_decode_converts_fields(self):
+        given = memoryview(b'57.50 100 10 B')
+        actual = self._decoder.decode(given)
+        expect = {
+            'battery_voltage': 57.5,
+            'battery_capacity': 100,
+            'is_load_on': True,
+            'is_charging_on': False,
+            'device_mode': 'Battery'
+        }
+        self.assertEqual(expect, dict(actual))
+
+    def test_decode_produces_slotted_record(self):
+        actual = self._decoder.decode(b'57.50 100 10 B')
+        self.assertFalse(hasattr(actual, '__dict__'))
+        self.assertEqual(57.5, actual.battery_voltage)
+
+    def test_decode_tolerates_missing_and_malformed_fields(self):
+        actual = self._decoder.decode(b'57.50 ---')
+        self.assertEqual(57.5, actual.battery_voltage)
+        self.assertIsNone(actual.battery_capacity)
+        self.assertIsNone(actual.device_mode)
+
+    def test_compile_without_definition(self):
+        decoder = ResponseDecoderCompiler().compile('POP02')
+        self.assertEqual('ACK', decoder.decode(b'ACK').response)
+
+    def test_compile_rejects_duplicate_fields(self):
+        self._definition.specifications.append(CommandSpecification('int', None, 'battery_capacity'))
+        with self.assertRaises(ValueError):
+            ResponseDecoderCompiler().compile('QPIGS', self._definition)
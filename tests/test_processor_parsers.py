@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from common.model import RawResponse, Command
+from processor.helper import ResponseFrameParser
+
+
+class TestResponseFrameParser(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._parser = ResponseFrameParser(max_frame_size=16)
+
+    def test_feed_assembles_frame_from_chunks(self):
+        self.assertEqual([], self._parser.feed(b'(NA'))
+        self.assertEqual([], self._parser.feed(b'Ks'))
+        frames = self._parser.feed(b's\r')
+        self.assertEqual(1, len(frames))
+        self.assertTrue(frames[0].is_valid)
+        self.assertTrue(frames[0].is_nak)
+        self.assertEqual(0, self._parser.pending)
+
+    def test_feed_returns_views_of_the_chunk(self):
+        given = b'(ACK9 \r'
+        frame, = self._parser.feed(given)
+        self.assertIs(given, frame.payload.obj)
+        self.assertEqual(b'ACK', frame.payload)
+        self.assertFalse(frame.is_nak)
+
+    def test_feed_flags_crc_mismatch(self):
+        frame, = self._parser.feed(b'(ACK9!\r')
+        self.assertFalse(frame.is_valid)
+
+    def test_feed_skips_noise_and_truncated_frames(self):
+        frames = self._parser.feed(b'\x00\x00(23(NAKss\r(AC')
+        self.assertEqual(1, len(frames))
+        self.assertEqual(b'NAK', frames[0].payload)
+        self.assertEqual(3, self._parser.pending)
+
+    def test_feed_drops_oversized_partial_frames(self):
+        self._parser.feed(b'(' + b'0' * 32)
+        self.assertEqual(0, self._parser.pending)
+
+    def test_raw_response_validation(self):
+        command = Command('QPI')
+        self.assertTrue(RawResponse(b'(ACK9 \r', command).is_valid())
+        self.assertFalse(RawResponse(b'(ACK9!\r', command).is_valid())
+        self.assertFalse(RawResponse(b'(ACK', command).is_valid())
+        self.assertTrue(RawResponse('(NAKss\r', command).is_nak())
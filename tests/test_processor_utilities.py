@@ -3,7 +3,7 @@ from unittest import TestCase
 
 from common.model import Crc, Command
 from di.dependencies import CrcProvider
-from processor.helper import CyclicRedundancyCodeHelper
+from processor.helper import CyclicRedundancyCodeHelper, CommandFrameCache
 
 
 class TestCyclicRedundancyCodeHelper(TestCase):
@@ -30,3 +30,48 @@ class TestCyclicRedundancyCodeHelper(TestCase):
         )
         actual = self._crc_helper.command_with_crc('QPI')
         self.assertEqual(expected, actual)
+
+    def test_calculate_crc_accepts_buffers(self):
+        given = 'QPIGS'
+        expect = self._crc_helper.calculate_crc(given)
+        self.assertEqual(expect, self._crc_helper.calculate_crc(b'QPIGS'))
+        self.assertEqual(expect, self._crc_helper.calculate_crc(bytearray(b'QPIGS')))
+        self.assertEqual(expect, self._crc_helper.calculate_crc(memoryview(b'xxQPIGSxx')[2:-2]))
+
+    def test_update_streaming(self):
+        given = b'(NAK'
+        checksum = 0x0
+        for chunk in wrap(given.decode(), 1):
+            checksum = CyclicRedundancyCodeHelper.update(chunk, checksum)
+        self.assertEqual(CyclicRedundancyCodeHelper.update(given), checksum)
+        self.assertEqual(Crc(crc_high=0x73, crc_low=0x73), CyclicRedundancyCodeHelper.to_crc(checksum))
+
+    def test_to_crc_escapes_reserved_bytes(self):
+        given = 0x280d  # both bytes collide with frame delimiters
+        expect = Crc(crc_high=0x29, crc_low=0x0e)
+        actual = CyclicRedundancyCodeHelper.to_crc(given)
+        self.assertEqual(expect, actual)
+
+
+class TestCommandFrameCache(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._frame_cache = CommandFrameCache(CrcProvider.crc_ioc(), max_size=2)
+
+    def test_get_returns_ready_to_write_frame(self):
+        command, frame = self._frame_cache.get('QPI')
+        self.assertEqual(b'QPI\xbe\xac\r', frame)
+        self.assertEqual(str(command).encode('latin-1'), frame)
+
+    def test_get_reuses_cached_frame(self):
+        self._frame_cache.warm(['QPIGS'])
+        self.assertIs(self._frame_cache.get('QPIGS'), self._frame_cache.get('QPIGS'))
+
+    def test_parameterised_commands_are_evicted(self):
+        self._frame_cache.warm(['QPIGS'])
+        for command in ('POP00', 'POP01', 'POP02'):
+            self._frame_cache.get(command)
+        self.assertIn('QPIGS', self._frame_cache)
+        self.assertNotIn('POP00', self._frame_cache)
+        self.assertEqual(3, len(self._frame_cache))
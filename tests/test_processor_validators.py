@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from common.model import CommandDefinition, CommandValidation
+from processor.helper import CommandValidator
+
+
+def _definition(input_rule: str = None) -> CommandDefinition:
+    return CommandDefinition([], CommandValidation(input_rule=input_rule, output_rule=None))
+
+
+class TestCommandValidator(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._validator = CommandValidator({
+            'QPI': _definition(),
+            'QPIGS': _definition(),
+            'PE': _definition(r'PE[abjkuvxyz]+'),
+            'PBCV': _definition(r'PBCV\d{2}\.\d')
+        })
+
+    def test_valid_commands(self):
+        for command in ('QPI', 'QPIGS', 'PEa', 'PEjk', 'PBCV44.0'):
+            self.assertIsNone(self._validator.validate(command), command)
+
+    def test_invalid_commands(self):
+        for command in ('', 'QPIG', 'QPIGSS', 'PEq', 'PBCV4.0', 'QPI\rQPIGS', 'PBCV44.0000000000000'):
+            self.assertIsNotNone(self._validator.validate(command), command)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from processor.helper import CyclicRedundancyCodeHelper, ResponseFrameParser
+from simulator import InverterSimulator, TrafficReplay
+from simulator.model import RecordedExchange, SimulatorProfile
+
+
+def _request(command: str) -> bytes:
+    crc = CyclicRedundancyCodeHelper.to_crc(CyclicRedundancyCodeHelper.update(command))
+    return command.encode() + bytes(crc) + b'\r'
+
+
+def _payload(response: bytes) -> bytes:
+    frame = ResponseFrameParser.parse(response)
+    return frame.payload.tobytes() if frame is not None and frame.is_valid else None
+
+
+class TestInverterSimulator(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._simulator = InverterSimulator(SimulatorProfile(seed=7))
+
+    def test_status_has_every_qpigs_field(self):
+        self.assertEqual(21, len(_payload(self._simulator.respond(_request('QPIGS'))).split()))
+
+    def test_set_command_is_reflected_in_settings(self):
+        self.assertEqual(b'ACK', _payload(self._simulator.respond(_request('POP00'))))
+        self.assertEqual(b'0', _payload(self._simulator.respond(_request('QPIRI'))).split()[16])
+        self.assertEqual(b'L', _payload(self._simulator.respond(_request('QMOD'))))
+
+    def test_flags_are_enabled_and_disabled(self):
+        self._simulator.respond(_request('PEb'))
+        self._simulator.respond(_request('PDa'))
+        self.assertEqual(b'EbkxyDajuvz', _payload(self._simulator.respond(_request('QFLAG'))))
+
+    def test_unknown_command_and_bad_crc_are_rejected(self):
+        self.assertEqual(b'NAK', _payload(self._simulator.respond(_request('POP09'))))
+        self.assertEqual(b'NAK', _payload(self._simulator.respond(b'QPIGS\x00\x00\r')))
+
+    def test_faults_follow_profile(self):
+        corrupting = InverterSimulator(SimulatorProfile(corruption_rate=1.0, seed=1))
+        self.assertIsNone(_payload(corrupting.respond(_request('QPIRI'))))
+        self.assertEqual(1, corrupting.corrupted)
+        dropping = InverterSimulator(SimulatorProfile(drop_rate=1.0))
+        self.assertIsNone(dropping.respond(_request('QPI')))
+        self.assertEqual(1, dropping.dropped)
+
+    def test_delay_includes_line_time(self):
+        simulator = InverterSimulator(SimulatorProfile(latency=0.1, baud_rate=2400))
+        self.assertAlmostEqual(0.1 + 240 * 10 / 2400, simulator.delay_for(bytes(240)))
+
+
+class TestTrafficReplay(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._directory)
+        super().tearDown()
+
+    def test_recorded_run_is_replayed_in_order(self):
+        recording = InverterSimulator(SimulatorProfile(seed=3), record=True)
+        responses = [recording.respond(_request('QPIGS')) for _ in range(3)]
+        path = os.path.join(self._directory, 'traffic.jsonl')
+        TrafficReplay.save(path, recording.exchanges)
+        replaying = InverterSimulator(replay=TrafficReplay.load(path))
+        self.assertEqual(responses + responses[:1], [replaying.respond(_request('QPIGS')) for _ in range(4)])
+
+    def test_commands_not_recorded_are_simulated(self):
+        replay = TrafficReplay([RecordedExchange('QPI', InverterSimulator.frame(b'PI18'))])
+        simulator = InverterSimulator(replay=replay)
+        self.assertEqual(b'PI18', _payload(simulator.respond(_request('QPI'))))
+        self.assertEqual(b'92932004102453', _payload(simulator.respond(_request('QID'))))
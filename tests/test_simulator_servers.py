@@ -0,0 +1,53 @@
+from unittest import IsolatedAsyncioTestCase
+
+from common.helper import MetricsRegistry
+from common.model import DeviceConfig
+from di import LoggerProvider
+from di.dependencies import DispatcherProvider
+from simulator import InverterSimulator, PtySimulatorServer, SocketSimulatorServer
+from simulator.model import SimulatorProfile
+
+
+class TestSimulatorServers(IsolatedAsyncioTestCase):
+
+    async def __exchange(self, server) -> None:
+        url = await server.start()
+        self.addAsyncCleanup(server.close)
+        dispatcher = DispatcherProvider.dispatcher_ioc(device_configuration=DeviceConfig(url, 2400, True, name=url))
+        self.addAsyncCleanup(dispatcher.stop)
+        response = await dispatcher.execute('QPI')
+        self.assertEqual(b'PI30', bytes(response.payload))
+        self.assertIsNotNone(await dispatcher.execute('QPIGS'))
+
+    async def test_socket_server_answers_dispatcher(self):
+        await self.__exchange(SocketSimulatorServer(LoggerProvider.logger_factory_ioc()))
+
+    async def test_pty_server_answers_dispatcher(self):
+        await self.__exchange(PtySimulatorServer(LoggerProvider.logger_factory_ioc()))
+
+    async def test_dropped_request_times_out(self):
+        simulator = InverterSimulator(SimulatorProfile(drop_rate=1.0))
+        server = SocketSimulatorServer(LoggerProvider.logger_factory_ioc(), simulator)
+        url = await server.start()
+        self.addAsyncCleanup(server.close)
+        device = DeviceConfig(url, 2400, True, timeout=0.05, name='dropping')
+        dispatcher = DispatcherProvider.dispatcher_ioc(device_configuration=device)
+        self.addAsyncCleanup(dispatcher.stop)
+        self.assertIsNone(await dispatcher.execute('QPI'))
+
+    async def test_exchanges_and_failures_are_measured(self):
+        simulator = InverterSimulator(SimulatorProfile(corruption_rate=1.0, seed=1))
+        server = SocketSimulatorServer(LoggerProvider.logger_factory_ioc(), simulator)
+        url = await server.start()
+        self.addAsyncCleanup(server.close)
+        metrics = MetricsRegistry()
+        device = DeviceConfig(url, 2400, True, name='measured')
+        dispatcher = DispatcherProvider.dispatcher_ioc(device_configuration=device, metrics=metrics)
+        self.addAsyncCleanup(dispatcher.stop)
+        self.assertIsNone(await dispatcher.execute('QPIGS'))
+        labels = {'device': 'measured', 'command': 'QPIGS'}
+        self.assertEqual(1, metrics.histogram('mppt_command_duration_seconds', '', **labels).count)
+        self.assertEqual(1, metrics.counter('mppt_command_failures_total', '', reason='crc', **labels).value)
+        self.assertEqual(8, metrics.counter('mppt_serial_sent_bytes_total', '', device='measured').value)
+        self.assertGreater(metrics.counter('mppt_serial_received_bytes_total', '', device='measured').value, 100)
+        self.assertGreater(metrics.counter('mppt_serial_busy_seconds_total', '', device='measured').value, 0)